@@ -1,29 +1,66 @@
 from __future__ import annotations
 
+from datetime import timedelta
+
 import pendulum
 from airflow.decorators import dag, task
+from airflow.models import BaseOperator
 from airflow.providers.postgres.operators.postgres import PostgresOperator
 from airflow.operators.bash import BashOperator
+from airflow.triggers.temporal import TimeDeltaTrigger
+
+
+class WaitForLlmBatchesOperator(BaseOperator):
+    """
+    Aguarda os jobs da Batch API (data/llm_batches) terminarem. Entre uma consulta
+    e outra a task fica adiada num TimeDeltaTrigger (serviço triggerer), sem
+    ocupar um slot de worker durante as horas de processamento da OpenAI.
+    """
+
+    def __init__(self, poll_interval: timedelta = timedelta(minutes=10), **kwargs):
+        super().__init__(**kwargs)
+        self.poll_interval = poll_interval
+
+    def execute(self, context, event=None):
+        import logging
+        import sys
+        sys.path.insert(0, '/opt/airflow/scripts')
+        from llm_enricher import get_batch_backend, poll_batch_jobs
+
+        from airflow.models import Variable
+
+        logger = logging.getLogger(__name__)
+        backend = get_batch_backend(logger, api_key=Variable.get("OPENAI_API_KEY"))
+        running = poll_batch_jobs(backend, logger)
+        if running:
+            logger.info(f"{len(running)} jobs da Batch API em andamento; nova consulta em {self.poll_interval}.")
+            self.defer(trigger=TimeDeltaTrigger(self.poll_interval), method_name="execute")
+        logger.info("Nenhum job da Batch API em andamento.")
 
 @dag(
     dag_id="g1_enrichment_pipeline",
     schedule_interval="0 9 * * *",  # Executa às 9h, 1 hora depois do scraping
     start_date=pendulum.datetime(2025, 9, 5, tz="America/Sao_Paulo"),
     catchup=False,
+    # Uma execução por vez: a próxima não submete nem coleta jobs enquanto esta espera a Batch API
+    max_active_runs=1,
     tags=["enrichment", "llm", "g1", "silver", "ai"],
     doc_md="""
     ### Pipeline de Enriquecimento de Notícias do G1 com IA
     Esta DAG é responsável por:
     1. Aguardar a conclusão bem-sucedida da DAG g1_scraping_pipeline (sensor).
     2. Criar a tabela silver de dados enriquecidos no PostgreSQL.
-    3. Executar o script de enriquecimento com LLM para analisar manchetes.
-    4. Processar manchetes ainda não analisadas da camada Bronze.
-    5. Classificar sentimento e categorizar usando OpenAI GPT.
-    6. Salvar os dados enriquecidos na camada Silver.
+    3. Enviar as manchetes ainda não analisadas da camada Bronze como um job da
+       Batch API da OpenAI (JSONL em data/llm_batches, até 20 manchetes por requisição).
+    4. Aguardar o job terminar (task adiada no triggerer, sem ocupar worker).
+    5. Carregar sentimento e categoria devolvidos na camada Silver.
+    6. Retreinar o classificador local (data/models) com os rótulos do LLM quando
+       o modelo tiver mais de LOCAL_CLASSIFIER_RETRAIN_DAYS dias (default 7).
     
     **Configuração:**
     - SCHEDULE: 9h diário (1 hora após o scraping às 8h)
     - SAFETY CHECK: ExternalTaskSensor aguarda scraping finalizar
+    - UMA EXECUÇÃO POR VEZ: a espera pela Batch API termina antes da execução seguinte
     - MANUAL: Pode ser executada manualmente
     
     **Dependências:**
@@ -84,19 +121,25 @@ def g1_enrichment_pipeline():
         """
         from airflow.providers.postgres.hooks.postgres import PostgresHook
         import logging
+        import sys
+        sys.path.insert(0, '/opt/airflow/scripts')
+        from raw_partitions import pending_since
         
         logger = logging.getLogger(__name__)
         hook = PostgresHook(postgres_conn_id='postgres_default')
         
-        # Query corrigida para usar link como chave
+        # Query corrigida para usar link como chave. Só a janela recente
+        # (RAW_PENDING_LOOKBACK_DAYS): com o limite literal, o PostgreSQL
+        # poda as partições mensais antigas de raw_headlines.
         query = """
         SELECT COUNT(*) as pending_count
         FROM raw_headlines r
         LEFT JOIN silver_enriched_headlines s ON r.link = s.raw_link
-        WHERE s.raw_link IS NULL
+        WHERE r.scraped_at >= %s
+        AND s.raw_link IS NULL
         """
         
-        result = hook.get_first(query)
+        result = hook.get_first(query, parameters=(pending_since(),))
         pending_count = result[0] if result else 0
         
         logger.info(f"Encontradas {pending_count} manchetes pendentes de enriquecimento")
@@ -112,15 +155,68 @@ def g1_enrichment_pipeline():
     from airflow.models import Variable
     openai_api_key = Variable.get("OPENAI_API_KEY")
     
+    # A execução noturna não tem pressa: usa a Batch API (metade do preço, fora
+    # dos limites por minuto), com até 20 manchetes por requisição. Para o modo
+    # online, use --mode async --concurrency 16 --rpm 500 --tpm 60000.
     run_llm_enricher = BashOperator(
         task_id="run_llm_enricher",
-        bash_command="cd /opt/airflow && OPENAI_API_KEY=\"${OPENAI_API_KEY}\" python scripts/llm_enricher.py",
+        bash_command="cd /opt/airflow && OPENAI_API_KEY=\"${OPENAI_API_KEY}\" python scripts/llm_enricher.py "
+                     "--mode batch --headlines-per-request 20",
         env={
             'PYTHONPATH': '/opt/airflow',
             'OPENAI_API_KEY': openai_api_key,
         }
     )
 
+    # Tarefa 3b: Aguardar os jobs da Batch API (janela de até 24h). O timeout fica
+    # abaixo do intervalo diário; um job que passar disso é coletado pela execução
+    # seguinte (batch-collect carrega todos os jobs terminados)
+    wait_llm_batches = WaitForLlmBatchesOperator(
+        task_id="wait_llm_batches",
+        poll_interval=timedelta(minutes=10),
+        execution_timeout=timedelta(hours=22),
+    )
+
+    # Tarefa 3c: Carregar os resultados dos jobs terminados na tabela silver
+    load_llm_batch_results = BashOperator(
+        task_id="load_llm_batch_results",
+        bash_command="cd /opt/airflow && OPENAI_API_KEY=\"${OPENAI_API_KEY}\" python scripts/llm_enricher.py "
+                     "--mode batch-collect",
+        env={
+            'PYTHONPATH': '/opt/airflow',
+            'OPENAI_API_KEY': openai_api_key,
+        }
+    )
+
+    # Tarefa 3d: Retreinar o classificador local que resolve as manchetes fáceis sem LLM
+    @task
+    def train_local_classifier():
+        """
+        Retreina o classificador local com os rótulos do LLM da tabela silver quando
+        ele não existe ou está desatualizado. O relatório (concordância com o LLM
+        por limiar) fica no log e em data/models/local_classifier_report.json.
+        """
+        import sys
+        sys.path.insert(0, '/opt/airflow/scripts')
+        from local_classifier import needs_retrain, train_local_classifier as train
+
+        from airflow.providers.postgres.hooks.postgres import PostgresHook
+
+        if not needs_retrain():
+            print("Classificador local treinado recentemente. Nada a fazer.")
+            return None
+
+        conn = PostgresHook(postgres_conn_id='postgres_default').get_conn()
+        try:
+            report = train(conn)
+        finally:
+            conn.close()
+        if report is not None:
+            print(f"Classificador local retreinado: limiar {report['threshold']}, "
+                  f"cobertura esperada {report['expected_coverage']:.1%}, "
+                  f"concordância geral {report['agreement']:.1%}")
+        return report
+
     # Tarefa 4: Validar qualidade dos dados enriquecidos
     @task
     def validate_enriched_data():
@@ -218,6 +314,16 @@ def g1_enrichment_pipeline():
                 SELECT ROUND(AVG(processing_time_seconds)::numeric, 3) 
                 FROM silver_enriched_headlines 
                 WHERE DATE(processed_at) = CURRENT_DATE
+            """,
+            "local_today": """
+                SELECT COUNT(*) FROM silver_enriched_headlines
+                WHERE DATE(processed_at) = CURRENT_DATE
+                AND model_used LIKE 'local:%'
+            """,
+            "near_dup_today": """
+                SELECT COUNT(*) FROM silver_enriched_headlines
+                WHERE DATE(processed_at) = CURRENT_DATE
+                AND model_used LIKE 'near-dup:%'
             """
         }
         
@@ -253,6 +359,8 @@ def g1_enrichment_pipeline():
         logger.info(f"   Processadas hoje: {report['processed_today']}")
         logger.info(f"   Pendentes: {report['pending']}")
         logger.info(f"   Tempo médio por manchete: {report['avg_processing_time']}s")
+        logger.info(f"   Resolvidas sem LLM hoje: {report['local_today']} pelo classificador local, "
+                    f"{report['near_dup_today']} por quase duplicatas")
         
         if report['categories_today']:
             logger.info("   Categorias processadas hoje:")
@@ -265,10 +373,12 @@ def g1_enrichment_pipeline():
     check_task = check_pending_headlines()
     validate_task = validate_enriched_data()
     report_task = generate_processing_report()
+    train_task = train_local_classifier()
     
     # Fluxo simplificado sem sensor externo
     create_silver_table >> check_task
-    check_task >> run_llm_enricher >> validate_task >> report_task
+    check_task >> run_llm_enricher >> wait_llm_batches >> load_llm_batch_results >> validate_task >> report_task
+    load_llm_batch_results >> train_task
 
 # Instanciar a DAG
 g1_enrichment_pipeline()
\ No newline at end of file
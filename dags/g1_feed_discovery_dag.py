@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import pendulum
+from airflow.decorators import dag, task
+from airflow.providers.postgres.operators.postgres import PostgresOperator
+from airflow.operators.bash import BashOperator
+
+@dag(
+    dag_id="g1_feed_discovery",
+    schedule_interval="*/10 * * * *",
+    start_date=pendulum.datetime(2025, 8, 31, tz="America/Sao_Paulo"),
+    catchup=False,
+    max_active_runs=1,
+    tags=["scraping", "g1", "bronze", "rss"],
+    doc_md="""
+    ### Descoberta de Notícias do G1 por Feeds RSS/Sitemaps
+    Esta DAG roda a cada 10 minutos e é responsável por:
+    1. Garantir a tabela de destino no PostgreSQL (camada Bronze), com `link_key`
+       preenchido nas manchetes antigas.
+    2. Consultar os feeds RSS/sitemaps com GET condicional (engine `feeds` do scraper).
+    3. Inserir as manchetes novas em raw_headlines durante a leitura dos feeds, com a data
+       de publicação; lotes que não puderam ser gravados assim entram pela ingestão do ledger.
+    """
+)
+def g1_feed_discovery():
+    """
+    DAG de descoberta frequente de manchetes, sem navegador.
+    """
+
+    @task
+    def backfill_raw_headline_keys():
+        """
+        Preenche canonical_link/link_key das manchetes gravadas antes da
+        canonicalização (antes da migração para a tabela particionada, se for o caso).
+        """
+        import sys
+        sys.path.insert(0, '/opt/airflow/scripts')
+        from raw_loader import backfill_link_keys
+
+        from airflow.providers.postgres.hooks.postgres import PostgresHook
+
+        conn = PostgresHook(postgres_conn_id='postgres_default').get_conn()
+        try:
+            filled = backfill_link_keys(conn)
+        finally:
+            conn.close()
+        print(f"Links antigos preenchidos: {filled}")
+        return filled
+
+    create_raw_headlines_table = PostgresOperator(
+        task_id="create_raw_headlines_table",
+        postgres_conn_id="postgres_default",
+        sql="sql/create_raw_headlines.sql",
+    )
+
+    # Feeds sem alterações respondem 304 e não geram linhas; com --incremental
+    # só os links ainda não vistos vão para o lote. Com --stream as manchetes
+    # entram em raw_headlines enquanto os feeds são lidos.
+    run_feed_discovery = BashOperator(
+        task_id="run_feed_discovery",
+        bash_command="python /opt/airflow/scripts/scraper.py --engine feeds --incremental --stream"
+    )
+
+    @task
+    def ingest_feed_headlines():
+        """
+        Carrega em raw_headlines os lotes pendentes no ledger (inclusive os da engine feeds).
+        """
+        import sys
+        sys.path.insert(0, '/opt/airflow/scripts')
+        from raw_loader import ingest_pending_batches
+
+        from airflow.providers.postgres.hooks.postgres import PostgresHook
+
+        hook = PostgresHook(postgres_conn_id='postgres_default')
+        conn = hook.get_conn()
+        try:
+            summary = ingest_pending_batches(conn)
+        finally:
+            conn.close()
+        print(f"{summary['batches']} lotes carregados: {summary['inserted']} manchetes inseridas.")
+        if summary['failed']:
+            raise RuntimeError(f"{summary['failed']} lotes não puderam ser lidos; veja o log.")
+        return summary['inserted']
+
+    backfill_raw_headline_keys() >> create_raw_headlines_table >> run_feed_discovery >> ingest_feed_headlines()
+
+g1_feed_discovery()
@@ -14,9 +14,20 @@ from airflow.operators.bash import BashOperator
     doc_md="""
     ### Pipeline de Coleta de Notícias do G1
     Esta DAG é responsável por:
-    1. Criar a tabela de destino no PostgreSQL (camada Bronze).
-    2. Executar o script de web scraping para coletar as manchetes.
-    3. Ingerir os dados coletados do arquivo CSV para a tabela no PostgreSQL.
+    1. Criar a tabela de destino no PostgreSQL (camada Bronze), particionada por mês,
+       e as partições dos próximos meses. Antes disso, as manchetes antigas sem
+       `link_key` recebem a URL canônica, para entrarem na deduplicação.
+    2. Reconstruir, se necessário, o índice de links já vistos a partir da tabela.
+    3. Executar o script de web scraping para coletar apenas manchetes novas, gravando-as
+       direto no PostgreSQL durante a coleta (--stream).
+    4. Ingerir os lotes ainda não carregados (ledger raw_ingest_ledger), por exemplo
+       quando o streaming falhou.
+    5. Buscar corpo e lide das notícias novas (tabela bronze_article_bodies).
+    6. Aplicar a retenção: partições mais antigas que RAW_HEADLINES_RETENTION_MONTHS
+       são exportadas para data/archive/partitions e removidas.
+
+    As métricas por fase de cada execução do scraper ficam no XCom da task
+    `publish_scrape_metrics` e em data/metrics (JSONL + textfile do Prometheus).
     """
 )
 def g1_scraping_pipeline():
@@ -24,66 +35,169 @@ def g1_scraping_pipeline():
     DAG que orquestra todo o processo de coleta e ingestão de dados do G1.
     """
     
+    @task
+    def backfill_raw_headline_keys():
+        """
+        Preenche canonical_link/link_key das manchetes gravadas antes da
+        canonicalização (antes da migração para a tabela particionada, se for o caso).
+        """
+        import sys
+        sys.path.insert(0, '/opt/airflow/scripts')
+        from raw_loader import backfill_link_keys
+
+        from airflow.providers.postgres.hooks.postgres import PostgresHook
+
+        conn = PostgresHook(postgres_conn_id='postgres_default').get_conn()
+        try:
+            filled = backfill_link_keys(conn)
+        finally:
+            conn.close()
+        print(f"Links antigos preenchidos: {filled}")
+        return filled
+
     # Tarefa 1: Cria a tabela no PostgreSQL se ela não existir.
     # Usamos o PostgresOperator para executar uma query SQL.
     # A idempotência é garantida pelo "CREATE TABLE IF NOT EXISTS".
+    # O SQL fica em dags/sql/ e é compartilhado com a DAG de feeds.
     create_raw_headlines_table = PostgresOperator(
         task_id="create_raw_headlines_table",
         postgres_conn_id="postgres_default",  # O ID da conexão que criamos na UI do Airflow
-        sql="""
-            CREATE TABLE IF NOT EXISTS raw_headlines (
-                title TEXT,
-                link TEXT PRIMARY KEY,
-                source TEXT,
-                scraped_at TIMESTAMP WITH TIME ZONE
-            );
-        """
+        sql="sql/create_raw_headlines.sql",
     )
 
+    @task
+    def ensure_raw_headlines_partitions():
+        """
+        Cria as partições mensais de raw_headlines do mês corrente e dos próximos
+        meses, movendo para elas as linhas que estiverem na partição default.
+        """
+        import sys
+        sys.path.insert(0, '/opt/airflow/scripts')
+        from raw_partitions import ensure_partitions
+
+        from airflow.providers.postgres.hooks.postgres import PostgresHook
+
+        conn = PostgresHook(postgres_conn_id='postgres_default').get_conn()
+        try:
+            created = ensure_partitions(conn)
+        finally:
+            conn.close()
+        print(f"Partições criadas: {created or 'nenhuma'}")
+        return created
+
+    @task
+    def apply_raw_headlines_retention():
+        """
+        Arquiva (Parquet em data/archive/partitions) e remove as partições mensais
+        mais antigas que a retenção configurada.
+        """
+        import sys
+        sys.path.insert(0, '/opt/airflow/scripts')
+        from raw_partitions import apply_retention
+
+        from airflow.providers.postgres.hooks.postgres import PostgresHook
+
+        conn = PostgresHook(postgres_conn_id='postgres_default').get_conn()
+        try:
+            removed = apply_retention(conn)
+        finally:
+            conn.close()
+        print(f"Partições arquivadas e removidas: {[item['partition'] for item in removed] or 'nenhuma'}")
+        return removed
+
+    @task
+    def refresh_seen_link_index():
+        """
+        Reconstrói o índice de links vistos (data/index) a partir de raw_headlines
+        quando ele não existe ou está desatualizado, mantendo-o alinhado com o banco.
+        """
+        import sys
+        sys.path.insert(0, '/opt/airflow/scripts')
+        from seen_index import DEFAULT_MAX_AGE_DAYS, SeenLinkIndex
+
+        from airflow.providers.postgres.hooks.postgres import PostgresHook
+
+        index = SeenLinkIndex.load()
+        if not index.needs_rebuild():
+            print(f"Índice de links vistos atualizado ({len(index)} links). Nada a fazer.")
+            return len(index)
+
+        hook = PostgresHook(postgres_conn_id='postgres_default')
+        records = hook.get_records(
+            "SELECT link, scraped_at FROM raw_headlines "
+            "WHERE scraped_at >= NOW() - make_interval(days => %s)",
+            parameters=(DEFAULT_MAX_AGE_DAYS,),
+        )
+        index = SeenLinkIndex.from_records(records)
+        index.save()
+        print(f"Índice de links vistos reconstruído com {len(index)} links.")
+        return len(index)
+
     # Tarefa 2: Executa o script de scraping.
     # Usamos o BashOperator para rodar um comando no terminal, como se fosse local.
     # O script já está acessível dentro do contêiner graças aos volumes que montamos.
+    # Com --stream as manchetes entram em raw_headlines durante a coleta; o arquivo
+    # em data/raw fica para replay e já sai registrado no ledger.
     run_g1_scraper = BashOperator(
         task_id="run_g1_scraper",
-        bash_command="python /opt/airflow/scripts/scraper.py --engine playwright"
+        bash_command="python /opt/airflow/scripts/scraper.py --engine requests --incremental --stream"
     )
 
+    @task
+    def publish_scrape_metrics():
+        """
+        Publica no XCom o resumo de métricas da última execução do scraper
+        (tempo por fase, contagens e pico de memória), lido de data/metrics.
+        """
+        import sys
+        sys.path.insert(0, '/opt/airflow/scripts')
+        from scrape_metrics import read_last_run
+
+        summary = read_last_run()
+        if summary is None:
+            print("Nenhuma métrica de execução encontrada em data/metrics.")
+            return None
+        print(f"Execução {summary['engine']} em {summary['duration_s']}s | fases (ms): {summary['phases_ms']}")
+        return summary
+
     @task
     def ingest_data_to_postgres():
         """
-        Tarefa Python customizada para ler o CSV e inserir no Postgres.
+        Carrega no Postgres todos os lotes do scraper ainda não registrados no ledger.
         """
-        import pandas as pd
-        from sqlalchemy import create_engine
-        import os
-
-        # O scraper salva o arquivo na raiz. Dentro do container, o caminho é este.
-        # Precisamos encontrar o arquivo CSV mais recente gerado pelo scraper.
-        data_dir = '/opt/airflow/data/raw'
-        if not os.path.exists(data_dir) or not os.listdir(data_dir):
-            raise FileNotFoundError(f"Nenhum arquivo encontrado no diretório {data_dir}")
-        all_files = [os.path.join(data_dir, f) for f in os.listdir(data_dir)]
-        latest_file = max(all_files, key=os.path.getctime)
-        
-        print(f"Lendo o arquivo CSV: {latest_file}")
-        df = pd.read_csv(latest_file)
-
-        # Conecta ao PostgreSQL usando SQLAlchemy
-        # As credenciais são obtidas da conexão do Airflow
+        import sys
+        sys.path.insert(0, '/opt/airflow/scripts')
+        from raw_loader import ingest_pending_batches
+
+        # Cada lote (arquivo + manifest em /opt/airflow/data) é carregado via COPY +
+        # INSERT ... ON CONFLICT no registro de links (raw_headline_links) e
+        # registrado em raw_ingest_ledger na mesma transação; depois vai para data/archive. Retries e lotes acumulados são
+        # carregados em ordem, sem pular arquivos.
         from airflow.providers.postgres.hooks.postgres import PostgresHook
         hook = PostgresHook(postgres_conn_id='postgres_default')
-        engine = hook.get_sqlalchemy_engine()
-        
-        print("Inserindo dados na tabela 'raw_headlines'...")
-        # Insere o DataFrame na tabela.
-        # 'if_exists='replace'' apaga a tabela e insere os novos dados.
-        # 'if_exists='append'' adicionaria os dados ao final.
-        # Para a camada bronze, 'replace' é uma estratégia comum para a carga diária.
-        df.to_sql('raw_headlines', engine, if_exists='replace', index=False)
-        print("Ingestão de dados concluída com sucesso.")
+        conn = hook.get_conn()
+        try:
+            summary = ingest_pending_batches(conn)
+        finally:
+            conn.close()
+        print(f"Ingestão concluída: {summary['batches']} lotes, {summary['inserted']} linhas inseridas, "
+              f"{summary['duplicates']} duplicadas.")
+        if summary['failed']:
+            raise RuntimeError(f"{summary['failed']} lotes não puderam ser lidos; veja o log.")
+        return summary
+
+    # Tarefa 4: Busca o corpo dos artigos novos (cliente HTTP assíncrono com
+    # cache de ETag/Last-Modified em /opt/airflow/data/cache).
+    run_article_fetcher = BashOperator(
+        task_id="run_article_fetcher",
+        bash_command="python /opt/airflow/scripts/article_fetcher.py --limit 5000 --concurrency 32"
+    )
 
     # Define a ordem de execução das tarefas
-    create_raw_headlines_table >> run_g1_scraper >> ingest_data_to_postgres()
+    ingest_task = ingest_data_to_postgres()
+    backfill_raw_headline_keys() >> create_raw_headlines_table >> ensure_raw_headlines_partitions() >> refresh_seen_link_index() >> run_g1_scraper >> ingest_task >> run_article_fetcher
+    ingest_task >> apply_raw_headlines_retention()
+    run_g1_scraper >> publish_scrape_metrics()
 
 # Instancia a DAG para que o Airflow possa encontrá-la
 g1_scraping_pipeline()
\ No newline at end of file
@@ -0,0 +1,81 @@
+-- Tabela bronze de manchetes (idempotente: CREATE ... IF NOT EXISTS e DO blocks condicionais).
+-- Usada pelas DAGs g1_scraping_pipeline e g1_feed_discovery.
+--
+-- raw_headlines é particionada por mês de scraped_at (RANGE). As partições
+-- mensais (raw_headlines_AAAA_MM) são criadas pela task ensure_raw_headlines_partitions
+-- (scripts/raw_partitions.py); linhas fora delas caem em raw_headlines_default
+-- e são movidas quando a partição do mês é criada.
+--
+-- A unicidade global de `link` e `link_key` (que não pode ser garantida num
+-- índice particionado sem incluir scraped_at) fica em raw_headline_links,
+-- usada pelo INSERT ... ON CONFLICT da carga (scripts/raw_loader.py).
+
+-- Tabelas criadas por versões anteriores (sem partição): completa as colunas e
+-- renomeia para migrar os dados mais abaixo.
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_class WHERE oid = to_regclass('raw_headlines') AND relkind = 'r') THEN
+        ALTER TABLE raw_headlines ADD COLUMN IF NOT EXISTS canonical_link TEXT;
+        ALTER TABLE raw_headlines ADD COLUMN IF NOT EXISTS link_key BIGINT;
+        ALTER TABLE raw_headlines ADD COLUMN IF NOT EXISTS published_at TIMESTAMP WITH TIME ZONE;
+        ALTER TABLE raw_headlines RENAME TO raw_headlines_unpartitioned;
+    END IF;
+END
+$$;
+
+CREATE TABLE IF NOT EXISTS raw_headlines (
+    title TEXT,
+    link TEXT NOT NULL,
+    canonical_link TEXT,
+    link_key BIGINT,
+    source TEXT,
+    published_at TIMESTAMP WITH TIME ZONE,
+    scraped_at TIMESTAMP WITH TIME ZONE
+) PARTITION BY RANGE (scraped_at);
+
+CREATE TABLE IF NOT EXISTS raw_headlines_default PARTITION OF raw_headlines DEFAULT;
+
+CREATE TABLE IF NOT EXISTS raw_headline_links (
+    link TEXT PRIMARY KEY,
+    link_key BIGINT,
+    scraped_at TIMESTAMP WITH TIME ZONE
+);
+CREATE UNIQUE INDEX IF NOT EXISTS raw_headline_links_key_uq ON raw_headline_links (link_key);
+
+-- Migração da tabela antiga: uma linha por link (a primeira coletada) e uma por
+-- link_key (a do link coletado primeiro); os dados entram na partição default e
+-- são redistribuídos por mês pela task de partições. canonical_link/link_key das
+-- linhas antigas são preenchidos antes, pela task backfill_raw_headline_keys
+-- (raw_loader.backfill_link_keys), já que url_canon só existe em Python.
+DO $$
+BEGIN
+    IF to_regclass('raw_headlines_unpartitioned') IS NOT NULL THEN
+        WITH registered AS (
+            INSERT INTO raw_headline_links (link, link_key, scraped_at)
+            SELECT link, link_key, scraped_at
+            FROM (
+                SELECT DISTINCT ON (link) link, link_key, scraped_at
+                FROM raw_headlines_unpartitioned
+                WHERE link IS NOT NULL
+                ORDER BY link, scraped_at
+            ) first_seen
+            ORDER BY scraped_at
+            ON CONFLICT DO NOTHING
+            RETURNING link
+        )
+        INSERT INTO raw_headlines (title, link, canonical_link, link_key, source, published_at, scraped_at)
+        SELECT DISTINCT ON (u.link) u.title, u.link, u.canonical_link, u.link_key, u.source,
+               u.published_at, u.scraped_at
+        FROM raw_headlines_unpartitioned u
+        JOIN registered USING (link)
+        ORDER BY u.link, u.scraped_at;
+
+        DROP TABLE raw_headlines_unpartitioned;
+    END IF;
+END
+$$;
+
+-- Índices particionados: criados em todas as partições, inclusive as futuras
+CREATE INDEX IF NOT EXISTS idx_raw_headlines_link ON raw_headlines (link);
+CREATE INDEX IF NOT EXISTS idx_raw_headlines_link_key ON raw_headlines (link_key);
+CREATE INDEX IF NOT EXISTS idx_raw_headlines_scraped_at ON raw_headlines (scraped_at);
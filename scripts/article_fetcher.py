@@ -0,0 +1,332 @@
+"""Coleta do corpo e do lide das notícias para os links novos de raw_headlines.
+
+Etapa executada após a ingestão do scraping. Busca as páginas de artigo com um
+cliente HTTP assíncrono (aiohttp) com keep-alive, concorrência limitada e
+limite de requisições por host. Um cache em disco (SQLite) guarda ETag/Last-Modified
+e o conteúdo já extraído, de modo que re-buscas viram GETs condicionais (304).
+
+Falhas também viram linha na tabela (com `http_status` e `error`): respostas
+definitivas (404, 410 e demais 4xx) não são buscadas de novo; falhas
+transitórias (timeouts, erros de rede, 408/429 e 5xx) voltam para a fila nas
+execuções seguintes, até `MAX_FETCH_ATTEMPTS` tentativas.
+
+Saída: tabela bronze `bronze_article_bodies` (uma linha por link).
+
+Uso:
+    python scripts/article_fetcher.py --limit 5000 --concurrency 32 --per-host-rps 20
+"""
+import argparse
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+import lxml.html
+from psycopg2.extras import execute_values
+
+from pg_connection import get_postgres_connection
+from raw_partitions import pending_since
+from scraper_config import USER_AGENT
+
+CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'cache', 'article_http_cache.sqlite'
+)
+# Falhas transitórias são re-tentadas em execuções seguintes até este limite;
+# as demais respostas de erro são definitivas e não voltam para a fila.
+MAX_FETCH_ATTEMPTS = 3
+TRANSIENT_HTTP_STATUSES = (408, 425, 429)
+
+CREATE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS bronze_article_bodies (
+        link TEXT PRIMARY KEY,
+        article_title TEXT,
+        lead TEXT,
+        body TEXT,
+        published_at TIMESTAMP WITH TIME ZONE,
+        http_status INTEGER,
+        etag TEXT,
+        last_modified TEXT,
+        content_hash TEXT,
+        fetched_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+        error TEXT,
+        attempts INTEGER NOT NULL DEFAULT 1
+    );
+    ALTER TABLE bronze_article_bodies ADD COLUMN IF NOT EXISTS error TEXT;
+    ALTER TABLE bronze_article_bodies ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 1;
+"""
+
+PENDING_LINKS_SQL = """
+    SELECT r.link
+    FROM raw_headlines r
+    LEFT JOIN bronze_article_bodies b ON r.link = b.link
+    WHERE r.scraped_at >= %s
+      AND (b.link IS NULL
+           OR (b.error IS NOT NULL AND b.attempts < %s
+               AND (b.http_status IS NULL OR b.http_status >= 500 OR b.http_status IN %s)))
+    ORDER BY (b.link IS NOT NULL), r.scraped_at DESC
+    LIMIT %s
+"""
+
+UPSERT_SQL = """
+    INSERT INTO bronze_article_bodies
+        (link, article_title, lead, body, published_at, http_status, etag, last_modified, content_hash,
+         fetched_at, error)
+    VALUES %s
+    ON CONFLICT (link) DO UPDATE SET
+        article_title = EXCLUDED.article_title,
+        lead = EXCLUDED.lead,
+        body = EXCLUDED.body,
+        published_at = EXCLUDED.published_at,
+        http_status = EXCLUDED.http_status,
+        etag = EXCLUDED.etag,
+        last_modified = EXCLUDED.last_modified,
+        content_hash = EXCLUDED.content_hash,
+        fetched_at = EXCLUDED.fetched_at,
+        error = EXCLUDED.error,
+        attempts = bronze_article_bodies.attempts + 1
+"""
+
+
+def setup_logging():
+    """
+    Configura o sistema de logging.
+    """
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler(sys.stdout)]
+    )
+    return logging.getLogger(__name__)
+
+
+class HttpCache:
+    """Cache em SQLite de validadores HTTP e do conteúdo extraído de cada URL."""
+
+    def __init__(self, path: str = CACHE_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS article_cache (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                article_title TEXT,
+                lead TEXT,
+                body TEXT,
+                published_at TEXT,
+                content_hash TEXT,
+                fetched_at REAL
+            )
+        """)
+
+    def get(self, url: str) -> Optional[dict]:
+        row = self.conn.execute(
+            "SELECT etag, last_modified, article_title, lead, body, published_at, content_hash "
+            "FROM article_cache WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None:
+            return None
+        keys = ('etag', 'last_modified', 'article_title', 'lead', 'body', 'published_at', 'content_hash')
+        return dict(zip(keys, row))
+
+    def put(self, url: str, entry: dict):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO article_cache VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (url, entry.get('etag'), entry.get('last_modified'), entry.get('article_title'),
+             entry.get('lead'), entry.get('body'), entry.get('published_at'),
+             entry.get('content_hash'), time.time())
+        )
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+class HostRateLimiter:
+    """Espaça as requisições de cada host em pelo menos 1/rps segundos."""
+
+    def __init__(self, rps: float):
+        self.interval = 1.0 / rps if rps > 0 else 0.0
+        self.next_slot = {}
+        self.lock = asyncio.Lock()
+
+    async def wait(self, host: str):
+        if not self.interval:
+            return
+        async with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+def _first_text(doc, xpath: str) -> Optional[str]:
+    for node in doc.xpath(xpath):
+        value = node if isinstance(node, str) else node.text_content()
+        value = ' '.join(value.split())
+        if value:
+            return value
+    return None
+
+
+def parse_article(html: bytes) -> dict:
+    """Extrai título, lide, corpo e data de publicação de uma página de notícia do G1."""
+    doc = lxml.html.fromstring(html)
+    paragraphs = [
+        ' '.join(p.text_content().split())
+        for p in doc.xpath("//p[contains(concat(' ', normalize-space(@class), ' '), ' content-text__container ')]")
+    ]
+    if not paragraphs:
+        paragraphs = [' '.join(p.text_content().split()) for p in doc.xpath('//article//p')]
+    body = '\n'.join(p for p in paragraphs if p)
+
+    return {
+        'article_title': _first_text(doc, "//h1[contains(@class, 'content-head__title')] | //meta[@property='og:title']/@content"),
+        'lead': _first_text(doc, "//h2[contains(@class, 'content-head__subtitle')] | //meta[@property='og:description']/@content"),
+        'body': body or None,
+        'published_at': _first_text(doc, "//time[@itemprop='datePublished']/@datetime | //meta[@property='article:published_time']/@content"),
+        'content_hash': hashlib.sha256(body.encode('utf-8')).hexdigest() if body else None,
+    }
+
+
+async def fetch_article(session, url: str, cache: HttpCache, limiter: HostRateLimiter,
+                        semaphore: asyncio.Semaphore, stats: Counter, timeout_s: float) -> Optional[dict]:
+    """Busca uma URL com GET condicional e retorna o registro bronze.
+
+    Em erro, o registro traz só `link`, `http_status` (None em falha de rede) e `error`.
+    """
+    cached = cache.get(url)
+    headers = {}
+    if cached:
+        if cached['etag']:
+            headers['If-None-Match'] = cached['etag']
+        if cached['last_modified']:
+            headers['If-Modified-Since'] = cached['last_modified']
+
+    async with semaphore:
+        await limiter.wait(urlsplit(url).hostname or '')
+        try:
+            async with session.get(url, headers=headers,
+                                   timeout=aiohttp.ClientTimeout(total=timeout_s)) as response:
+                status = response.status
+                if status == 304 and cached:
+                    stats['not_modified'] += 1
+                    entry = dict(cached)
+                elif status == 200:
+                    html = await response.read()
+                    entry = await asyncio.to_thread(parse_article, html)
+                    entry['etag'] = response.headers.get('ETag')
+                    entry['last_modified'] = response.headers.get('Last-Modified')
+                    cache.put(url, entry)
+                    stats['fetched'] += 1
+                else:
+                    stats[f'http_{status}'] += 1
+                    return {'link': url, 'http_status': status, 'error': f'http_{status}'}
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            stats['errors'] += 1
+            logging.debug(f"[Artigos] Erro em {url}: {e!r}")
+            return {'link': url, 'http_status': None, 'error': type(e).__name__}
+
+    entry['link'] = url
+    entry['http_status'] = status
+    entry['error'] = None
+    return entry
+
+
+async def fetch_articles(links: list, concurrency: int = 32, per_host_rps: float = 20,
+                         timeout_s: float = 20, cache_path: str = CACHE_PATH) -> tuple:
+    """Busca todos os links com concorrência limitada; retorna (registros, estatísticas)."""
+    cache = HttpCache(cache_path)
+    limiter = HostRateLimiter(per_host_rps)
+    semaphore = asyncio.Semaphore(concurrency)
+    stats = Counter()
+    connector = aiohttp.TCPConnector(limit=concurrency, ttl_dns_cache=300, keepalive_timeout=30)
+    try:
+        async with aiohttp.ClientSession(connector=connector,
+                                         headers={'User-Agent': USER_AGENT,
+                                                  'Accept-Language': 'pt-BR,pt;q=0.9'}) as session:
+            tasks = [fetch_article(session, url, cache, limiter, semaphore, stats, timeout_s)
+                     for url in links]
+            records = []
+            for completed, done in enumerate(asyncio.as_completed(tasks), start=1):
+                records.append(await done)
+                if completed % 500 == 0:
+                    cache.commit()
+    finally:
+        cache.close()
+    return records, stats
+
+
+def save_article_bodies(records: list, conn, logger) -> int:
+    """Grava os registros em bronze_article_bodies (upsert em lote)."""
+    if not records:
+        return 0
+    fetched_at = datetime.now(timezone.utc)
+    values = [
+        (r['link'], r.get('article_title'), r.get('lead'), r.get('body'), r.get('published_at'),
+         r['http_status'], r.get('etag'), r.get('last_modified'), r.get('content_hash'), fetched_at,
+         r.get('error'))
+        for r in records
+    ]
+    with conn.cursor() as cur:
+        execute_values(cur, UPSERT_SQL, values, page_size=1000)
+    conn.commit()
+    failures = sum(1 for r in records if r.get('error'))
+    logger.info(f"💾 {len(values)} artigos gravados em bronze_article_bodies ({failures} com falha).")
+    return len(values)
+
+
+def main(limit: int = 5000, concurrency: int = 32, per_host_rps: float = 20, timeout_s: float = 20):
+    """
+    Busca os artigos dos links ainda sem corpo na camada bronze.
+    """
+    logger = setup_logging()
+    conn = get_postgres_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(CREATE_TABLE_SQL)
+            cur.execute(PENDING_LINKS_SQL,
+                        (pending_since(), MAX_FETCH_ATTEMPTS, TRANSIENT_HTTP_STATUSES, limit))
+            links = [row[0] for row in cur.fetchall()]
+        conn.commit()
+
+        if not links:
+            logger.info("✅ Nenhum artigo novo para buscar.")
+            return
+
+        logger.info(f"🔍 Buscando {len(links)} artigos (concorrência {concurrency}, {per_host_rps} req/s por host)...")
+        start = time.perf_counter()
+        records, stats = asyncio.run(fetch_articles(links, concurrency, per_host_rps, timeout_s))
+        duration = time.perf_counter() - start
+
+        save_article_bodies(records, conn, logger)
+        fetched = sum(1 for r in records if not r.get('error'))
+        logger.info(
+            f"📊 {fetched}/{len(links)} artigos em {duration:.1f}s "
+            f"({len(links) / max(duration, 1e-6):.0f} artigos/s) | {dict(stats)}"
+        )
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Coleta do corpo das notícias (bronze)')
+    parser.add_argument('--limit', type=int, default=5000, help='Máximo de links por execução')
+    parser.add_argument('--concurrency', type=int, default=32, help='Requisições simultâneas')
+    parser.add_argument('--per-host-rps', type=float, default=20, help='Requisições por segundo por host')
+    parser.add_argument('--timeout', type=float, default=20, help='Timeout por requisição (s)')
+    args = parser.parse_args()
+    main(args.limit, args.concurrency, args.per_host_rps, args.timeout)
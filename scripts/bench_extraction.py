@@ -0,0 +1,204 @@
+"""Benchmark offline das estratégias de extração de manchetes do scraper.
+
+Roda sobre uma fixture salva com `scraper.py --engine playwright --capture`
+(ou captura o DOM ao vivo uma única vez com `--url`) e mede, para cada
+estratégia, a latência por fase e a vazão em manchetes/s:
+
+    evaluate  carga da fixture + wait_for_selector + um único page.evaluate
+    handles   carga da fixture + wait_for_selector + ElementHandle por elemento
+    lxml      parse do HTML estático (engine requests)
+
+Uso:
+    python scripts/bench_extraction.py --fixture data/fixtures/g1_home_X.html.gz --repeat 5
+    python scripts/bench_extraction.py --fixture F --json results.json
+    python scripts/bench_extraction.py --fixture F --baseline results.json --max-regression 25
+"""
+import argparse
+import json
+import logging
+import statistics
+import sys
+import time
+
+from scraper import (
+    BASE_URL,
+    EXTRACTORS,
+    _PLAYWRIGHT_AVAILABLE,
+    load_fixture,
+    open_fixture_page,
+    parse_headlines_html,
+)
+
+if _PLAYWRIGHT_AVAILABLE:
+    from playwright.sync_api import sync_playwright
+
+STRATEGIES = list(EXTRACTORS) + ['lxml']
+
+
+def _ms(start: float) -> float:
+    return (time.perf_counter() - start) * 1000
+
+
+def capture_live_dom(url: str, scrolls: int, timeout_ms: int) -> str:
+    """Carrega a página ao vivo, faz os scrolls e retorna o DOM renderizado."""
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        try:
+            page = browser.new_page(viewport={'width': 1920, 'height': 1080})
+            page.goto(url, timeout=timeout_ms, wait_until='domcontentloaded')
+            page.wait_for_selector('[data-mrf-layout-title]', timeout=timeout_ms)
+            for _ in range(scrolls):
+                page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
+                page.wait_for_timeout(2000)
+            return page.content()
+        finally:
+            browser.close()
+
+
+def run_browser_strategy(browser, html: str, name: str) -> tuple:
+    """Uma execução de uma estratégia do Playwright; retorna (fases em ms, linhas)."""
+    page = browser.new_page(viewport={'width': 1920, 'height': 1080})
+    try:
+        start = time.perf_counter()
+        open_fixture_page(page, html)
+        load_ms = _ms(start)
+
+        start = time.perf_counter()
+        page.wait_for_selector('[data-mrf-layout-title]', state='attached')
+        wait_ms = _ms(start)
+
+        start = time.perf_counter()
+        rows = EXTRACTORS[name](page, set())
+        extract_ms = _ms(start)
+    finally:
+        page.close()
+    return {'load': load_ms, 'wait_selector': wait_ms, 'extract': extract_ms}, rows
+
+
+def run_lxml_strategy(html: str) -> tuple:
+    """Uma execução do parser estático; retorna (fases em ms, linhas)."""
+    body = html.encode('utf-8')
+    start = time.perf_counter()
+    rows = parse_headlines_html(body, f"{BASE_URL}/", set(), set())
+    return {'extract': _ms(start)}, rows
+
+
+def summarize(name: str, runs: list) -> dict:
+    """Agrega as execuções de uma estratégia em medianas por fase."""
+    phases = {phase: statistics.median(r[0][phase] for r in runs) for phase in runs[0][0]}
+    total_ms = sum(phases.values())
+    rows = runs[-1][1]
+    return {
+        'strategy': name,
+        'rows': len(rows),
+        'links': [row['link'] for row in rows],
+        'phases_ms': phases,
+        'total_ms': total_ms,
+        'extract_min_ms': min(r[0]['extract'] for r in runs),
+        'headlines_per_s': len(rows) / (phases['extract'] / 1000) if phases['extract'] else 0.0,
+    }
+
+
+def benchmark(html: str, repeat: int, strategies: list) -> list:
+    """Mede cada estratégia `repeat` vezes sobre o mesmo HTML."""
+    results = []
+    browser_strategies = [s for s in strategies if s in EXTRACTORS]
+
+    if browser_strategies:
+        if not _PLAYWRIGHT_AVAILABLE:
+            raise SystemExit("Playwright não está instalado ou não pôde ser importado.")
+        with sync_playwright() as p:
+            browser = p.chromium.launch(headless=True)
+            try:
+                for name in browser_strategies:
+                    runs = [run_browser_strategy(browser, html, name) for _ in range(repeat)]
+                    results.append(summarize(name, runs))
+            finally:
+                browser.close()
+
+    if 'lxml' in strategies:
+        results.append(summarize('lxml', [run_lxml_strategy(html) for _ in range(repeat)]))
+
+    return results
+
+
+def print_report(results: list):
+    print(f"{'estratégia':<10} {'manchetes':>9} {'carga':>9} {'seletor':>9} "
+          f"{'extração':>10} {'total':>9} {'manchetes/s':>12}")
+    for r in results:
+        ph = r['phases_ms']
+        print(f"{r['strategy']:<10} {r['rows']:>9} {ph.get('load', 0):>9.1f} "
+              f"{ph.get('wait_selector', 0):>9.1f} {ph['extract']:>10.1f} "
+              f"{r['total_ms']:>9.1f} {r['headlines_per_s']:>12.0f}")
+    print("(tempos em ms, medianas)")
+
+    by_name = {r['strategy']: r for r in results}
+    if 'evaluate' in by_name and 'handles' in by_name:
+        speedup = by_name['handles']['phases_ms']['extract'] / max(by_name['evaluate']['phases_ms']['extract'], 1e-6)
+        same = by_name['handles']['links'] == by_name['evaluate']['links']
+        print(f"\nSpeedup evaluate vs handles (extração): {speedup:.1f}x")
+        print(f"Resultados idênticos: {'sim' if same else 'NÃO'}")
+
+
+def check_regressions(results: list, baseline_path: str, max_regression_pct: float) -> list:
+    """Compara a extração mediana com um baseline salvo por `--json`."""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {r['strategy']: r for r in json.load(f)}
+    regressions = []
+    for r in results:
+        base = baseline.get(r['strategy'])
+        if not base:
+            continue
+        before, after = base['phases_ms']['extract'], r['phases_ms']['extract']
+        change_pct = (after - before) / max(before, 1e-6) * 100
+        if change_pct > max_regression_pct:
+            regressions.append(f"{r['strategy']}: extração {before:.1f}ms -> {after:.1f}ms (+{change_pct:.0f}%)")
+        if r['rows'] < base['rows']:
+            regressions.append(f"{r['strategy']}: manchetes {base['rows']} -> {r['rows']}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark de extração do scraper G1')
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--fixture', help='Fixture .html.gz gerada com --capture')
+    source.add_argument('--url', default=f"{BASE_URL}/", help='Página ao vivo (capturada uma vez)')
+    parser.add_argument('--strategies', default=','.join(STRATEGIES),
+                        help=f"Estratégias separadas por vírgula (default: {','.join(STRATEGIES)})")
+    parser.add_argument('--repeat', type=int, default=5, help='Execuções por estratégia')
+    parser.add_argument('--scrolls', type=int, default=3, help='Scrolls antes da captura ao vivo')
+    parser.add_argument('--timeout-ms', type=int, default=60000)
+    parser.add_argument('--json', dest='json_path', help='Salvar resultados em JSON (baseline)')
+    parser.add_argument('--baseline', help='JSON de uma execução anterior para comparação')
+    parser.add_argument('--max-regression', type=float, default=25.0,
+                        help='Piora máxima aceita na extração mediana, em %% (default: 25)')
+    args = parser.parse_args()
+
+    strategies = [s for s in args.strategies.split(',') if s]
+    unknown = set(strategies) - set(STRATEGIES)
+    if unknown:
+        parser.error(f"Estratégias desconhecidas: {', '.join(sorted(unknown))}")
+
+    logging.getLogger().setLevel(logging.WARNING)
+    if args.fixture:
+        html = load_fixture(args.fixture)
+    else:
+        if not _PLAYWRIGHT_AVAILABLE:
+            raise SystemExit("Playwright não está instalado ou não pôde ser importado.")
+        html = capture_live_dom(args.url, args.scrolls, args.timeout_ms)
+
+    results = benchmark(html, args.repeat, strategies)
+    print_report(results)
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump([{k: v for k, v in r.items() if k != 'links'} for r in results], f, indent=2)
+
+    if args.baseline:
+        regressions = check_regressions(results, args.baseline, args.max_regression)
+        if regressions:
+            print("\nRegressões detectadas:")
+            for line in regressions:
+                print(f"  - {line}")
+            sys.exit(1)
+        print("\nSem regressões em relação ao baseline.")
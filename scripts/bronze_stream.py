@@ -0,0 +1,151 @@
+"""Envio das manchetes direto para a tabela bronze durante a coleta (modo `--stream`).
+
+Em vez de esperar o fim da execução e a task de ingestão, o scraper entrega
+as linhas a um `BronzeStreamWriter` assim que são extraídas. O writer acumula
+pequenos lotes (`batch_rows` linhas ou `flush_interval_s` segundos, o que vier
+primeiro) e os grava com o mesmo COPY + upsert da ingestão
+(`raw_loader.copy_upsert_headlines`), usando conexões de um pool compartilhado.
+
+O arquivo Parquet/CSV continua opcional, para replay. Quando ele é gravado
+depois de um streaming completo, o lote entra no ledger como já carregado,
+e a ingestão só o arquiva. Se o banco falhar no meio da coleta, o streaming é
+desligado e o arquivo segue o caminho normal (ingestão pelo ledger); as
+linhas já enviadas são reconhecidas como duplicadas.
+"""
+import logging
+import threading
+import time
+
+from pg_connection import postgres_settings
+from raw_loader import CREATE_LEDGER_SQL, copy_upsert_headlines, record_loaded_batch
+
+DEFAULT_BATCH_ROWS = 200
+DEFAULT_FLUSH_INTERVAL_S = 2.0
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_connection_pool(minconn: int = 1, maxconn: int = 4):
+    """Pool de conexões PostgreSQL do processo (criado na primeira chamada)."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            from psycopg2.pool import ThreadedConnectionPool
+
+            _POOL = ThreadedConnectionPool(minconn, maxconn, **postgres_settings())
+        return _POOL
+
+
+def close_connection_pool():
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.closeall()
+            _POOL = None
+
+
+class BronzeStreamWriter:
+    """Acumula linhas extraídas e as grava em raw_headlines em pequenos lotes.
+
+    Pode ser usado de várias threads (ex.: `asyncio.to_thread` no crawl). Depois
+    de uma falha de escrita, `failed` fica True e as linhas seguintes são ignoradas.
+    """
+
+    def __init__(self, batch_rows: int = DEFAULT_BATCH_ROWS,
+                 flush_interval_s: float = DEFAULT_FLUSH_INTERVAL_S, pool=None, metrics=None):
+        self.batch_rows = batch_rows
+        self.flush_interval_s = flush_interval_s
+        self.pool = pool
+        self.metrics = metrics
+        self.failed = False
+        self.counts = {'rows': 0, 'invalid': 0, 'inserted': 0, 'updated': 0, 'duplicates': 0}
+        self.batches = 0
+        self._buffer = []
+        self._buffer_since = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        if self.pool is None:
+            self.pool = get_connection_pool()
+        return self.pool
+
+    def write(self, rows: list):
+        """Adiciona linhas ao lote; grava quando o lote enche ou o intervalo expira."""
+        if self.failed or not rows:
+            return
+        with self._lock:
+            if not self._buffer:
+                self._buffer_since = time.monotonic()
+            self._buffer.extend(rows)
+            due = (len(self._buffer) >= self.batch_rows
+                   or time.monotonic() - self._buffer_since >= self.flush_interval_s)
+            if due:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        batch, self._buffer = self._buffer, []
+        if not batch or self.failed:
+            return
+        flush_start = time.perf_counter()
+        try:
+            pool = self._get_pool()
+            conn = pool.getconn()
+            try:
+                counts = copy_upsert_headlines(conn, batch)
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                pool.putconn(conn)
+        except Exception as e:
+            self.failed = True
+            logging.error(
+                f"[Stream] Falha ao gravar {len(batch)} linhas em raw_headlines: {e!r}. "
+                "Streaming desativado; o lote seguirá pela ingestão do arquivo."
+            )
+            if self.metrics is not None:
+                self.metrics.set('stream_failed', 1)
+            return
+
+        self.batches += 1
+        for key in self.counts:
+            self.counts[key] += counts[key]
+        if self.metrics is not None:
+            self.metrics.record('stream_flush', (time.perf_counter() - flush_start) * 1000)
+
+    def close(self) -> dict:
+        """Grava o que restar no lote e retorna as contagens acumuladas."""
+        self.flush()
+        if self.metrics is not None:
+            self.metrics.set('stream_batches', self.batches)
+            self.metrics.set('stream_inserted', self.counts['inserted'])
+            self.metrics.set('stream_duplicates', self.counts['duplicates'])
+        logging.info(
+            f"[Stream] {self.batches} lotes gravados: {self.counts['inserted']} manchetes inseridas, "
+            f"{self.counts['duplicates']} duplicadas" + (" (interrompido por falha)" if self.failed else '')
+        )
+        return dict(self.counts)
+
+    def mark_batch_loaded(self, manifest: dict) -> bool:
+        """Registra o arquivo de replay no ledger como já carregado (só se o streaming foi completo)."""
+        if self.failed:
+            return False
+        pool = self._get_pool()
+        conn = pool.getconn()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(CREATE_LEDGER_SQL)
+            record_loaded_batch(conn, manifest, self.counts)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logging.error(f"[Stream] Não foi possível registrar {manifest['run_id']} no ledger: {e!r}")
+            return False
+        finally:
+            pool.putconn(conn)
+        return True
@@ -0,0 +1,219 @@
+"""Descoberta de manchetes por feeds RSS/Atom e sitemaps de notícias do G1.
+
+Alternativa barata ao navegador: cada URL configurada é buscada com GET
+condicional (ETag/Last-Modified guardados em `data/cache/feed_validators.json`)
+e o XML é lido em streaming com `lxml.etree.iterparse`, limpando cada item
+depois de processado, de modo que a memória fica constante mesmo em sitemaps
+grandes.
+
+Formatos suportados:
+    RSS 2.0         <item><title/><link/><pubDate/></item>
+    Atom            <entry><title/><link href/><published/></entry>
+    Sitemap         <url><loc/><news:news><news:title/><news:publication_date/></news:news></url>
+    Sitemap index   <sitemap><loc/></sitemap>  (os sitemaps filhos são seguidos)
+
+Sitemaps sem a extensão de notícias (`news:title`) não trazem título e não
+geram linhas. A lista de URLs pode ser sobrescrita por SCRAPER_FEED_URLS
+(separadas por vírgula) ou pelo argumento `--feeds` do scraper.
+"""
+import gzip
+import json
+import logging
+import os
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import Iterator, Optional
+
+from lxml import etree
+
+DEFAULT_FEED_URLS = (
+    'https://g1.globo.com/rss/g1/',
+    'https://g1.globo.com/rss/g1/economia/',
+    'https://g1.globo.com/rss/g1/politica/',
+    'https://g1.globo.com/rss/g1/mundo/',
+    'https://g1.globo.com/rss/g1/tecnologia/',
+    'https://g1.globo.com/rss/g1/ciencia-e-saude/',
+    'https://g1.globo.com/rss/g1/educacao/',
+    'https://g1.globo.com/rss/g1/natureza/',
+)
+VALIDATORS_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'cache', 'feed_validators.json'
+)
+FEED_ACCEPT = 'application/rss+xml, application/atom+xml, application/xml;q=0.9, text/xml;q=0.8'
+
+_ENTRY_TAGS = {'item', 'entry', 'url', 'sitemap'}
+
+
+def feed_urls_from_env() -> list:
+    """URLs de SCRAPER_FEED_URLS, ou a lista padrão de feeds RSS do G1."""
+    raw = os.getenv('SCRAPER_FEED_URLS')
+    if raw:
+        return [url.strip() for url in raw.split(',') if url.strip()]
+    return list(DEFAULT_FEED_URLS)
+
+
+def load_validators(path: str = VALIDATORS_PATH) -> dict:
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_validators(validators: dict, path: str = VALIDATORS_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(validators, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def parse_feed_date(value: Optional[str]) -> Optional[str]:
+    """Converte datas RFC 822 (RSS) ou ISO 8601 (Atom/sitemap) em ISO 8601 com fuso."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        try:
+            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.astimezone()
+    return parsed.isoformat()
+
+
+def _local(tag) -> str:
+    return etree.QName(tag).localname if isinstance(tag, str) else ''
+
+
+def _child_text(elem, *names) -> Optional[str]:
+    """Texto do primeiro descendente cujo nome local esteja em `names` (na ordem dada)."""
+    found = {}
+    for child in elem.iter():
+        name = _local(child.tag)
+        if name in names and name not in found and child.text and child.text.strip():
+            found[name] = ' '.join(child.text.split())
+    for name in names:
+        if name in found:
+            return found[name]
+    return None
+
+
+def _atom_link(elem) -> Optional[str]:
+    for child in elem:
+        if _local(child.tag) == 'link' and child.get('rel', 'alternate') == 'alternate':
+            return child.get('href')
+    return None
+
+
+def iter_feed_entries(stream) -> Iterator[dict]:
+    """Lê um feed/sitemap em streaming; produz dicts com kind, title, link e published_at.
+
+    `kind` é 'entry' para notícias e 'sitemap' para sitemaps filhos de um índice.
+    """
+    for _, elem in etree.iterparse(stream, events=('end',), recover=True, huge_tree=True,
+                                   resolve_entities=False, no_network=True):
+        name = _local(elem.tag)
+        if name not in _ENTRY_TAGS:
+            continue
+
+        if name == 'sitemap':
+            yield {'kind': 'sitemap', 'link': _child_text(elem, 'loc')}
+        elif name == 'url':
+            yield {
+                'kind': 'entry',
+                'title': _child_text(elem, 'title'),
+                'link': _child_text(elem, 'loc'),
+                'published_at': parse_feed_date(_child_text(elem, 'publication_date', 'lastmod')),
+            }
+        elif name == 'entry':
+            yield {
+                'kind': 'entry',
+                'title': _child_text(elem, 'title'),
+                'link': _atom_link(elem),
+                'published_at': parse_feed_date(_child_text(elem, 'published', 'updated')),
+            }
+        else:
+            yield {
+                'kind': 'entry',
+                'title': _child_text(elem, 'title'),
+                'link': _child_text(elem, 'link', 'guid'),
+                'published_at': parse_feed_date(_child_text(elem, 'pubDate', 'date')),
+            }
+
+        # Libera o item e os irmãos já processados para manter a memória constante
+        elem.clear()
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+
+
+def fetch_feed(session, url: str, validators: dict, timeout_s: float = 15,
+               stats: Optional[dict] = None) -> Iterator[dict]:
+    """Busca um feed com GET condicional e produz as entradas.
+
+    Em caso de 304 não produz notícias; para índices de sitemap, produz os
+    sitemaps filhos guardados (eles podem mudar sem que o índice mude).
+    """
+    stats = stats if stats is not None else {}
+    cached = validators.get(url, {})
+    headers = {'Accept': FEED_ACCEPT}
+    if cached.get('etag'):
+        headers['If-None-Match'] = cached['etag']
+    if cached.get('last_modified'):
+        headers['If-Modified-Since'] = cached['last_modified']
+
+    with session.get(url, headers=headers, timeout=timeout_s, stream=True) as response:
+        if response.status_code == 304:
+            stats['not_modified'] = stats.get('not_modified', 0) + 1
+            logging.info(f"[Feeds] {url}: sem alterações (304)")
+            for child in cached.get('children', []):
+                yield {'kind': 'sitemap', 'link': child}
+            return
+        response.raise_for_status()
+        stats['fetched'] = stats.get('fetched', 0) + 1
+
+        response.raw.decode_content = True
+        stream = gzip.GzipFile(fileobj=response.raw) if url.endswith('.gz') else response.raw
+        children = []
+        for entry in iter_feed_entries(stream):
+            if entry['kind'] == 'sitemap' and entry['link']:
+                children.append(entry['link'])
+            yield entry
+
+        # Só grava os validadores depois de ler o documento inteiro
+        validators[url] = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+        }
+        if children:
+            validators[url]['children'] = children
+
+
+def discover_entries(session, urls: list, validators: dict, timeout_s: float = 15,
+                     max_child_sitemaps: int = 20, stats: Optional[dict] = None) -> Iterator[dict]:
+    """Percorre feeds e sitemaps (seguindo até `max_child_sitemaps` sitemaps filhos)."""
+    stats = stats if stats is not None else {}
+    pending = list(urls)
+    visited = set()
+    children = 0
+    while pending:
+        url = pending.pop(0)
+        if url in visited:
+            continue
+        visited.add(url)
+        try:
+            for entry in fetch_feed(session, url, validators, timeout_s, stats):
+                if entry['kind'] == 'sitemap':
+                    if entry['link'] and children < max_child_sitemaps:
+                        pending.append(entry['link'])
+                        children += 1
+                    continue
+                yield entry
+        except Exception as e:
+            stats['errors'] = stats.get('errors', 0) + 1
+            logging.error(f"[Feeds] Erro ao ler {url}: {e!r}")
@@ -0,0 +1,182 @@
+"""Cache persistente das respostas do LLM, endereçado pelo conteúdo da manchete.
+
+A mesma manchete aparece com links diferentes (republicações, seções, recoletas)
+e a classificação não depende do link. A chave do cache é o SHA-256 de:
+
+    título normalizado | versão do prompt | modelo | temperatura
+
+então mudar o prompt (PROMPT_VERSION em llm_enricher), o modelo ou a temperatura
+invalida as entradas antigas sem apagar nada. Um acerto devolve sentimento,
+categoria e confiança sem chamar a OpenAI; o registro silver é gravado normalmente.
+
+As entradas ficam na tabela `llm_response_cache` do próprio PostgreSQL:
+    - expiram `ttl_days` dias depois de gravadas (LLM_CACHE_TTL_DAYS);
+    - acima de `max_entries` (LLM_CACHE_MAX_ENTRIES), `evict` remove as usadas
+      há mais tempo;
+    - respostas com 'Erro' não são guardadas.
+"""
+import hashlib
+import logging
+import os
+import re
+import unicodedata
+from typing import Iterable, Optional
+
+from psycopg2.extras import execute_values
+
+DEFAULT_TTL_DAYS = 30
+DEFAULT_MAX_ENTRIES = 200_000
+
+CREATE_CACHE_SQL = """
+    CREATE TABLE IF NOT EXISTS llm_response_cache (
+        cache_key CHAR(64) PRIMARY KEY,
+        sentiment VARCHAR(20) NOT NULL,
+        category VARCHAR(50) NOT NULL,
+        confidence_score FLOAT NOT NULL,
+        model_used VARCHAR(50) NOT NULL,
+        prompt_version VARCHAR(20) NOT NULL,
+        created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        last_hit_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        hits INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE INDEX IF NOT EXISTS idx_llm_response_cache_last_hit ON llm_response_cache (last_hit_at);
+"""
+
+LOOKUP_SQL = """
+    UPDATE llm_response_cache
+    SET last_hit_at = now(), hits = hits + 1
+    WHERE cache_key = ANY(%s)
+    AND created_at >= now() - make_interval(days => %s)
+    RETURNING cache_key, sentiment, category, confidence_score
+"""
+
+STORE_SQL = """
+    INSERT INTO llm_response_cache
+        (cache_key, sentiment, category, confidence_score, model_used, prompt_version)
+    VALUES %s
+    ON CONFLICT (cache_key) DO UPDATE SET
+        sentiment = EXCLUDED.sentiment,
+        category = EXCLUDED.category,
+        confidence_score = EXCLUDED.confidence_score,
+        created_at = now(),
+        last_hit_at = now()
+"""
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_title(title: str) -> str:
+    """Forma canônica do título: NFKC, sem diferença de caixa e com espaços colapsados."""
+    return _WHITESPACE_RE.sub(' ', unicodedata.normalize('NFKC', title or '')).strip().casefold()
+
+
+def cache_key(title: str, prompt_version: str, model: str, temperature: float) -> str:
+    payload = '\x1f'.join((normalize_title(title), prompt_version, model, repr(float(temperature))))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LlmResponseCache:
+    """Consulta e grava respostas do LLM em `llm_response_cache`, contando acertos e faltas."""
+
+    def __init__(self, conn, model: str, temperature: float, prompt_version: str,
+                 ttl_days: Optional[int] = None, max_entries: Optional[int] = None):
+        self.conn = conn
+        self.model = model
+        self.temperature = temperature
+        self.prompt_version = prompt_version
+        self.ttl_days = ttl_days if ttl_days is not None else int(os.getenv('LLM_CACHE_TTL_DAYS', DEFAULT_TTL_DAYS))
+        self.max_entries = (max_entries if max_entries is not None
+                            else int(os.getenv('LLM_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)))
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.evicted = 0
+        with conn.cursor() as cur:
+            cur.execute(CREATE_CACHE_SQL)
+        conn.commit()
+
+    def key(self, title: str) -> str:
+        return cache_key(title, self.prompt_version, self.model, self.temperature)
+
+    def lookup(self, titles: list) -> list:
+        """Análise em cache de cada título (None quando não há), na mesma ordem."""
+        keys = [self.key(title) for title in titles]
+        if not keys:
+            return []
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute(LOOKUP_SQL, (sorted(set(keys)), self.ttl_days))
+                found = {row[0]: {'sentiment': row[1], 'category': row[2], 'confidence': row[3],
+                                  'processing_time': 0.0}
+                         for row in cur.fetchall()}
+            self.conn.commit()
+        except Exception as e:
+            self.conn.rollback()
+            logging.warning(f"[Cache] Falha na consulta ao cache de respostas: {e!r}")
+            found = {}
+        results = [dict(found[key]) if key in found else None for key in keys]
+        hits = sum(result is not None for result in results)
+        self.hits += hits
+        self.misses += len(results) - hits
+        return results
+
+    def store(self, analyses: Iterable[tuple]):
+        """Grava pares (título, análise) vindos da API; análises com 'Erro' são ignoradas."""
+        entries = {}
+        for title, analysis in analyses:
+            if analysis['sentiment'] == 'Erro' or analysis['category'] == 'Erro':
+                continue
+            entries[self.key(title)] = (analysis['sentiment'], analysis['category'],
+                                        float(analysis['confidence']), self.model, self.prompt_version)
+        if not entries:
+            return 0
+        try:
+            with self.conn.cursor() as cur:
+                execute_values(cur, STORE_SQL, [(key, *values) for key, values in entries.items()])
+            self.conn.commit()
+        except Exception as e:
+            self.conn.rollback()
+            logging.warning(f"[Cache] Falha ao gravar {len(entries)} respostas no cache: {e!r}")
+            return 0
+        self.stored += len(entries)
+        return len(entries)
+
+    def evict(self) -> int:
+        """Remove entradas expiradas e, acima de `max_entries`, as usadas há mais tempo."""
+        with self.conn.cursor() as cur:
+            cur.execute("DELETE FROM llm_response_cache WHERE created_at < now() - make_interval(days => %s)",
+                        (self.ttl_days,))
+            removed = cur.rowcount
+            cur.execute("""
+                DELETE FROM llm_response_cache
+                WHERE cache_key IN (
+                    SELECT cache_key FROM llm_response_cache
+                    ORDER BY last_hit_at DESC
+                    OFFSET %s
+                )
+            """, (self.max_entries,))
+            removed += cur.rowcount
+        self.conn.commit()
+        self.evicted += removed
+        if removed:
+            logging.info(f"[Cache] {removed} entradas removidas do cache de respostas")
+        return removed
+
+    def size(self) -> Optional[int]:
+        """Número de entradas na tabela (None se a contagem falhar)."""
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("SELECT COUNT(*) FROM llm_response_cache")
+                entries = cur.fetchone()[0]
+            self.conn.commit()
+        except Exception as e:
+            self.conn.rollback()
+            logging.warning(f"[Cache] Falha ao contar as entradas do cache de respostas: {e!r}")
+            return None
+        return entries
+
+    def summary(self) -> dict:
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'stored': self.stored,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'evicted': self.evicted, 'entries': self.size(), 'max_entries': self.max_entries}
@@ -1,13 +1,29 @@
 import os
+import asyncio
+import io
+import shutil
+import time
 import pandas as pd
 import logging
-from openai import OpenAI
-from dotenv import load_dotenv
+from email.utils import parsedate_to_datetime
+from openai import (
+    APIConnectionError,
+    APITimeoutError,
+    AsyncOpenAI,
+    InternalServerError,
+    OpenAI,
+    RateLimitError,
+)
 from sqlalchemy import create_engine, text
 import json
 from datetime import datetime
 import sys
-import psycopg2
+
+from llm_cache import LlmResponseCache, normalize_title
+from local_classifier import LocalClassifier
+from near_dup_index import NearDupIndex
+from pg_connection import get_postgres_connection, postgres_settings
+from raw_partitions import pending_since
 
 def setup_logging():
     """
@@ -27,17 +43,10 @@ def get_database_engine():
     """
     Cria e retorna a engine de conexão com o banco de dados.
     """
-    load_dotenv()
-    
-    # Configurações do banco de dados
-    DB_HOST = os.getenv("POSTGRES_HOST", "postgres")  # Usando 'postgres' como padrão (nome do serviço no Docker)
-    DB_PORT = os.getenv("POSTGRES_PORT", "5432")
-    DB_NAME = os.getenv("POSTGRES_DB", "airflow")
-    DB_USER = os.getenv("POSTGRES_USER", "airflow")
-    DB_PASSWORD = os.getenv("POSTGRES_PASSWORD", "airflow")
+    db = postgres_settings()
     
     # String de conexão
-    connection_string = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+    connection_string = f"postgresql://{db['user']}:{db['password']}@{db['host']}:{db['port']}/{db['database']}"
     
     try:
         engine = create_engine(
@@ -52,20 +61,6 @@ def get_database_engine():
     except Exception as e:
         raise Exception(f"Erro ao conectar com o banco de dados: {e}")
 
-def get_postgres_connection():
-    """
-    Cria uma conexão PostgreSQL direta usando psycopg2.
-    """
-    load_dotenv()
-    
-    return psycopg2.connect(
-        host=os.getenv("POSTGRES_HOST", "postgres"),  # Usando 'postgres' como padrão (nome do serviço no Docker)
-        port=os.getenv("POSTGRES_PORT", "5432"),
-        database=os.getenv("POSTGRES_DB", "airflow"),
-        user=os.getenv("POSTGRES_USER", "airflow"),
-        password=os.getenv("POSTGRES_PASSWORD", "airflow")
-    )
-
 def get_openai_client(logger):
     """
     Configura e retorna o cliente OpenAI.
@@ -89,21 +84,28 @@ def get_openai_client(logger):
         logger.error(f"Erro ao configurar cliente OpenAI: {e}")
         raise
 
-def get_unprocessed_headlines(engine, logger, batch_size=50):
+def get_unprocessed_headlines(engine, logger, batch_size=50, exclude_links=None):
     """
     Obtém manchetes que ainda não foram processadas.
+
+    Só olha a janela recente de raw_headlines (RAW_PENDING_LOOKBACK_DAYS): o
+    limite vai como literal, e o PostgreSQL poda as partições mensais antigas.
+    `exclude_links` tira da lista manchetes já enviadas num job da Batch API.
     """
     try:
         query = text("""
         SELECT r.*
         FROM raw_headlines r
         LEFT JOIN silver_enriched_headlines s ON r.link = s.raw_link
-        WHERE s.raw_link IS NULL
+        WHERE r.scraped_at >= :since
+        AND s.raw_link IS NULL
+        AND NOT (r.link = ANY(:exclude))
         LIMIT :limit
         """)
         
         with engine.connect() as conn:
-            result = conn.execute(query, {"limit": batch_size})
+            result = conn.execute(query, {"since": pending_since(), "exclude": list(exclude_links or []),
+                                          "limit": batch_size})
             df = pd.DataFrame(result.fetchall())
             if df.empty:
                 logger.info("Nenhuma manchete pendente encontrada.")
@@ -145,11 +147,23 @@ def create_silver_table_if_not_exists(engine, logger):
         logger.error(f"Erro ao criar tabela silver: {e}")
         raise
 
-def analyze_headline_with_openai(client, headline, logger):
+OPENAI_MODEL = "gpt-3.5-turbo-1106"
+OPENAI_TEMPERATURE = 0.1
+OPENAI_MAX_TOKENS = 150
+# Versão das instruções de classificação (entra na chave do cache de respostas):
+# altere ao mudar build_headline_prompt ou build_batch_prompt
+PROMPT_VERSION = "v1"
+
+VALID_SENTIMENTS = ['Positiva', 'Negativa', 'Neutra']
+VALID_CATEGORIES = ['Política', 'Economia', 'Esportes', 'Tecnologia', 'Cultura', 
+                    'Saúde', 'Internacional', 'Justiça', 'Educação', 'Meio Ambiente', 
+                    'Segurança', 'Outros']
+
+def build_headline_prompt(headline):
     """
-    Analisa uma manchete usando OpenAI e retorna o resultado.
+    Prompt de classificação de uma manchete (o mesmo nos modos síncrono e assíncrono).
     """
-    prompt = f"""
+    return f"""
     Analise a seguinte manchete de notícia brasileira e retorne APENAS um objeto JSON com estas chaves:
     - 'sentiment': "Positiva", "Negativa" ou "Neutra"
     - 'category': uma das opções: "Política", "Economia", "Esportes", "Tecnologia", "Cultura", "Saúde", "Internacional", "Justiça", "Educação", "Meio Ambiente", "Segurança", "Outros"
@@ -159,168 +173,603 @@ def analyze_headline_with_openai(client, headline, logger):
 
     Manchete: "{headline}"
     """
+
+def build_chat_request(headline):
+    """
+    Parâmetros da chamada chat.completions para uma manchete.
+    """
+    return {
+        'model': OPENAI_MODEL,
+        'messages': [{"role": "user", "content": build_headline_prompt(headline)}],
+        'response_format': {"type": "json_object"},
+        'temperature': OPENAI_TEMPERATURE,
+        'max_tokens': OPENAI_MAX_TOKENS,
+    }
+
+def parse_analysis(content, processing_time):
+    """
+    Valida o JSON devolvido pelo modelo e normaliza sentimento, categoria e confiança.
+    """
+    return validate_analysis(json.loads(content), processing_time)
+
+def validate_analysis(result, processing_time):
+    """
+    Normaliza um resultado já decodificado (manchete única ou item de um lote).
+    """
+    # Validar resultado
+    sentiment = result.get('sentiment', 'Erro')
+    category = result.get('category', 'Erro')
+    confidence = float(result.get('confidence', 0.0))
     
+    if sentiment not in VALID_SENTIMENTS:
+        sentiment = 'Erro'
+    if category not in VALID_CATEGORIES:
+        category = 'Erro'
+    if not (0.0 <= confidence <= 1.0):
+        confidence = 0.0
+        
+    return {
+        'sentiment': sentiment,
+        'category': category,
+        'confidence': confidence,
+        'processing_time': processing_time
+    }
+
+def error_analysis():
+    return {
+        'sentiment': 'Erro',
+        'category': 'Erro',
+        'confidence': 0.0,
+        'processing_time': 0.0
+    }
+
+def analyze_headline_with_openai(client, headline, logger):
+    """
+    Analisa uma manchete usando OpenAI e retorna o resultado.
+    """
     try:
         start_time = datetime.now()
         
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo-1106",
-            messages=[{"role": "user", "content": prompt}],
-            response_format={"type": "json_object"},
-            temperature=0.1,
-            max_tokens=150
-        )
+        response = client.chat.completions.create(**build_chat_request(headline))
         
         end_time = datetime.now()
         processing_time = (end_time - start_time).total_seconds()
         
-        result = json.loads(response.choices[0].message.content)
-        
-        # Validar resultado
-        sentiment = result.get('sentiment', 'Erro')
-        category = result.get('category', 'Erro')
-        confidence = float(result.get('confidence', 0.0))
-        
-        # Validação adicional
-        valid_sentiments = ['Positiva', 'Negativa', 'Neutra']
-        valid_categories = ['Política', 'Economia', 'Esportes', 'Tecnologia', 'Cultura', 
-                          'Saúde', 'Internacional', 'Justiça', 'Educação', 'Meio Ambiente', 
-                          'Segurança', 'Outros']
-        
-        if sentiment not in valid_sentiments:
-            sentiment = 'Erro'
-        if category not in valid_categories:
-            category = 'Erro'
-        if not (0.0 <= confidence <= 1.0):
-            confidence = 0.0
-            
-        return {
-            'sentiment': sentiment,
-            'category': category,
-            'confidence': confidence,
-            'processing_time': processing_time
-        }
+        return parse_analysis(response.choices[0].message.content, processing_time)
         
     except Exception as e:
         logger.error(f"Erro ao processar manchete com OpenAI: {e}")
-        return {
-            'sentiment': 'Erro',
-            'category': 'Erro',
-            'confidence': 0.0,
-            'processing_time': 0.0
-        }
+        return error_analysis()
+
+def build_enriched_record(row, analysis):
+    """
+    Linha da tabela silver a partir da manchete bronze e do resultado da análise.
+    """
+    return {
+        'raw_link': row['link'],  # Usando link como chave
+        'title': row['title'],
+        'link': row['link'],
+        'source': row['source'] if 'source' in row else 'g1',
+        'scraped_at': row['scraped_at'],
+        'sentiment': analysis['sentiment'],
+        'category': analysis['category'],
+        'confidence_score': analysis['confidence'],
+        'processing_time_seconds': analysis['processing_time'],
+        'processed_at': datetime.now(),
+        'model_used': analysis.get('model_used', OPENAI_MODEL)
+    }
 
-def process_headlines_batch(df_headlines, client, logger, batch_name=""):
+def log_analysis(logger, headline, analysis):
+    if analysis['sentiment'] != 'Erro':
+        logger.info(f"✅ Processada: {analysis['sentiment']} | {analysis['category']} | Confiança: {analysis['confidence']:.2f}")
+    else:
+        logger.warning(f"⚠️ Erro no processamento da manchete: {headline[:50]}...")
+
+def lookup_known_analyses(titles, cache=None, near_dups=None, local_model=None):
+    """
+    Análise já conhecida de cada título (None quando não há), na mesma ordem:
+    primeiro o cache de respostas, depois a quase duplicata no índice `near_dups`
+    e, para as que sobram, o classificador local (todas de uma vez) quando a
+    confiança passa do limiar. Análises herdadas ou locais não são gravadas no cache.
+    """
+    known = cache.lookup(titles) if cache is not None else [None] * len(titles)
+    if near_dups is not None:
+        known = [analysis if analysis is not None else near_dups.lookup_analysis(title)
+                 for title, analysis in zip(titles, known)]
+    if local_model is not None:
+        missing = [position for position, analysis in enumerate(known) if analysis is None]
+        for position, analysis in zip(missing, local_model.lookup_analyses([titles[i] for i in missing])):
+            known[position] = analysis
+    return known
+
+def process_headlines_batch(df_headlines, client, logger, batch_name="", cache=None, near_dups=None,
+                            local_model=None):
     """
     Processa um lote de manchetes e retorna os dados enriquecidos.
+
+    Manchetes encontradas no `cache`, com quase duplicata em `near_dups` ou
+    classificadas com confiança pelo `local_model` (ou repetidas no lote) não
+    vão à API.
     """
     enriched_data = []
     total_headlines = len(df_headlines)
     
     logger.info(f"Iniciando processamento do lote {batch_name} com {total_headlines} manchetes...")
+
+    cached = lookup_known_analyses(df_headlines['title'].tolist(), cache, near_dups, local_model)
+    fresh = {}  # título normalizado -> (título, análise) obtida da API neste lote
     
-    for index, row in df_headlines.iterrows():
+    for position, (index, row) in enumerate(df_headlines.iterrows()):
         headline = row['title']
         logger.info(f"Processando [{index + 1}/{total_headlines}]: {headline[:100]}...")
         
         try:
-            # Analisar com OpenAI
-            analysis = analyze_headline_with_openai(client, headline, logger)
+            analysis = cached[position]
+            if analysis is None and normalize_title(headline) in fresh:
+                analysis = dict(fresh[normalize_title(headline)][1])
+            if analysis is None:
+                # Analisar com OpenAI
+                analysis = analyze_headline_with_openai(client, headline, logger)
+                fresh[normalize_title(headline)] = (headline, analysis)
+                
+                # Pausa pequena para evitar rate limiting
+                time.sleep(0.1)
             
             # Preparar dados para inserção
-            enriched_record = {
-                'raw_link': row['link'],  # Usando link como chave
-                'title': row['title'],
-                'link': row['link'],
-                'source': row['source'] if 'source' in row else 'g1',
-                'scraped_at': row['scraped_at'],
-                'sentiment': analysis['sentiment'],
-                'category': analysis['category'],
-                'confidence_score': analysis['confidence'],
-                'processing_time_seconds': analysis['processing_time'],
-                'processed_at': datetime.now()
-            }
-            
-            enriched_data.append(enriched_record)
-            
-            # Log do resultado
-            if analysis['sentiment'] != 'Erro':
-                logger.info(f"✅ Processada: {analysis['sentiment']} | {analysis['category']} | Confiança: {analysis['confidence']:.2f}")
-            else:
-                logger.warning(f"⚠️ Erro no processamento da manchete: {headline[:50]}...")
-            
-            # Pausa pequena para evitar rate limiting
-            import time
-            time.sleep(0.1)
+            enriched_data.append(build_enriched_record(row, analysis))
+            log_analysis(logger, headline, analysis)
             
         except Exception as e:
             logger.error(f"Erro ao processar manchete '{headline[:50]}...': {e}")
             # Adicionar registro de erro para não perder a manchete
-            enriched_data.append({
-                'raw_link': row['link'],  # Usando link como chave
-                'title': row['title'],
-                'link': row['link'],
-                'source': row['source'] if 'source' in row else 'g1',
-                'scraped_at': row['scraped_at'],
-                'sentiment': 'Erro',
-                'category': 'Erro',
-                'confidence_score': 0.0,
-                'processing_time_seconds': 0.0,
-                'processed_at': datetime.now()
-            })
+            enriched_data.append(build_enriched_record(row, error_analysis()))
+
+    if cache is not None:
+        cache.store(fresh.values())
     
     logger.info(f"Lote {batch_name} processado: {len(enriched_data)} registros preparados.")
     return enriched_data
 
+# Modo assíncrono: limites da conta OpenAI (requisições e tokens por minuto) e
+# número máximo de chamadas simultâneas
+DEFAULT_CONCURRENCY = int(os.getenv("OPENAI_CONCURRENCY", "16"))
+DEFAULT_RPM_LIMIT = int(os.getenv("OPENAI_RPM_LIMIT", "500"))
+DEFAULT_TPM_LIMIT = int(os.getenv("OPENAI_TPM_LIMIT", "60000"))
+MAX_API_RETRIES = 5
+CHARS_PER_TOKEN = 3  # estimativa conservadora para português
+
+class TokenBucketLimiter:
+    """
+    Token bucket duplo (requisições/min e tokens/min) compartilhado pelas tarefas
+    assíncronas. Um 429 pausa todas as tarefas até o fim do Retry-After.
+    """
+
+    def __init__(self, rpm=DEFAULT_RPM_LIMIT, tpm=DEFAULT_TPM_LIMIT):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.requests = float(rpm)
+        self.tokens = float(tpm)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = asyncio.Lock()
+        # Consumo da execução (response.usage), para o resumo
+        self.usage = {'requests': 0, 'prompt_tokens': 0, 'completion_tokens': 0}
+
+    def _refill(self, now):
+        elapsed = now - self.updated
+        self.updated = now
+        self.requests = min(self.rpm, self.requests + elapsed * self.rpm / 60)
+        self.tokens = min(self.tpm, self.tokens + elapsed * self.tpm / 60)
+
+    async def acquire(self, tokens):
+        """
+        Aguarda até haver uma requisição e `tokens` disponíveis (ordem de chegada).
+        """
+        tokens = min(tokens, self.tpm)
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self.paused_until - now
+                if wait <= 0:
+                    wait = max((1 - self.requests) * 60 / self.rpm, (tokens - self.tokens) * 60 / self.tpm)
+                    if wait <= 0:
+                        self.requests -= 1
+                        self.tokens -= tokens
+                        return
+                await asyncio.sleep(wait)
+
+    def settle(self, estimated, usage):
+        """
+        Ajusta o balde com os tokens realmente usados (response.usage).
+        """
+        self.tokens = min(self.tpm, self.tokens + estimated - usage.total_tokens)
+        self.usage['requests'] += 1
+        self.usage['prompt_tokens'] += usage.prompt_tokens
+        self.usage['completion_tokens'] += usage.completion_tokens
+
+    def pause(self, seconds):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+def estimate_tokens(request):
+    """
+    Tokens cobrados no limite por minuto: prompt estimado + max_tokens da resposta.
+    """
+    prompt_chars = sum(len(message['content']) for message in request['messages'])
+    return prompt_chars // CHARS_PER_TOKEN + request['max_tokens']
+
+def retry_after_seconds(error, attempt):
+    """
+    Espera indicada pela API (retry-after-ms / Retry-After) ou backoff exponencial.
+    """
+    response = getattr(error, 'response', None)
+    headers = response.headers if response is not None else {}
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000
+        if headers.get('retry-after'):
+            value = headers['retry-after']
+            try:
+                return float(value)
+            except ValueError:
+                return max(0.0, (parsedate_to_datetime(value) - datetime.now().astimezone()).total_seconds())
+    except (TypeError, ValueError):
+        pass
+    return min(60.0, 2 ** attempt)
+
+def get_async_openai_client(logger):
+    """
+    Cliente AsyncOpenAI para o modo assíncrono (retries tratados em analyze_headline_with_openai_async).
+    """
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        logger.error("OPENAI_API_KEY não configurada nas variáveis de ambiente.")
+        raise ValueError("OPENAI_API_KEY não encontrada")
+    return AsyncOpenAI(api_key=api_key, max_retries=0)
+
+async def create_completion_async(client, request, limiter, logger):
+    """
+    Chama chat.completions respeitando o limitador, com retries para 429 e
+    falhas temporárias. Retorna (response, processing_time) ou None se a
+    chamada não foi possível.
+    """
+    estimated = estimate_tokens(request)
+    for attempt in range(MAX_API_RETRIES + 1):
+        await limiter.acquire(estimated)
+        try:
+            start_time = datetime.now()
+            response = await client.chat.completions.create(**request)
+            processing_time = (datetime.now() - start_time).total_seconds()
+            if response.usage is not None:
+                limiter.settle(estimated, response.usage)
+            return response, processing_time
+        except RateLimitError as e:
+            if getattr(e, 'code', None) == 'insufficient_quota':
+                logger.error(f"Erro ao processar manchete com OpenAI: {e}")
+                return None
+            delay = retry_after_seconds(e, attempt)
+            limiter.pause(delay)
+            logger.warning(f"⏳ Rate limit (429); aguardando {delay:.1f}s (tentativa {attempt + 1}/{MAX_API_RETRIES})")
+        except (APIConnectionError, APITimeoutError, InternalServerError) as e:
+            delay = retry_after_seconds(e, attempt)
+            logger.warning(f"⏳ Falha temporária da API ({e.__class__.__name__}); nova tentativa em {delay:.1f}s")
+            await asyncio.sleep(delay)
+        except Exception as e:
+            logger.error(f"Erro ao processar manchete com OpenAI: {e}")
+            return None
+    logger.error(f"Erro ao processar manchete com OpenAI: {MAX_API_RETRIES} tentativas esgotadas")
+    return None
+
+async def analyze_headline_with_openai_async(client, headline, limiter, logger):
+    """
+    Versão assíncrona de analyze_headline_with_openai (mesmo prompt e mesma validação).
+    """
+    completion = await create_completion_async(client, build_chat_request(headline), limiter, logger)
+    if completion is None:
+        return error_analysis()
+    response, processing_time = completion
+    try:
+        return parse_analysis(response.choices[0].message.content, processing_time)
+    except Exception as e:
+        logger.error(f"Erro ao processar manchete com OpenAI: {e}")
+        return error_analysis()
+
+# Modo com várias manchetes por requisição: as instruções (~120 tokens) vão
+# uma vez só e a resposta traz um item por manchete, identificado pelo id
+DEFAULT_HEADLINES_PER_REQUEST = int(os.getenv("OPENAI_HEADLINES_PER_REQUEST", "1"))
+BATCH_MAX_TOKENS = int(os.getenv("OPENAI_BATCH_MAX_TOKENS", "2048"))
+BATCH_RESPONSE_OVERHEAD_TOKENS = 20  # {"results": [...]} em volta dos itens
+INITIAL_TOKENS_PER_RESULT = 35  # {"id": "12", "sentiment": ..., "category": ..., "confidence": ...}
+TOKENS_PER_RESULT_MARGIN = 1.5
+
+def build_batch_prompt(items):
+    """
+    Prompt de classificação de várias manchetes. `items` é uma lista de
+    (id, manchete); o modelo devolve um item por id.
+    """
+    headlines = "\n".join(json.dumps({"id": item_id, "title": headline}, ensure_ascii=False)
+                          for item_id, headline in items)
+    return f"""
+    Analise cada uma das manchetes de notícias brasileiras abaixo (uma por linha, com seu "id") e retorne APENAS um objeto JSON no formato {{"results": [...]}}, com exatamente um item por manchete e estas chaves:
+    - 'id': o mesmo "id" da manchete
+    - 'sentiment': "Positiva", "Negativa" ou "Neutra"
+    - 'category': uma das opções: "Política", "Economia", "Esportes", "Tecnologia", "Cultura", "Saúde", "Internacional", "Justiça", "Educação", "Meio Ambiente", "Segurança", "Outros"
+    - 'confidence': um número entre 0.0 e 1.0 indicando sua confiança na classificação
+
+    Seja preciso e considere o contexto brasileiro.
+
+    Manchetes:
+{headlines}
+    """
+
+def build_batch_chat_request(items, max_tokens):
+    """
+    Parâmetros da chamada chat.completions para um lote de manchetes.
+    """
+    return {
+        'model': OPENAI_MODEL,
+        'messages': [{"role": "user", "content": build_batch_prompt(items)}],
+        'response_format': {"type": "json_object"},
+        'temperature': OPENAI_TEMPERATURE,
+        'max_tokens': max_tokens,
+    }
+
+def parse_batch_analysis(content, ids, processing_time):
+    """
+    Valida a resposta de um lote. Retorna {id: análise} só com os itens válidos
+    (id pedido, sentimento e categoria reconhecidos); os demais ficam de fora
+    para serem pedidos de novo.
+    """
+    try:
+        payload = json.loads(content)
+    except ValueError:
+        return {}
+    results = payload.get('results') if isinstance(payload, dict) else payload
+    if not isinstance(results, list):
+        return {}
+
+    wanted = set(ids)
+    parsed = {}
+    for result in results:
+        if not isinstance(result, dict):
+            continue
+        item_id = str(result.get('id'))
+        if item_id not in wanted or item_id in parsed:
+            continue
+        try:
+            analysis = validate_analysis(result, processing_time)
+        except (TypeError, ValueError):
+            continue
+        if analysis['sentiment'] != 'Erro' and analysis['category'] != 'Erro':
+            parsed[item_id] = analysis
+    return parsed
+
+class BatchSizer:
+    """
+    Ajusta quantas manchetes vão por requisição para que a resposta caiba em
+    `max_tokens`, a partir dos tokens de resposta observados por item.
+    """
+
+    def __init__(self, max_headlines=DEFAULT_HEADLINES_PER_REQUEST, max_tokens=BATCH_MAX_TOKENS):
+        self.max_headlines = max(1, max_headlines)
+        self.max_tokens = max_tokens
+        self.tokens_per_result = float(INITIAL_TOKENS_PER_RESULT)
+
+    def size(self):
+        budget = self.max_tokens - BATCH_RESPONSE_OVERHEAD_TOKENS
+        fit = int(budget // (self.tokens_per_result * TOKENS_PER_RESULT_MARGIN))
+        return max(1, min(self.max_headlines, fit))
+
+    def max_tokens_for(self, count):
+        needed = BATCH_RESPONSE_OVERHEAD_TOKENS + count * self.tokens_per_result * TOKENS_PER_RESULT_MARGIN
+        return min(self.max_tokens, int(needed) + 1)
+
+    def observe(self, count, completion_tokens, truncated):
+        if truncated:
+            # Resposta cortada em max_tokens: a estimativa estava baixa
+            self.tokens_per_result *= TOKENS_PER_RESULT_MARGIN
+            return
+        observed = max(1, completion_tokens - BATCH_RESPONSE_OVERHEAD_TOKENS) / count
+        self.tokens_per_result = 0.7 * self.tokens_per_result + 0.3 * observed
+
+async def analyze_headlines_with_openai_async(client, items, limiter, sizer, logger):
+    """
+    Classifica várias manchetes numa requisição. `items` é uma lista de
+    (id, manchete); retorna {id: análise} para todos os ids.
+
+    Itens ausentes ou inválidos na resposta (JSON cortado, rótulo fora da lista)
+    são divididos em duas metades e pedidos de novo; um item sozinho usa o
+    prompt de manchete única. Se a chamada em si falhar, o lote inteiro fica
+    como 'Erro', como no modo de uma manchete.
+    """
+    if len(items) == 1:
+        item_id, headline = items[0]
+        return {item_id: await analyze_headline_with_openai_async(client, headline, limiter, logger)}
+
+    ids = [item_id for item_id, _ in items]
+    request = build_batch_chat_request(items, sizer.max_tokens_for(len(items)))
+    completion = await create_completion_async(client, request, limiter, logger)
+    if completion is None:
+        return {item_id: error_analysis() for item_id in ids}
+
+    response, processing_time = completion
+    choice = response.choices[0]
+    if response.usage is not None:
+        sizer.observe(len(items), response.usage.completion_tokens, choice.finish_reason == 'length')
+    results = parse_batch_analysis(choice.message.content, ids, processing_time / len(items))
+
+    missing = [item for item in items if item[0] not in results]
+    if missing:
+        logger.warning(f"⚠️ {len(missing)}/{len(items)} manchetes sem resultado válido no lote; "
+                       f"pedindo de novo em lotes menores")
+        half = (len(missing) + 1) // 2
+        for part in (missing[:half], missing[half:]):
+            if part:
+                results.update(await analyze_headlines_with_openai_async(client, part, limiter, sizer, logger))
+    return results
+
+async def analyze_titles_async(titles, client, logger, concurrency=DEFAULT_CONCURRENCY, limiter=None,
+                               sizer=None):
+    """
+    Classifica `titles` com até `concurrency` chamadas simultâneas e retorna as
+    análises na mesma ordem. Com um `sizer` de mais de uma manchete por
+    requisição, cada chamada leva `sizer.size()` manchetes (tamanho reavaliado
+    a cada requisição).
+    """
+    limiter = limiter or TokenBucketLimiter()
+    if sizer is None or sizer.max_headlines == 1:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def analyze(title):
+            async with semaphore:
+                return await analyze_headline_with_openai_async(client, title, limiter, logger)
+
+        return list(await asyncio.gather(*(analyze(title) for title in titles)))
+
+    # Ids estáveis: a posição no lote, reaproveitada nas novas tentativas
+    pending = [(str(position), title) for position, title in enumerate(titles)]
+    pending.reverse()
+    analyses = {}
+
+    async def worker():
+        while pending:
+            items = [pending.pop() for _ in range(min(sizer.size(), len(pending)))]
+            analyses.update(await analyze_headlines_with_openai_async(client, items, limiter, sizer, logger))
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return [analyses[str(position)] for position in range(len(titles))]
+
+async def process_headlines_batch_async(df_headlines, client, logger, batch_name="",
+                                        concurrency=DEFAULT_CONCURRENCY, limiter=None, sizer=None, cache=None,
+                                        near_dups=None, local_model=None):
+    """
+    Processa um lote de manchetes com até `concurrency` chamadas simultâneas,
+    respeitando os limites de requisições e tokens por minuto. Retorna os
+    registros na mesma ordem do DataFrame, como process_headlines_batch.
+
+    Manchetes encontradas no `cache`, com quase duplicata em `near_dups` ou
+    classificadas com confiança pelo `local_model` não vão à API, e manchetes
+    repetidas no lote são enviadas uma vez só.
+    """
+    limiter = limiter or TokenBucketLimiter()
+    total_headlines = len(df_headlines)
+    rows = [row for _, row in df_headlines.iterrows()]
+    titles = [row['title'] for row in rows]
+    logger.info(f"Iniciando processamento assíncrono do lote {batch_name} com {total_headlines} manchetes "
+                f"(concorrência {concurrency}, {limiter.rpm} RPM, {limiter.tpm} TPM)...")
+
+    cached = await asyncio.to_thread(lookup_known_analyses, titles, cache, near_dups, local_model)
+    pending = {}
+    for title, analysis in zip(titles, cached):
+        if analysis is None:
+            pending.setdefault(normalize_title(title), title)
+    pending_titles = list(pending.values())
+    fresh = await analyze_titles_async(pending_titles, client, logger, concurrency, limiter, sizer)
+    if cache is not None:
+        await asyncio.to_thread(cache.store, list(zip(pending_titles, fresh)))
+
+    fresh_by_key = dict(zip(pending, fresh))
+    enriched_data = []
+    for row, title, analysis in zip(rows, titles, cached):
+        analysis = analysis or dict(fresh_by_key[normalize_title(title)])
+        log_analysis(logger, title, analysis)
+        enriched_data.append(build_enriched_record(row, analysis))
+
+    logger.info(f"Lote {batch_name} processado: {len(enriched_data)} registros preparados.")
+    return enriched_data
+
+# Gravação na silver em lote: COPY para uma tabela temporária de staging e um
+# único INSERT ... SELECT ... ON CONFLICT (raw_link) DO NOTHING, como na carga
+# da bronze (raw_loader). As contagens saem do próprio INSERT.
+SILVER_COLUMNS = ['raw_link', 'title', 'link', 'source', 'scraped_at', 'sentiment', 'category',
+                  'confidence_score', 'processing_time_seconds', 'processed_at', 'model_used']
+SILVER_STAGE_TABLE = 'silver_enriched_headlines_stage'
+_SILVER_COLUMNS_SQL = ', '.join(SILVER_COLUMNS)
+
+# Sem LIKE ... INCLUDING DEFAULTS: o default de id consumiria a sequência da silver.
+# As datas ficam como timestamptz no staging: a conversão para a coluna silver
+# usa o fuso da sessão, como faziam os parâmetros do INSERT registro a registro.
+SILVER_TIMESTAMP_COLUMNS = ('scraped_at', 'processed_at')
+CREATE_SILVER_STAGE_SQL = f"""
+    CREATE TEMP TABLE IF NOT EXISTS {SILVER_STAGE_TABLE} ON COMMIT DROP AS
+    SELECT {', '.join(f'{c}::timestamptz AS {c}' if c in SILVER_TIMESTAMP_COLUMNS else c for c in SILVER_COLUMNS)}
+    FROM silver_enriched_headlines WITH NO DATA
+"""
+
+SILVER_COPY_SQL = f"COPY {SILVER_STAGE_TABLE} ({_SILVER_COLUMNS_SQL}) FROM STDIN WITH (FORMAT csv)"
+
+SILVER_INSERT_SQL = f"""
+    WITH inserted AS (
+        INSERT INTO silver_enriched_headlines ({_SILVER_COLUMNS_SQL})
+        SELECT {_SILVER_COLUMNS_SQL} FROM {SILVER_STAGE_TABLE}
+        ON CONFLICT (raw_link) DO NOTHING
+        RETURNING sentiment = 'Erro' OR category = 'Erro' AS failed
+    )
+    SELECT COUNT(*), COUNT(*) FILTER (WHERE failed) FROM inserted
+"""
+
+def enriched_to_csv_buffer(enriched_data):
+    """Serializa os registros silver em CSV (sem cabeçalho) na ordem de SILVER_COLUMNS.
+
+    Usa o writer CSV do Arrow, como a carga da bronze. As datas podem chegar como
+    datetime, Timestamp ou texto ISO (jobs da Batch API) e vão como texto; None,
+    NaN e NaT viram campo vazio (NULL).
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+
+    columns = {}
+    for column in SILVER_COLUMNS:
+        if column == 'model_used':
+            values = [data.get('model_used', OPENAI_MODEL) for data in enriched_data]
+        else:
+            values = [data[column] for data in enriched_data]
+        if column in SILVER_TIMESTAMP_COLUMNS:
+            values = [None if value is None or value is pd.NaT else str(value) for value in values]
+        columns[column] = pa.array(values, from_pandas=True)
+    buffer = io.BytesIO()
+    pa_csv.write_csv(pa.table(columns), buffer, pa_csv.WriteOptions(include_header=False))
+    buffer.seek(0)
+    return buffer
+
 def save_enriched_data(enriched_data, engine, logger):
     """
-    Salva os dados enriquecidos na tabela silver usando inserção manual.
+    Salva os dados enriquecidos na tabela silver num único COPY + INSERT.
+    Manchetes que já estão na silver (mesmo raw_link) são ignoradas.
+
+    Returns:
+        Número de registros inseridos.
     """
     if not enriched_data:
         logger.info("Nenhum dado para salvar.")
         return 0
     
+    conn = engine.raw_connection()
     try:
-        # Usar inserção manual usando SQLAlchemy para evitar problemas de compatibilidade
-        with engine.begin() as conn:
-            # Inserir dados um por um
-            for data in enriched_data:
-                try:
-                    conn.execute(text("""
-                        INSERT INTO silver_enriched_headlines 
-                        (raw_link, title, link, source, scraped_at, sentiment, category, confidence_score, processing_time_seconds, processed_at, model_used) 
-                        VALUES (:raw_link, :title, :link, :source, :scraped_at, :sentiment, :category, :confidence_score, :processing_time_seconds, :processed_at, :model_used)
-                        ON CONFLICT (raw_link) DO NOTHING
-                    """), {
-                        "raw_link": data['raw_link'],
-                        "title": data['title'],
-                        "link": data['link'],
-                        "source": data['source'],
-                        "scraped_at": data['scraped_at'],
-                        "sentiment": data['sentiment'],
-                        "category": data['category'],
-                        "confidence_score": data['confidence_score'],
-                        "processing_time_seconds": data['processing_time_seconds'],
-                        "processed_at": data['processed_at'],
-                        "model_used": "gpt-3.5-turbo-1106"
-                    })
-                except Exception as insert_error:
-                    logger.error(f"Erro ao inserir registro raw_link {data['raw_link']}: {insert_error}")
-                    continue
-        
-        success_count = len([d for d in enriched_data if d['sentiment'] != 'Erro'])
-        error_count = len([d for d in enriched_data if d['sentiment'] == 'Erro'])
-        
-        logger.info(f"✅ Dados salvos: {len(enriched_data)} total, {success_count} sucessos, {error_count} erros.")
-        return len(enriched_data)
-        
+        with conn.cursor() as cur:
+            cur.execute(CREATE_SILVER_STAGE_SQL)
+            cur.execute(f"TRUNCATE {SILVER_STAGE_TABLE}")
+            cur.copy_expert(SILVER_COPY_SQL, enriched_to_csv_buffer(enriched_data))
+            cur.execute(SILVER_INSERT_SQL)
+            inserted, error_count = cur.fetchone()
+        conn.commit()
     except Exception as e:
+        conn.rollback()
         logger.error(f"Erro ao salvar dados enriquecidos: {e}")
         raise
+    finally:
+        conn.close()
 
-def generate_processing_summary(engine, logger):
+    skipped = len(enriched_data) - inserted
+    logger.info(f"✅ Dados salvos: {inserted} inseridos ({inserted - error_count} sucessos, {error_count} erros), "
+                f"{skipped} ignorados por já existirem na silver.")
+    return inserted
+
+def generate_processing_summary(engine, logger, cache=None, near_dups=None, local_model=None):
     """
-    Gera um resumo do processamento atual.
+    Gera um resumo do processamento atual (com acertos e faltas do cache de
+    respostas, do índice de quase duplicatas e do classificador local desta
+    execução, se houver).
     """
     try:
         conn = get_postgres_connection()
@@ -367,65 +816,494 @@ def generate_processing_summary(engine, logger):
             logger.info("   Categorias mais frequentes hoje:")
             for _, row in category_stats.iterrows():
                 logger.info(f"     • {row['category']}: {row['count']}")
+
+        if cache is not None:
+            cache_stats = cache.summary()
+            logger.info(f"   Cache de respostas: {cache_stats['hits']} acertos, {cache_stats['misses']} faltas "
+                        f"(taxa {cache_stats['hit_rate']:.1%}), {cache_stats['stored']} respostas gravadas, "
+                        f"{cache_stats['evicted']} removidas; {cache_stats['entries']} de "
+                        f"{cache_stats['max_entries']} entradas na tabela")
+        if near_dups is not None:
+            near_dup_stats = near_dups.summary()
+            logger.info(f"   Quase duplicatas: {near_dup_stats['hits']} de {near_dup_stats['lookups']} consultas "
+                        f"herdaram a classificação (limiar {near_dup_stats['threshold']}, "
+                        f"{near_dup_stats['rows']} manchetes no índice)")
+        if local_model is not None:
+            local_stats = local_model.summary()
+            threshold = f"{local_stats['threshold']:.3f}" if local_stats['threshold'] is not None else "nenhum"
+            logger.info(f"   Classificador local ({local_stats['version']}): {local_stats['hits']} de "
+                        f"{local_stats['lookups']} manchetes classificadas sem LLM (limiar {threshold})")
                 
     except Exception as e:
         logger.error(f"Erro ao gerar resumo: {e}")
 
-def main():
+async def process_all_headlines_async(df_unprocessed, engine, logger, batch_size,
+                                      concurrency=DEFAULT_CONCURRENCY, rpm=DEFAULT_RPM_LIMIT,
+                                      tpm=DEFAULT_TPM_LIMIT,
+                                      headlines_per_request=DEFAULT_HEADLINES_PER_REQUEST, cache=None,
+                                      near_dups=None, local_model=None):
+    """
+    Modo assíncrono: processa os lotes com um único cliente AsyncOpenAI e um
+    único limitador (os limites valem para a execução inteira) e salva cada lote
+    ao terminar (indexando-o em `near_dups` para os lotes seguintes).
+    """
+    client = get_async_openai_client(logger)
+    limiter = TokenBucketLimiter(rpm, tpm)
+    sizer = BatchSizer(headlines_per_request)
+    total_processed = 0
+    total_batches = (len(df_unprocessed) + batch_size - 1) // batch_size
+    try:
+        for batch_num in range(0, len(df_unprocessed), batch_size):
+            current_batch = batch_num // batch_size + 1
+            batch_df = df_unprocessed.iloc[batch_num:batch_num + batch_size]
+            logger.info(f"📦 Processando lote {current_batch}/{total_batches} ({len(batch_df)} manchetes)...")
+
+            enriched_data = await process_headlines_batch_async(
+                batch_df, client, logger, batch_name=f"{current_batch}/{total_batches}",
+                concurrency=concurrency, limiter=limiter, sizer=sizer, cache=cache, near_dups=near_dups,
+                local_model=local_model
+            )
+            saved_count = await asyncio.to_thread(save_enriched_data, enriched_data, engine, logger)
+            if near_dups is not None:
+                await asyncio.to_thread(near_dups.refresh)
+            total_processed += saved_count
+            logger.info(f"✅ Lote {current_batch}/{total_batches} concluído. Total processado até agora: {total_processed}")
+    finally:
+        await client.close()
+    usage = limiter.usage
+    logger.info(f"📈 Consumo da API: {usage['requests']} requisições, {usage['prompt_tokens']} tokens de prompt, "
+                f"{usage['completion_tokens']} tokens de resposta "
+                f"(até {sizer.max_headlines} manchetes por requisição)")
+    return total_processed
+
+# Modo batch (Batch API da OpenAI): metade do preço e sem disputar os limites
+# por minuto, com resultado em até 24h. Cada job fica em BATCH_JOBS_DIR/<job>/:
+#   input.jsonl      requisições no formato da Batch API (custom_id, method, url, body)
+#   headlines.jsonl  manchete bronze de cada (custom_id, id)
+#   job.json         batch_id, status e contagens; loaded_at depois da carga
+#   output.jsonl / errors.jsonl  resultados baixados quando o job termina
+BATCH_JOBS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'llm_batches')
+BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_COMPLETION_WINDOW = "24h"
+BATCH_MAX_REQUESTS = 50000  # limite de requisições por arquivo da Batch API
+BATCH_TERMINAL_STATUSES = {'completed', 'failed', 'expired', 'cancelled'}
+
+def _write_json(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+    os.replace(tmp_path, path)
+
+def _read_jsonl(path):
+    if not path or not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+class OpenAIBatchBackend:
+    """
+    Batch API da OpenAI: upload do JSONL (purpose='batch'), criação do batch,
+    consulta de status e download dos arquivos de saída e de erros.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    def submit(self, input_path):
+        with open(input_path, 'rb') as f:
+            input_file = self.client.files.create(file=f, purpose='batch')
+        batch = self.client.batches.create(input_file_id=input_file.id, endpoint=BATCH_ENDPOINT,
+                                           completion_window=BATCH_COMPLETION_WINDOW)
+        return batch.id
+
+    def status(self, batch_id):
+        return self.client.batches.retrieve(batch_id).status
+
+    def download(self, batch_id, job_dir):
+        batch = self.client.batches.retrieve(batch_id)
+        paths = {}
+        for kind, file_id in (('output', batch.output_file_id), ('errors', batch.error_file_id)):
+            if file_id:
+                paths[kind] = os.path.join(job_dir, f"{kind}.jsonl")
+                with open(paths[kind], 'wb') as f:
+                    f.write(self.client.files.content(file_id).content)
+        return paths
+
+class LocalBatchBackend:
+    """
+    Substituto da Batch API baseado em arquivos (OPENAI_BATCH_LOCAL_DIR), para
+    testes e desenvolvimento. Cada batch é um diretório <root>/<batch_id>/ com
+    input.jsonl e batch.json ({"status": ...}); quem faz o papel da OpenAI
+    grava output.jsonl/errors.jsonl e muda o status para "completed"
+    (ver run_local_batches).
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def submit(self, input_path):
+        batch_id = f"batch_local_{datetime.now().strftime('%Y%m%dT%H%M%S%f')}"
+        batch_dir = os.path.join(self.root, batch_id)
+        os.makedirs(batch_dir)
+        with open(input_path, 'rb') as src, open(os.path.join(batch_dir, 'input.jsonl'), 'wb') as dst:
+            dst.write(src.read())
+        _write_json(os.path.join(batch_dir, 'batch.json'), {'id': batch_id, 'status': 'validating'})
+        return batch_id
+
+    def status(self, batch_id):
+        with open(os.path.join(self.root, batch_id, 'batch.json'), encoding='utf-8') as f:
+            return json.load(f)['status']
+
+    def download(self, batch_id, job_dir):
+        paths = {}
+        for kind in ('output', 'errors'):
+            source = os.path.join(self.root, batch_id, f"{kind}.jsonl")
+            if os.path.exists(source):
+                paths[kind] = os.path.join(job_dir, f"{kind}.jsonl")
+                with open(source, 'rb') as src, open(paths[kind], 'wb') as dst:
+                    dst.write(src.read())
+        return paths
+
+def get_batch_backend(logger, api_key=None):
+    """
+    Backend do modo batch: o substituto local se OPENAI_BATCH_LOCAL_DIR estiver
+    definido, senão a Batch API da OpenAI.
+    """
+    local_dir = os.getenv("OPENAI_BATCH_LOCAL_DIR")
+    if local_dir:
+        logger.info(f"Usando o substituto local da Batch API em {local_dir}")
+        return LocalBatchBackend(local_dir)
+    api_key = api_key or os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        logger.error("OPENAI_API_KEY não configurada nas variáveis de ambiente.")
+        raise ValueError("OPENAI_API_KEY não encontrada")
+    return OpenAIBatchBackend(OpenAI(api_key=api_key))
+
+def run_local_batches(root, client, logger):
+    """
+    Faz o papel da OpenAI para o substituto local: executa, uma a uma, as
+    requisições dos batches pendentes em `root` com `client` (um cliente
+    OpenAI, ex.: apontado por OPENAI_BASE_URL para um servidor de testes) e
+    grava output.jsonl/errors.jsonl no formato da Batch API.
+    """
+    completed = 0
+    for batch_id in sorted(os.listdir(root)) if os.path.isdir(root) else []:
+        batch_dir = os.path.join(root, batch_id)
+        status_path = os.path.join(batch_dir, 'batch.json')
+        if not os.path.exists(status_path):
+            continue
+        with open(status_path, encoding='utf-8') as f:
+            batch = json.load(f)
+        if batch['status'] in BATCH_TERMINAL_STATUSES:
+            continue
+        outputs, errors = [], []
+        for request in _read_jsonl(os.path.join(batch_dir, 'input.jsonl')):
+            try:
+                response = client.chat.completions.create(**request['body'])
+                outputs.append({'custom_id': request['custom_id'], 'error': None,
+                                'response': {'status_code': 200, 'body': response.model_dump()}})
+            except Exception as e:
+                errors.append({'custom_id': request['custom_id'], 'response': None,
+                               'error': {'code': e.__class__.__name__, 'message': str(e)}})
+        for kind, lines in (('output', outputs), ('errors', errors)):
+            if lines:
+                with open(os.path.join(batch_dir, f"{kind}.jsonl"), 'w', encoding='utf-8') as f:
+                    f.writelines(json.dumps(line, ensure_ascii=False) + "\n" for line in lines)
+        _write_json(status_path, {**batch, 'status': 'completed'})
+        logger.info(f"Batch local {batch_id} concluído: {len(outputs)} respostas, {len(errors)} erros")
+        completed += 1
+    return completed
+
+def list_batch_jobs(jobs_dir=BATCH_JOBS_DIR, include_loaded=False):
+    """
+    Jobs registrados em `jobs_dir`, em ordem de criação (por padrão, só os
+    ainda não carregados na tabela silver).
+    """
+    jobs = []
+    for name in sorted(os.listdir(jobs_dir)) if os.path.isdir(jobs_dir) else []:
+        job_path = os.path.join(jobs_dir, name, 'job.json')
+        if not os.path.exists(job_path):
+            continue
+        with open(job_path, encoding='utf-8') as f:
+            job = json.load(f)
+        if include_loaded or not job.get('loaded_at'):
+            jobs.append(job)
+    return jobs
+
+def write_batch_input(df_headlines, job_dir, headlines_per_request=DEFAULT_HEADLINES_PER_REQUEST):
+    """
+    Grava input.jsonl (uma requisição por linha, com o mesmo prompt do modo
+    online) e headlines.jsonl (manchete de cada custom_id/id). Retorna o
+    número de requisições.
+    """
+    sizer = BatchSizer(headlines_per_request)
+    rows = [row for _, row in df_headlines.iterrows()]
+    per_request = sizer.size()
+    requests_written = 0
+    with open(os.path.join(job_dir, 'input.jsonl'), 'w', encoding='utf-8') as input_file, \
+         open(os.path.join(job_dir, 'headlines.jsonl'), 'w', encoding='utf-8') as headlines_file:
+        for start in range(0, len(rows), per_request):
+            chunk = rows[start:start + per_request]
+            custom_id = f"req-{requests_written:06d}"
+            items = [(str(position), row['title']) for position, row in enumerate(chunk)]
+            if len(items) == 1:
+                body = build_chat_request(items[0][1])
+            else:
+                body = build_batch_chat_request(items, sizer.max_tokens_for(len(items)))
+            input_file.write(json.dumps({'custom_id': custom_id, 'method': 'POST', 'url': BATCH_ENDPOINT,
+                                         'body': body}, ensure_ascii=False) + "\n")
+            for (item_id, _), row in zip(items, chunk):
+                headlines_file.write(json.dumps({
+                    'custom_id': custom_id, 'id': item_id, 'link': row['link'], 'title': row['title'],
+                    'source': row['source'] if 'source' in row else 'g1', 'scraped_at': row['scraped_at'],
+                }, ensure_ascii=False, default=str) + "\n")
+            requests_written += 1
+    return requests_written
+
+def submit_batch_job(engine, backend, logger, limit=5000, headlines_per_request=DEFAULT_HEADLINES_PER_REQUEST,
+                     jobs_dir=BATCH_JOBS_DIR, cache=None, near_dups=None, local_model=None):
+    """
+    Envia as manchetes pendentes (fora as que já estão em jobs não carregados)
+    como um job da Batch API. As encontradas no `cache`, com quase duplicata em
+    `near_dups` ou classificadas com confiança pelo `local_model` vão direto
+    para a tabela silver. Retorna o job registrado ou None se não havia nada a
+    enviar.
+    """
+    in_flight = [row['link'] for job in list_batch_jobs(jobs_dir)
+                 for row in _read_jsonl(os.path.join(jobs_dir, job['job'], 'headlines.jsonl'))]
+    df_unprocessed = get_unprocessed_headlines(engine, logger, batch_size=limit, exclude_links=in_flight)
+    if any(source is not None for source in (cache, near_dups, local_model)) and not df_unprocessed.empty:
+        cached = lookup_known_analyses(df_unprocessed['title'].tolist(), cache, near_dups, local_model)
+        hits = [build_enriched_record(row, analysis)
+                for (_, row), analysis in zip(df_unprocessed.iterrows(), cached) if analysis is not None]
+        if hits:
+            save_enriched_data(hits, engine, logger)
+            logger.info(f"🗃️ {len(hits)} manchetes resolvidas sem a Batch API (cache, quase duplicatas ou modelo local)")
+        df_unprocessed = df_unprocessed[[analysis is None for analysis in cached]]
+    if df_unprocessed.empty:
+        logger.info("Nenhuma manchete nova para enviar à Batch API.")
+        return None
+
+    name = datetime.now().strftime('%Y%m%dT%H%M%S')
+    job_dir = os.path.join(jobs_dir, name)
+    os.makedirs(job_dir)
+    try:
+        request_count = write_batch_input(df_unprocessed, job_dir, headlines_per_request)
+        if request_count > BATCH_MAX_REQUESTS:
+            raise ValueError(f"{request_count} requisições excedem o limite de {BATCH_MAX_REQUESTS} por batch; "
+                             "reduza --limit")
+        batch_id = backend.submit(os.path.join(job_dir, 'input.jsonl'))
+    except Exception:
+        # Sem job.json, as manchetes não ficam reservadas e voltam na próxima execução
+        shutil.rmtree(job_dir, ignore_errors=True)
+        raise
+
+    job = {'job': name, 'batch_id': batch_id, 'status': 'validating', 'submitted_at': datetime.now().isoformat(),
+           'requests': request_count, 'headlines': len(df_unprocessed), 'loaded_at': None}
+    _write_json(os.path.join(job_dir, 'job.json'), job)
+    logger.info(f"📤 Job {name} enviado à Batch API ({batch_id}): {len(df_unprocessed)} manchetes "
+                f"em {request_count} requisições")
+    return job
+
+def poll_batch_jobs(backend, logger, jobs_dir=BATCH_JOBS_DIR):
+    """
+    Atualiza o status dos jobs não carregados. Retorna os que ainda não terminaram.
+    """
+    running = []
+    for job in list_batch_jobs(jobs_dir):
+        if job['status'] not in BATCH_TERMINAL_STATUSES:
+            status = backend.status(job['batch_id'])
+            if status != job['status']:
+                logger.info(f"Job {job['job']} ({job['batch_id']}): {job['status']} → {status}")
+                job['status'] = status
+                _write_json(os.path.join(jobs_dir, job['job'], 'job.json'), job)
+        if job['status'] not in BATCH_TERMINAL_STATUSES:
+            running.append(job)
+    return running
+
+def parse_batch_output(job_dir, logger):
+    """
+    Monta os registros silver a partir de output.jsonl. Manchetes sem resultado
+    válido (requisição com erro, JSON inválido, rótulo fora da lista, item
+    ausente no lote) ficam de fora e voltam como pendentes na próxima execução,
+    tanto em requisições de uma manchete quanto de várias.
+    """
+    headlines = {}
+    for row in _read_jsonl(os.path.join(job_dir, 'headlines.jsonl')):
+        headlines.setdefault(row['custom_id'], []).append(row)
+
+    enriched_data = []
+    for line in _read_jsonl(os.path.join(job_dir, 'output.jsonl')):
+        rows = headlines.get(line['custom_id'], [])
+        response = line.get('response') or {}
+        if response.get('status_code') != 200:
+            continue
+        content = response['body']['choices'][0]['message']['content']
+        if len(rows) == 1:
+            try:
+                analysis = parse_analysis(content, 0.0)
+            except Exception as e:
+                logger.error(f"Erro ao processar manchete com OpenAI: {e}")
+                continue
+            # Rótulo fora da lista: fica pendente, como os itens inválidos de um lote
+            if analysis['sentiment'] == 'Erro' or analysis['category'] == 'Erro':
+                continue
+            analyses = {rows[0]['id']: analysis}
+        else:
+            analyses = parse_batch_analysis(content, [row['id'] for row in rows], 0.0)
+        for row in rows:
+            if row['id'] in analyses:
+                enriched_data.append(build_enriched_record(row, analyses[row['id']]))
+    return enriched_data
+
+def collect_batch_jobs(engine, backend, logger, jobs_dir=BATCH_JOBS_DIR, cache=None):
+    """
+    Baixa os resultados dos jobs terminados e ainda não carregados e os salva na
+    tabela silver (e no `cache` de respostas). Retorna o total de registros salvos.
+    """
+    total_saved = 0
+    for job in list_batch_jobs(jobs_dir):
+        if job['status'] not in BATCH_TERMINAL_STATUSES:
+            continue
+        job_dir = os.path.join(jobs_dir, job['job'])
+        backend.download(job['batch_id'], job_dir)
+        enriched_data = parse_batch_output(job_dir, logger)
+        if cache is not None:
+            cache.store((record['title'], {'sentiment': record['sentiment'], 'category': record['category'],
+                                           'confidence': record['confidence_score']})
+                        for record in enriched_data)
+        saved_count = save_enriched_data(enriched_data, engine, logger) if enriched_data else 0
+        job.update(loaded_at=datetime.now().isoformat(), saved=saved_count,
+                   failed_requests=len(_read_jsonl(os.path.join(job_dir, 'errors.jsonl'))))
+        _write_json(os.path.join(job_dir, 'job.json'), job)
+        logger.info(f"📥 Job {job['job']} ({job['status']}) carregado: {saved_count} de {job['headlines']} "
+                    f"manchetes salvas; {job['failed_requests']} requisições com erro")
+        total_saved += saved_count
+    return total_saved
+
+def main(mode="async", limit=5000, concurrency=DEFAULT_CONCURRENCY, rpm=DEFAULT_RPM_LIMIT,
+         tpm=DEFAULT_TPM_LIMIT, headlines_per_request=DEFAULT_HEADLINES_PER_REQUEST, use_cache=True,
+         use_near_dups=True, use_local_model=True):
     """
     Função principal do enriquecimento de manchetes.
+
+    Args:
+        mode: 'async' (chamadas concorrentes com limite de RPM/TPM), 'sync' (uma por vez),
+            'batch' (envia as pendentes à Batch API), 'batch-collect' (carrega os jobs
+            terminados) ou 'batch-local-run' (executa os batches do substituto local).
+        limit: máximo de manchetes pendentes processadas nesta execução.
+        concurrency: chamadas simultâneas no modo assíncrono.
+        rpm: limite de requisições por minuto no modo assíncrono.
+        tpm: limite de tokens por minuto no modo assíncrono.
+        headlines_per_request: máximo de manchetes por requisição nos modos async e batch
+            (reduzido automaticamente para caber em OPENAI_BATCH_MAX_TOKENS).
+        use_cache: consulta e alimenta o cache de respostas (llm_response_cache).
+        use_near_dups: herda a classificação de quase duplicatas já enriquecidas
+            (índice MinHash em data/index/near_dups, limiar NEAR_DUP_THRESHOLD).
+        use_local_model: classifica localmente as manchetes em que o modelo treinado
+            (data/models/local_classifier.npz) passa do limiar calibrado; só as
+            demais vão ao LLM.
     """
     # Configurar logging
     logger = setup_logging()
+    cache = None
+    near_dups = None
+    local_model = None
     
     try:
-        logger.info("🚀 Iniciando processo de enriquecimento de manchetes...")
+        logger.info(f"🚀 Iniciando processo de enriquecimento de manchetes (modo {mode})...")
         
         # 1. Configurar conexões
         logger.info("⚙️ Configurando conexões...")
+        if mode == "batch-local-run":
+            run_local_batches(os.getenv("OPENAI_BATCH_LOCAL_DIR", ""), OpenAI(max_retries=5), logger)
+            return
+
         engine = get_database_engine()
-        client = get_openai_client(logger)
+        client = get_openai_client(logger) if mode == "sync" else None
         
         # 2. Preparar estrutura do banco
         create_silver_table_if_not_exists(engine, logger)
+        if use_cache:
+            cache = LlmResponseCache(get_postgres_connection(), OPENAI_MODEL, OPENAI_TEMPERATURE, PROMPT_VERSION)
+        if use_near_dups and mode != "batch-collect":
+            near_dups = NearDupIndex.load(conn=get_postgres_connection())
+            near_dups.refresh()
+        if use_local_model and mode != "batch-collect":
+            local_model = LocalClassifier.load()
+            if local_model is None:
+                logger.info("Classificador local ainda não treinado; todas as manchetes vão ao LLM.")
+
+        if mode == "batch":
+            submit_batch_job(engine, get_batch_backend(logger), logger, limit=limit,
+                             headlines_per_request=headlines_per_request, cache=cache, near_dups=near_dups, local_model=local_model)
+            return
+        if mode == "batch-collect":
+            backend = get_batch_backend(logger)
+            running = poll_batch_jobs(backend, logger)
+            total_processed = collect_batch_jobs(engine, backend, logger, cache=cache)
+            logger.info(f"🎉 {total_processed} manchetes carregadas da Batch API; {len(running)} jobs em andamento.")
+            # Único passo diário que toca o cache em produção: a limpeza precisa rodar aqui
+            if cache is not None:
+                cache.evict()
+            generate_processing_summary(engine, logger, cache)
+            return
         
         # 3. Buscar manchetes não processadas
         logger.info("🔍 Buscando manchetes não processadas...")
-        df_unprocessed = get_unprocessed_headlines(engine, logger)
+        df_unprocessed = get_unprocessed_headlines(engine, logger, batch_size=limit)
         
         if df_unprocessed.empty:
             logger.info("✅ Nenhuma manchete nova para processar. Processo finalizado.")
-            generate_processing_summary(engine, logger)
+            if cache is not None:
+                cache.evict()
+            generate_processing_summary(engine, logger, cache, near_dups, local_model)
             return
         
         # 4. Processar em lotes (para evitar problemas de memória)
         BATCH_SIZE = 50  # Processar 50 manchetes por vez
         total_processed = 0
-        total_batches = (len(df_unprocessed) + BATCH_SIZE - 1) // BATCH_SIZE
-        
-        for batch_num in range(0, len(df_unprocessed), BATCH_SIZE):
-            current_batch = batch_num // BATCH_SIZE + 1
-            batch_df = df_unprocessed.iloc[batch_num:batch_num + BATCH_SIZE]
-            
-            logger.info(f"📦 Processando lote {current_batch}/{total_batches} ({len(batch_df)} manchetes)...")
-            
-            # Processar lote
-            enriched_data = process_headlines_batch(
-                batch_df, 
-                client, 
-                logger, 
-                batch_name=f"{current_batch}/{total_batches}"
-            )
-            
-            # Salvar lote
-            saved_count = save_enriched_data(enriched_data, engine, logger)
-            total_processed += saved_count
+
+        if mode == "async":
+            # Lotes maiores para não esvaziar o pool de chamadas a cada salvamento
+            total_processed = asyncio.run(process_all_headlines_async(
+                df_unprocessed, engine, logger, max(BATCH_SIZE, concurrency * 10),
+                concurrency=concurrency, rpm=rpm, tpm=tpm, headlines_per_request=headlines_per_request,
+                cache=cache, near_dups=near_dups, local_model=local_model
+            ))
+        else:
+            total_batches = (len(df_unprocessed) + BATCH_SIZE - 1) // BATCH_SIZE
             
-            logger.info(f"✅ Lote {current_batch}/{total_batches} concluído. Total processado até agora: {total_processed}")
+            for batch_num in range(0, len(df_unprocessed), BATCH_SIZE):
+                current_batch = batch_num // BATCH_SIZE + 1
+                batch_df = df_unprocessed.iloc[batch_num:batch_num + BATCH_SIZE]
+                
+                logger.info(f"📦 Processando lote {current_batch}/{total_batches} ({len(batch_df)} manchetes)...")
+                
+                # Processar lote
+                enriched_data = process_headlines_batch(
+                    batch_df, 
+                    client, 
+                    logger, 
+                    batch_name=f"{current_batch}/{total_batches}",
+                    cache=cache,
+                    near_dups=near_dups,
+                    local_model=local_model
+                )
+                
+                # Salvar lote
+                saved_count = save_enriched_data(enriched_data, engine, logger)
+                total_processed += saved_count
+                if near_dups is not None:
+                    near_dups.refresh()
+                
+                logger.info(f"✅ Lote {current_batch}/{total_batches} concluído. Total processado até agora: {total_processed}")
         
         # 5. Gerar resumo final
         logger.info("📊 Gerando resumo final...")
-        generate_processing_summary(engine, logger)
+        if cache is not None:
+            cache.evict()
+        generate_processing_summary(engine, logger, cache, near_dups, local_model)
         
         logger.info(f"🎉 Processo concluído com sucesso! Total processado: {total_processed} manchetes.")
         
@@ -433,7 +1311,41 @@ def main():
         logger.error(f"❌ Erro crítico no processo: {e}")
         raise
     finally:
+        if cache is not None:
+            cache.conn.close()
+        if near_dups is not None:
+            try:
+                near_dups.save()
+            except Exception as e:
+                logger.warning(f"Não foi possível salvar o índice de quase duplicatas: {e}")
+            near_dups.conn.close()
         logger.info("🔚 Finalizando processo de enriquecimento.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description='Enriquecimento das manchetes com OpenAI (camada Silver)')
+    parser.add_argument('--mode', choices=['async', 'sync', 'batch', 'batch-collect', 'batch-local-run'],
+                        default='async',
+                        help='async: chamadas concorrentes com limite de RPM/TPM (default); sync: uma por vez; '
+                             'batch: envia as pendentes à Batch API; batch-collect: carrega os jobs terminados; '
+                             'batch-local-run: executa os batches de OPENAI_BATCH_LOCAL_DIR (testes)')
+    parser.add_argument('--limit', type=int, default=5000, help='Máximo de manchetes pendentes por execução')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help=f'Chamadas simultâneas no modo async (default: OPENAI_CONCURRENCY ou {DEFAULT_CONCURRENCY})')
+    parser.add_argument('--rpm', type=int, default=DEFAULT_RPM_LIMIT,
+                        help=f'Requisições por minuto (default: OPENAI_RPM_LIMIT ou {DEFAULT_RPM_LIMIT})')
+    parser.add_argument('--tpm', type=int, default=DEFAULT_TPM_LIMIT,
+                        help=f'Tokens por minuto (default: OPENAI_TPM_LIMIT ou {DEFAULT_TPM_LIMIT})')
+    parser.add_argument('--headlines-per-request', type=int, default=DEFAULT_HEADLINES_PER_REQUEST,
+                        help='Máximo de manchetes por requisição nos modos async e batch (default: '
+                             f'OPENAI_HEADLINES_PER_REQUEST ou {DEFAULT_HEADLINES_PER_REQUEST})')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Não consulta nem alimenta o cache de respostas (llm_response_cache)')
+    parser.add_argument('--no-near-dup', action='store_true',
+                        help='Não herda a classificação de quase duplicatas (índice em data/index/near_dups)')
+    parser.add_argument('--no-local-model', action='store_true',
+                        help='Envia todas as manchetes ao LLM, sem o classificador local')
+    args = parser.parse_args()
+    main(mode=args.mode, limit=args.limit, concurrency=args.concurrency, rpm=args.rpm, tpm=args.tpm,
+         headlines_per_request=args.headlines_per_request, use_cache=not args.no_cache,
+         use_near_dups=not args.no_near_dup, use_local_model=not args.no_local_model)
\ No newline at end of file
@@ -0,0 +1,374 @@
+"""Classificador local (TF-IDF com hashing + regressão logística em NumPy) na frente do LLM.
+
+Milhares de manchetes já rotuladas pelo LLM estão em silver_enriched_headlines.
+Este módulo treina com elas dois modelos lineares (sentimento e categoria) e,
+no enriquecimento, classifica de uma vez todas as manchetes pendentes do lote:
+só as que ficam abaixo do limiar de confiança seguem para a OpenAI. O registro
+silver das demais sai com `model_used = 'local:<versão>'`.
+
+Como funciona:
+    - features: unigramas e bigramas do título dobrado (`fold_title`), com
+      hashing em 2^18 posições, tf sublinear, idf do treino e norma L2;
+    - treino: softmax com Adagrad em mini-lotes, atualizando só as linhas da
+      matriz de pesos tocadas pelo lote;
+    - 20% das manchetes (títulos distintos) ficam de fora para calibrar: a
+      temperatura de cada modelo é ajustada pela log-verossimilhança e a
+      confiança é o produto das duas probabilidades calibradas;
+    - o limiar é o menor valor em que a concordância com o LLM, entre as
+      manchetes aceitas, ainda chega a LOCAL_CLASSIFIER_TARGET_AGREEMENT
+      (default 0.95). Se nenhum limiar chega lá, o modelo não classifica nada.
+      LOCAL_CLASSIFIER_THRESHOLD força um limiar fixo.
+
+O relatório do treino (acurácia, limiar escolhido e a curva cobertura x
+concordância por limiar) fica no modelo e em local_classifier_report.json, para
+ajustar o limiar entre custo e qualidade. Só rótulos vindos do LLM entram no
+treino: linhas herdadas (near-dup:) ou classificadas localmente (local:) não.
+"""
+import json
+import logging
+import os
+import zlib
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+
+from near_dup_index import fold_title
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'models')
+DEFAULT_MODEL_PATH = os.path.join(MODELS_DIR, 'local_classifier.npz')
+DEFAULT_TARGET_AGREEMENT = 0.95
+DEFAULT_MIN_TRAINING_ROWS = 2000
+DEFAULT_MAX_TRAINING_ROWS = 200_000
+DEFAULT_RETRAIN_AFTER_DAYS = 7
+LOCAL_PREFIX = 'local:'
+
+HASH_BITS = 18
+N_FEATURES = 1 << HASH_BITS  # posição 0 é o viés
+HOLDOUT_FRACTION = 0.2
+MIN_DOCUMENT_FREQUENCY = 3
+EPOCHS = 8
+MINI_BATCH = 256
+LEARNING_RATE = 0.5
+L2_PENALTY = 1e-5
+TEMPERATURES = np.geomspace(0.25, 4.0, 33)
+REPORT_THRESHOLDS = (0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95)
+MIN_ACCEPTED_ROWS = 50  # mínimo de manchetes aceitas no holdout para valer um limiar
+
+TRAINING_SQL = """
+    SELECT title, sentiment, category
+    FROM silver_enriched_headlines
+    WHERE sentiment <> 'Erro' AND category <> 'Erro'
+    AND split_part(COALESCE(model_used, ''), ':', 1) NOT IN ('near-dup', 'local')
+    ORDER BY id DESC
+    LIMIT %s
+"""
+
+
+def _tokens(title: str) -> list:
+    words = fold_title(title).split()
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def hash_features(titles: list, idf: Optional[np.ndarray] = None) -> tuple:
+    """Matriz esparsa dos títulos em CSR: (indptr, colunas, valores).
+
+    Toda linha tem a coluna 0 (viés, valor 1), então nenhuma fica vazia.
+    """
+    rows, cols = [], []
+    for row, title in enumerate(titles):
+        tokens = _tokens(title)
+        rows.extend([row] * (len(tokens) + 1))
+        cols.append(0)
+        cols.extend(1 + zlib.crc32(token.encode('utf-8')) % (N_FEATURES - 1) for token in tokens)
+    keys, counts = np.unique(np.array(rows, dtype=np.int64) * N_FEATURES + np.array(cols, dtype=np.int64),
+                             return_counts=True)
+    rows, cols = keys // N_FEATURES, (keys % N_FEATURES).astype(np.int32)
+    values = (1.0 + np.log(counts)).astype(np.float32)
+    if idf is not None:
+        values *= idf[cols]
+    is_term = cols != 0
+    norms = np.sqrt(np.bincount(rows, weights=values * values * is_term, minlength=len(titles)))
+    values = np.where(is_term, values / np.maximum(norms[rows], 1e-12), 1.0).astype(np.float32)
+    indptr = np.searchsorted(rows, np.arange(len(titles) + 1))
+    return indptr, cols, values
+
+
+def _take_rows(matrix: tuple, rows: np.ndarray) -> tuple:
+    indptr, cols, values = matrix
+    lengths = indptr[rows + 1] - indptr[rows]
+    new_indptr = np.concatenate([[0], np.cumsum(lengths)])
+    positions = np.repeat(indptr[rows] - new_indptr[:-1], lengths) + np.arange(new_indptr[-1])
+    return new_indptr, cols[positions], values[positions]
+
+
+def _scores(matrix: tuple, weights: np.ndarray) -> np.ndarray:
+    indptr, cols, values = matrix
+    return np.add.reduceat(values[:, None] * weights[cols], indptr[:-1], axis=0)
+
+
+def _softmax(scores: np.ndarray) -> np.ndarray:
+    scores = scores - scores.max(axis=1, keepdims=True)
+    exp = np.exp(scores)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+def _fit_softmax(matrix: tuple, labels: np.ndarray, n_classes: int, rng) -> np.ndarray:
+    """Regressão logística multinomial com Adagrad em mini-lotes (atualização esparsa)."""
+    weights = np.zeros((N_FEATURES, n_classes), dtype=np.float32)
+    squared = np.full((N_FEATURES, n_classes), 1e-8, dtype=np.float32)
+    n_rows = len(labels)
+    for _ in range(EPOCHS):
+        order = rng.permutation(n_rows)
+        for start in range(0, n_rows, MINI_BATCH):
+            batch = order[start:start + MINI_BATCH]
+            indptr, cols, values = _take_rows(matrix, batch)
+            probs = _softmax(_scores((indptr, cols, values), weights))
+            probs[np.arange(len(batch)), labels[batch]] -= 1.0
+            probs /= len(batch)
+            touched, inverse = np.unique(cols, return_inverse=True)
+            gradient = np.zeros((len(touched), n_classes), dtype=np.float32)
+            row_of_value = np.repeat(np.arange(len(batch)), np.diff(indptr))
+            np.add.at(gradient, inverse, values[:, None] * probs[row_of_value])
+            gradient += L2_PENALTY * weights[touched]
+            squared[touched] += gradient * gradient
+            weights[touched] -= LEARNING_RATE * gradient / np.sqrt(squared[touched])
+    return weights
+
+
+def _fit_temperature(scores: np.ndarray, labels: np.ndarray) -> float:
+    """Temperatura que minimiza a log-verossimilhança negativa no holdout."""
+    losses = [-np.log(_softmax(scores / t)[np.arange(len(labels)), labels] + 1e-12).mean() for t in TEMPERATURES]
+    return float(TEMPERATURES[int(np.argmin(losses))])
+
+
+def agreement_curve(confidence: np.ndarray, correct: np.ndarray, thresholds=REPORT_THRESHOLDS) -> list:
+    """Cobertura (fração resolvida localmente) e concordância com o LLM para cada limiar."""
+    curve = []
+    for threshold in thresholds:
+        accepted = confidence >= threshold
+        curve.append({'threshold': threshold, 'coverage': round(float(accepted.mean()), 4),
+                      'agreement': round(float(correct[accepted].mean()), 4) if accepted.any() else None})
+    return curve
+
+
+def choose_threshold(confidence: np.ndarray, correct: np.ndarray, target_agreement: float) -> Optional[float]:
+    """Menor limiar cuja concordância entre as manchetes aceitas ainda chega à meta (None se nenhum chega)."""
+    order = np.argsort(-confidence, kind='stable')
+    cumulative = np.cumsum(correct[order]) / np.arange(1, len(order) + 1)
+    valid = np.flatnonzero((cumulative >= target_agreement) & (np.arange(1, len(order) + 1) >= MIN_ACCEPTED_ROWS))
+    if not len(valid):
+        return None
+    return float(confidence[order][valid[-1]])
+
+
+class LocalClassifier:
+    """Modelos lineares de sentimento e categoria com confiança calibrada e limiar de roteamento."""
+
+    def __init__(self, sentiment_weights, category_weights, idf, meta: dict, path: str = DEFAULT_MODEL_PATH):
+        self.sentiment_weights = sentiment_weights
+        self.category_weights = category_weights
+        self.idf = idf
+        self.meta = meta
+        self.path = path
+        self.sentiments = meta['sentiments']
+        self.categories = meta['categories']
+        forced = os.getenv('LOCAL_CLASSIFIER_THRESHOLD')
+        self.threshold = float(forced) if forced else meta['threshold']
+        self.version = f"tfidf-{meta['trained_at'][:10].replace('-', '')}"
+        self.hits = 0
+        self.lookups = 0
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_MODEL_PATH) -> Optional['LocalClassifier']:
+        """Carrega o modelo treinado (ou None se ainda não existe)."""
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            return cls(data['sentiment_weights'], data['category_weights'], data['idf'],
+                       json.loads(str(data['meta'])), path=path)
+
+    def predict(self, titles: list) -> tuple:
+        """Índices de sentimento e categoria e a confiança calibrada de cada título (vetorizado)."""
+        matrix = hash_features(titles, self.idf)
+        sentiment_probs = _softmax(_scores(matrix, self.sentiment_weights) / self.meta['temperatures'][0])
+        category_probs = _softmax(_scores(matrix, self.category_weights) / self.meta['temperatures'][1])
+        confidence = sentiment_probs.max(axis=1) * category_probs.max(axis=1)
+        return sentiment_probs.argmax(axis=1), category_probs.argmax(axis=1), confidence
+
+    def lookup_analyses(self, titles: list) -> list:
+        """Análise local de cada título quando a confiança passa do limiar (None caso contrário)."""
+        self.lookups += len(titles)
+        if not titles or self.threshold is None:
+            return [None] * len(titles)
+        sentiments, categories, confidence = self.predict(titles)
+        results = []
+        for sentiment, category, score in zip(sentiments, categories, confidence):
+            if score < self.threshold:
+                results.append(None)
+                continue
+            results.append({
+                'sentiment': self.sentiments[sentiment],
+                'category': self.categories[category],
+                'confidence': round(float(score), 4),
+                'processing_time': 0.0,
+                'model_used': f"{LOCAL_PREFIX}{self.version}",
+            })
+        self.hits += sum(result is not None for result in results)
+        return results
+
+    def summary(self) -> dict:
+        return {'hits': self.hits, 'lookups': self.lookups, 'threshold': self.threshold, 'version': self.version}
+
+    def save(self):
+        """Grava o modelo (e o relatório em JSON ao lado) de forma atômica."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp.npz"
+        np.savez(tmp_path, sentiment_weights=self.sentiment_weights, category_weights=self.category_weights,
+                 idf=self.idf, meta=np.array(json.dumps(self.meta, ensure_ascii=False)))
+        os.replace(tmp_path, self.path)
+        report_path = self.path.replace('.npz', '_report.json')
+        with open(f"{report_path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f, ensure_ascii=False, indent=2)
+        os.replace(f"{report_path}.tmp", report_path)
+        logging.info(f"[Local] Modelo {self.version} salvo em {self.path}")
+
+
+def needs_retrain(path: str = DEFAULT_MODEL_PATH, retrain_after_days: Optional[int] = None) -> bool:
+    """True se o modelo não existe ou foi treinado há mais de `retrain_after_days` dias."""
+    if retrain_after_days is None:
+        retrain_after_days = int(os.getenv('LOCAL_CLASSIFIER_RETRAIN_DAYS', DEFAULT_RETRAIN_AFTER_DAYS))
+    return (not os.path.exists(path)
+            or datetime.now().timestamp() - os.path.getmtime(path) > retrain_after_days * 86400)
+
+
+def train_from_rows(titles: list, sentiments: list, categories: list, target_agreement: Optional[float] = None,
+                    path: str = DEFAULT_MODEL_PATH, seed: int = 20250905) -> LocalClassifier:
+    """Treina e calibra o classificador a partir de manchetes rotuladas pelo LLM."""
+    if target_agreement is None:
+        target_agreement = float(os.getenv('LOCAL_CLASSIFIER_TARGET_AGREEMENT', DEFAULT_TARGET_AGREEMENT))
+    # Um título repetido só conta uma vez, para o holdout não ver manchetes do treino
+    unique = {}
+    for title, sentiment, category in zip(titles, sentiments, categories):
+        unique.setdefault(fold_title(title), (title, sentiment, category))
+    titles, sentiments, categories = (list(column) for column in zip(*unique.values()))
+
+    sentiment_classes = sorted(set(sentiments))
+    category_classes = sorted(set(categories))
+    sentiment_labels = np.array([sentiment_classes.index(s) for s in sentiments])
+    category_labels = np.array([category_classes.index(c) for c in categories])
+
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(titles))
+    n_holdout = max(int(len(titles) * HOLDOUT_FRACTION), MIN_ACCEPTED_ROWS)
+    holdout, train = order[:n_holdout], order[n_holdout:]
+
+    raw = hash_features([titles[i] for i in train])
+    document_frequency = np.bincount(raw[1], minlength=N_FEATURES)
+    idf = (np.log((1 + len(train)) / (1 + document_frequency)) + 1).astype(np.float32)
+    # Termos raros (bigramas únicos, erros de digitação) só decoram o treino
+    idf[document_frequency < MIN_DOCUMENT_FREQUENCY] = 0.0
+    idf[0] = 1.0
+    train_matrix = hash_features([titles[i] for i in train], idf)
+    holdout_matrix = hash_features([titles[i] for i in holdout], idf)
+
+    sentiment_weights = _fit_softmax(train_matrix, sentiment_labels[train], len(sentiment_classes), rng)
+    category_weights = _fit_softmax(train_matrix, category_labels[train], len(category_classes), rng)
+
+    sentiment_scores = _scores(holdout_matrix, sentiment_weights)
+    category_scores = _scores(holdout_matrix, category_weights)
+    temperatures = [_fit_temperature(sentiment_scores, sentiment_labels[holdout]),
+                    _fit_temperature(category_scores, category_labels[holdout])]
+    sentiment_probs = _softmax(sentiment_scores / temperatures[0])
+    category_probs = _softmax(category_scores / temperatures[1])
+    sentiment_correct = sentiment_probs.argmax(axis=1) == sentiment_labels[holdout]
+    category_correct = category_probs.argmax(axis=1) == category_labels[holdout]
+    correct = sentiment_correct & category_correct
+    confidence = sentiment_probs.max(axis=1) * category_probs.max(axis=1)
+    threshold = choose_threshold(confidence, correct, target_agreement)
+
+    meta = {
+        'trained_at': datetime.now().isoformat(timespec='seconds'),
+        'sentiments': sentiment_classes,
+        'categories': category_classes,
+        'temperatures': temperatures,
+        'threshold': threshold,
+        'target_agreement': target_agreement,
+        'train_rows': int(len(train)),
+        'holdout_rows': int(len(holdout)),
+        'sentiment_accuracy': round(float(sentiment_correct.mean()), 4),
+        'category_accuracy': round(float(category_correct.mean()), 4),
+        'agreement': round(float(correct.mean()), 4),
+        'expected_coverage': round(float((confidence >= threshold).mean()), 4) if threshold is not None else 0.0,
+        'curve': agreement_curve(confidence, correct),
+    }
+    return LocalClassifier(sentiment_weights, category_weights, idf, meta, path=path)
+
+
+def log_report(meta: dict, logger=logging):
+    logger.info(f"[Local] Treino com {meta['train_rows']} manchetes, holdout de {meta['holdout_rows']}: "
+                f"sentimento {meta['sentiment_accuracy']:.1%}, categoria {meta['category_accuracy']:.1%}, "
+                f"ambos {meta['agreement']:.1%} de concordância com o LLM")
+    if meta['threshold'] is None:
+        logger.warning(f"[Local] Nenhum limiar chega a {meta['target_agreement']:.0%} de concordância; "
+                       "o modelo não vai classificar manchetes")
+    else:
+        logger.info(f"[Local] Limiar {meta['threshold']:.3f}: {meta['expected_coverage']:.1%} das manchetes "
+                    f"ficam fora do LLM com {meta['target_agreement']:.0%} de concordância")
+    for point in meta['curve']:
+        agreement = f"{point['agreement']:.1%}" if point['agreement'] is not None else '-'
+        logger.info(f"[Local]   limiar {point['threshold']:.2f}: cobertura {point['coverage']:.1%}, "
+                    f"concordância {agreement}")
+
+
+def train_local_classifier(conn, path: str = DEFAULT_MODEL_PATH, min_rows: Optional[int] = None,
+                           max_rows: Optional[int] = None) -> Optional[dict]:
+    """Retreina o modelo com os rótulos do LLM em silver_enriched_headlines e o salva.
+
+    Retorna o relatório do treino, ou None se ainda não há manchetes suficientes.
+    """
+    if min_rows is None:
+        min_rows = int(os.getenv('LOCAL_CLASSIFIER_MIN_ROWS', DEFAULT_MIN_TRAINING_ROWS))
+    with conn.cursor() as cur:
+        cur.execute(TRAINING_SQL, (max_rows or DEFAULT_MAX_TRAINING_ROWS,))
+        rows = cur.fetchall()
+    conn.commit()
+    if len(rows) < min_rows:
+        logging.info(f"[Local] Só {len(rows)} manchetes rotuladas pelo LLM (mínimo {min_rows}); treino adiado")
+        return None
+    titles, sentiments, categories = zip(*rows)
+    model = train_from_rows(list(titles), list(sentiments), list(categories), path=path)
+    log_report(model.meta)
+    model.save()
+    return model.meta
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from pg_connection import get_postgres_connection
+    import sys
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s',
+                        handlers=[logging.StreamHandler(sys.stdout)])
+    parser = argparse.ArgumentParser(description='Classificador local de manchetes (treino e relatório)')
+    parser.add_argument('command', choices=['train', 'report'],
+                        help='train: retreina com a tabela silver; report: mostra o relatório do modelo atual')
+    parser.add_argument('--force', action='store_true',
+                        help=f'Retreina mesmo com modelo recente (LOCAL_CLASSIFIER_RETRAIN_DAYS, '
+                             f'default {DEFAULT_RETRAIN_AFTER_DAYS})')
+    args = parser.parse_args()
+
+    if args.command == 'report':
+        model = LocalClassifier.load()
+        if model is None:
+            sys.exit("Nenhum modelo treinado em " + DEFAULT_MODEL_PATH)
+        log_report(model.meta)
+    elif args.force or needs_retrain():
+        conn = get_postgres_connection()
+        try:
+            train_local_classifier(conn)
+        finally:
+            conn.close()
+    else:
+        logging.info("[Local] Modelo treinado recentemente; use --force para retreinar")
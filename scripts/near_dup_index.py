@@ -0,0 +1,303 @@
+"""Índice MinHash/LSH das manchetes já enriquecidas, para herdar a classificação de quase duplicatas.
+
+O G1 publica várias versões quase iguais da mesma manchete ("AO VIVO: ...",
+redação atualizada, variantes regionais). Em vez de uma chamada ao LLM por
+versão, a manchete nova herda sentimento, categoria e confiança da vizinha mais
+parecida quando a similaridade de Jaccard estimada passa do limiar
+(NEAR_DUP_THRESHOLD, default 0.8). O registro silver sai com
+`model_used = 'near-dup:<modelo da vizinha>'`.
+
+Como funciona:
+    - o título é dobrado (sem acentos, sem caixa, sem pontuação e sem prefixos
+      como "ao vivo") e quebrado em shingles de 4 caracteres;
+    - a assinatura MinHash tem 128 permutações (hash multiply-shift sobre o
+      crc32 dos shingles); o LSH usa 16 bandas de 8 linhas, o que torna candidatas
+      as manchetes com Jaccard a partir de ~0.7;
+    - cada banda guarda chaves de 32 bits ordenadas, consultadas por busca
+      binária; as candidatas são confirmadas pela assinatura de 8 bits por
+      permutação (b-bit MinHash, com correção das colisões);
+    - as linhas novas de silver_enriched_headlines entram pela marca d'água
+      (maior id já indexado), sem reconstruir o índice; ficam num delta em
+      memória até o próximo merge.
+
+O índice fica em data/index/near_dups/ como arrays .npy, uma geração por
+diretório (current.json aponta para a vigente e é trocado de forma atômica).
+Os arrays são abertos com mmap: cerca de 270 bytes por manchete, sem carregar
+tudo em memória para consultar. Linhas herdadas (e as classificadas pelo
+modelo local) não entram no índice, para que uma classificação não se propague
+em cadeia.
+"""
+import json
+import logging
+import os
+import re
+import shutil
+import unicodedata
+import zlib
+from typing import Optional
+
+import numpy as np
+
+DEFAULT_INDEX_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'index', 'near_dups'
+)
+DEFAULT_THRESHOLD = 0.8
+NUM_PERM = 128
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS
+SHINGLE_SIZE = 4
+MERGE_DELTA_ROWS = 50_000
+REFRESH_CHUNK_ROWS = 50_000
+INHERITED_PREFIX = 'near-dup:'
+INDEX_FORMAT = 1  # muda quando a assinatura muda (permutações, shingles, bandas)
+
+_rng = np.random.default_rng(20250905)
+# Hash multiply-shift: (a * x + b) mod 2^64, bits altos; a ímpar
+_PERM_A = _rng.integers(1, 1 << 63, NUM_PERM, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+_PERM_B = _rng.integers(0, 1 << 63, NUM_PERM, dtype=np.uint64)
+_BAND_MULT = _rng.integers(1, 1 << 63, ROWS_PER_BAND, dtype=np.uint64) | np.uint64(1)
+
+_NON_ALNUM_RE = re.compile(r'[^0-9a-z]+')
+_PREFIX_RE = re.compile(r'^(?:ao vivo|video|veja|urgente|exclusivo)\b\s*')
+
+REFRESH_SQL = """
+    SELECT id, title, sentiment, category, confidence_score, model_used
+    FROM silver_enriched_headlines
+    WHERE id > %s
+    AND sentiment <> 'Erro' AND category <> 'Erro'
+    AND split_part(COALESCE(model_used, ''), ':', 1) NOT IN ('near-dup', 'local')
+    ORDER BY id
+"""
+
+
+def fold_title(title: str) -> str:
+    """Título sem acentos, caixa, pontuação e prefixos de chamada ("AO VIVO", "VÍDEO")."""
+    decomposed = unicodedata.normalize('NFKD', title or '')
+    folded = ''.join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+    folded = _NON_ALNUM_RE.sub(' ', folded).strip()
+    return _PREFIX_RE.sub('', folded).strip()
+
+
+def shingle_hashes(title: str) -> np.ndarray:
+    """crc32 dos shingles de SHINGLE_SIZE caracteres do título dobrado."""
+    text = fold_title(title)
+    if len(text) <= SHINGLE_SIZE:
+        shingles = {text}
+    else:
+        shingles = {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+    return np.fromiter((zlib.crc32(shingle.encode('utf-8')) for shingle in shingles),
+                       dtype=np.uint64, count=len(shingles))
+
+
+def minhash_signature(title: str) -> np.ndarray:
+    values = (np.outer(shingle_hashes(title), _PERM_A) + _PERM_B) >> np.uint64(32)
+    return values.min(axis=0)
+
+
+def band_keys(signature: np.ndarray) -> np.ndarray:
+    """Chave de 32 bits de cada banda da assinatura."""
+    bands = signature.reshape(BANDS, ROWS_PER_BAND)
+    return ((bands * _BAND_MULT).sum(axis=1) >> np.uint64(32)).astype(np.uint32)
+
+
+def _label_code(vocabulary: list, label: str) -> int:
+    if label not in vocabulary:
+        vocabulary.append(label)
+    return vocabulary.index(label)
+
+
+class NearDupIndex:
+    """Índice LSH (base ordenada em disco + delta em memória) das manchetes já classificadas."""
+
+    ARRAYS = ('signatures', 'labels', 'confidence', 'silver_ids', 'sorted_keys', 'sorted_rows')
+
+    def __init__(self, path: str = DEFAULT_INDEX_DIR, threshold: Optional[float] = None, conn=None):
+        self.path = path
+        self.conn = conn
+        self.threshold = (threshold if threshold is not None
+                          else float(os.getenv('NEAR_DUP_THRESHOLD', DEFAULT_THRESHOLD)))
+        self.generation = 0
+        self.watermark = 0
+        self.vocabularies = {'sentiment': [], 'category': [], 'model': []}
+        self.signatures = np.zeros((0, NUM_PERM), dtype=np.uint8)
+        self.labels = np.zeros((0, 3), dtype=np.uint8)  # sentimento, categoria, modelo
+        self.confidence = np.zeros(0, dtype=np.float32)
+        self.silver_ids = np.zeros(0, dtype=np.int64)
+        self.sorted_keys = np.zeros((BANDS, 0), dtype=np.uint32)
+        self.sorted_rows = np.zeros((BANDS, 0), dtype=np.int32)
+        self._delta = []
+        self._delta_arrays = None
+        self._dirty = False
+        self.hits = 0
+        self.lookups = 0
+
+    def __len__(self):
+        return len(self.silver_ids) + len(self._delta)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_INDEX_DIR, threshold: Optional[float] = None,
+             conn=None) -> 'NearDupIndex':
+        """Abre a geração vigente (arrays em mmap) ou retorna um índice vazio."""
+        index = cls(path, threshold, conn)
+        meta_path = os.path.join(path, 'current.json')
+        if not os.path.exists(meta_path):
+            return index
+        with open(meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('format') != INDEX_FORMAT:
+            logging.warning("[NearDup] Índice em formato antigo; será reconstruído a partir da tabela silver")
+            return index
+        generation_dir = os.path.join(path, meta['directory'])
+        for name in cls.ARRAYS:
+            setattr(index, name, np.load(os.path.join(generation_dir, f"{name}.npy"), mmap_mode='r'))
+        index.generation = meta['generation']
+        index.watermark = meta['watermark']
+        index.vocabularies = meta['vocabularies']
+        return index
+
+    def add(self, silver_id: int, title: str, sentiment: str, category: str, confidence: float, model: str):
+        signature = minhash_signature(title)
+        self._delta.append((
+            (signature & np.uint64(0xFF)).astype(np.uint8), band_keys(signature),
+            (_label_code(self.vocabularies['sentiment'], sentiment),
+             _label_code(self.vocabularies['category'], category),
+             _label_code(self.vocabularies['model'], model or '')),
+            confidence or 0.0, silver_id,
+        ))
+        self._delta_arrays = None
+        self.watermark = max(self.watermark, int(silver_id))
+        self._dirty = True
+        if len(self._delta) >= MERGE_DELTA_ROWS:
+            self._merge()
+
+    def refresh(self) -> int:
+        """Indexa as linhas da tabela silver com id acima da marca d'água. Retorna quantas entraram."""
+        added = 0
+        conn = self.conn
+        with conn.cursor(name='near_dup_refresh') as cur:
+            cur.itersize = REFRESH_CHUNK_ROWS
+            cur.execute(REFRESH_SQL, (self.watermark,))
+            for silver_id, title, sentiment, category, confidence, model in cur:
+                self.add(silver_id, title, sentiment, category, confidence, model)
+                added += 1
+        conn.commit()
+        if added:
+            logging.info(f"[NearDup] {added} manchetes novas indexadas ({len(self)} no índice)")
+        return added
+
+    def _delta_view(self):
+        if self._delta_arrays is None and self._delta:
+            signatures, keys, labels, confidence, silver_ids = zip(*self._delta)
+            self._delta_arrays = (np.stack(signatures), np.stack(keys), np.array(labels, dtype=np.uint8),
+                                  np.array(confidence, dtype=np.float32), np.array(silver_ids, dtype=np.int64))
+        return self._delta_arrays
+
+    def _merge(self):
+        """Leva o delta para a base ordenada."""
+        delta = self._delta_view()
+        if delta is None:
+            return
+        signatures, keys, labels, confidence, silver_ids = delta
+        base_rows = len(self.silver_ids)
+        new_rows = np.broadcast_to(np.arange(base_rows, base_rows + len(silver_ids), dtype=np.int32),
+                                   (BANDS, len(silver_ids)))
+        all_keys = np.concatenate([self.sorted_keys, keys.T], axis=1)
+        all_rows = np.concatenate([self.sorted_rows, new_rows], axis=1)
+        order = np.argsort(all_keys, axis=1, kind='stable')
+        self.sorted_keys = np.take_along_axis(all_keys, order, axis=1)
+        self.sorted_rows = np.take_along_axis(all_rows, order, axis=1)
+        self.signatures = np.concatenate([self.signatures, signatures])
+        self.labels = np.concatenate([self.labels, labels])
+        self.confidence = np.concatenate([self.confidence, confidence])
+        self.silver_ids = np.concatenate([self.silver_ids, silver_ids])
+        self._delta = []
+        self._delta_arrays = None
+
+    def query(self, title: str) -> Optional[tuple]:
+        """Vizinha mais parecida acima do limiar: (linha do índice, Jaccard estimado) ou None."""
+        signature = minhash_signature(title)
+        keys = band_keys(signature)
+        small_signature = (signature & np.uint64(0xFF)).astype(np.uint8)
+
+        base_rows = len(self.silver_ids)
+        candidates = []
+        if base_rows:
+            for band in range(BANDS):
+                band_sorted = self.sorted_keys[band]
+                lo = np.searchsorted(band_sorted, keys[band], side='left')
+                hi = np.searchsorted(band_sorted, keys[band], side='right')
+                if hi > lo:
+                    candidates.append(np.asarray(self.sorted_rows[band, lo:hi]))
+        delta = self._delta_view()
+        if delta is not None:
+            candidates.append(base_rows + np.flatnonzero((delta[1] == keys).any(axis=1)).astype(np.int32))
+        if not candidates:
+            return None
+        rows = np.unique(np.concatenate(candidates))
+        if not len(rows):
+            return None
+
+        in_base = rows < base_rows
+        signatures = np.empty((len(rows), NUM_PERM), dtype=np.uint8)
+        signatures[in_base] = self.signatures[rows[in_base]]
+        if delta is not None:
+            signatures[~in_base] = delta[0][rows[~in_base] - base_rows]
+        # b-bit MinHash: 1/256 das posições coincide por acaso
+        similarity = ((signatures == small_signature).mean(axis=1) - 1 / 256) / (1 - 1 / 256)
+        best = int(np.argmax(similarity))
+        if similarity[best] < self.threshold:
+            return None
+        return int(rows[best]), float(similarity[best])
+
+    def _payload(self, row: int) -> tuple:
+        base_rows = len(self.silver_ids)
+        if row < base_rows:
+            return self.labels[row], float(self.confidence[row]), int(self.silver_ids[row])
+        delta = self._delta_view()
+        return delta[2][row - base_rows], float(delta[3][row - base_rows]), int(delta[4][row - base_rows])
+
+    def lookup_analysis(self, title: str) -> Optional[dict]:
+        """Análise herdada da quase duplicata mais parecida, no formato de parse_analysis, ou None."""
+        self.lookups += 1
+        match = self.query(title)
+        if match is None:
+            return None
+        row, similarity = match
+        labels, confidence, silver_id = self._payload(row)
+        self.hits += 1
+        model = self.vocabularies['model'][labels[2]]
+        return {
+            'sentiment': self.vocabularies['sentiment'][labels[0]],
+            'category': self.vocabularies['category'][labels[1]],
+            'confidence': confidence,
+            'processing_time': 0.0,
+            'model_used': f"{INHERITED_PREFIX}{model}"[:50],
+            'inherited_from': silver_id,
+            'similarity': similarity,
+        }
+
+    def save(self):
+        """Grava uma nova geração (merge do delta) e a torna vigente de forma atômica."""
+        if not self._dirty:
+            return
+        self._merge()
+        self.generation += 1
+        directory = f"gen-{self.generation:06d}-{os.getpid()}"
+        generation_dir = os.path.join(self.path, directory)
+        os.makedirs(generation_dir, exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(os.path.join(generation_dir, f"{name}.npy"), np.ascontiguousarray(getattr(self, name)))
+        meta = {'format': INDEX_FORMAT, 'generation': self.generation, 'directory': directory,
+                'rows': len(self.silver_ids), 'watermark': self.watermark, 'vocabularies': self.vocabularies}
+        meta_path = os.path.join(self.path, 'current.json')
+        with open(f"{meta_path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(f"{meta_path}.tmp", meta_path)
+        for name in os.listdir(self.path):
+            if name.startswith('gen-') and name != directory and int(name.split('-')[1]) < self.generation:
+                shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+        self._dirty = False
+        logging.info(f"[NearDup] {len(self)} manchetes salvas em {generation_dir}")
+
+    def summary(self) -> dict:
+        return {'hits': self.hits, 'lookups': self.lookups, 'rows': len(self), 'threshold': self.threshold}
@@ -0,0 +1,30 @@
+"""Configuração de conexão com o PostgreSQL compartilhada pelos scripts do pipeline.
+
+As credenciais vêm das variáveis POSTGRES_* (carregadas do .env quando existir),
+com os mesmos padrões do docker-compose.
+"""
+import os
+
+
+def postgres_settings() -> dict:
+    """Parâmetros de conexão (kwargs do psycopg2) a partir das variáveis POSTGRES_*."""
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    return {
+        'host': os.getenv("POSTGRES_HOST", "postgres"),  # Usando 'postgres' como padrão (nome do serviço no Docker)
+        'port': os.getenv("POSTGRES_PORT", "5432"),
+        'database': os.getenv("POSTGRES_DB", "airflow"),
+        'user': os.getenv("POSTGRES_USER", "airflow"),
+        'password': os.getenv("POSTGRES_PASSWORD", "airflow"),
+    }
+
+
+def get_postgres_connection():
+    """
+    Cria uma conexão PostgreSQL direta usando psycopg2.
+    """
+    import psycopg2
+
+    return psycopg2.connect(**postgres_settings())
@@ -0,0 +1,403 @@
+"""Carga dos lotes do scraper na tabela bronze `raw_headlines` via COPY.
+
+O lote é copiado (`COPY ... FROM STDIN`) para uma tabela temporária de staging
+e movido para `raw_headlines` (particionada por mês de `scraped_at`) num único
+comando: os links novos são registrados em `raw_headline_links` com
+`ON CONFLICT DO NOTHING` e só esses entram na tabela bronze. Dentro do lote e
+em relação ao que já está no banco, a deduplicação é feita pela URL canônica
+(`link_key`); links já existentes são ignorados ou atualizados.
+
+`backfill_link_keys` preenche `canonical_link`/`link_key` das linhas gravadas
+antes da canonicalização, para que o histórico também entre na deduplicação.
+
+`ingest_pending_batches` carrega todos os lotes ainda não registrados no
+ledger `raw_ingest_ledger` (chave: nome do arquivo + SHA-256), em ordem
+cronológica. Dados e registro no ledger entram na mesma transação; depois
+do commit, arquivo e manifest vão para `data/archive/`.
+
+Uso (backfill / carga do que estiver pendente):
+    python scripts/raw_loader.py
+"""
+import io
+import logging
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Literal, Optional
+
+import pandas as pd
+from psycopg2.extras import execute_values
+
+from scrape_output import (
+    MANIFEST_DIR,
+    SCRAPE_COLUMNS,
+    archive_batch,
+    file_sha256,
+    iter_scrape_chunks,
+    list_manifests,
+    manifest_file_path,
+    to_scrape_frame,
+)
+from url_canon import canonical_key, canonicalize_url
+
+DEFAULT_CHUNK_ROWS = 50_000
+BACKFILL_BATCH_LINKS = 10_000
+
+STAGE_TABLE = 'raw_headlines_stage'
+_COLUMNS_SQL = ', '.join(SCRAPE_COLUMNS)
+
+CREATE_STAGE_SQL = f"""
+    CREATE TEMP TABLE IF NOT EXISTS {STAGE_TABLE}
+        (LIKE raw_headlines INCLUDING DEFAULTS) ON COMMIT DROP
+"""
+
+COPY_SQL = f"COPY {STAGE_TABLE} ({_COLUMNS_SQL}) FROM STDIN WITH (FORMAT csv)"
+
+# Uma linha por link_key no lote (a mais recente) e nenhuma cujo link_key já esteja
+# registrado com outro link
+_SELECT_NEW_SQL = f"""
+    SELECT DISTINCT ON (s.link_key) {', '.join(f's.{c}' for c in SCRAPE_COLUMNS)}
+    FROM {STAGE_TABLE} s
+    WHERE NOT EXISTS (
+        SELECT 1 FROM raw_headline_links k
+        WHERE k.link_key = s.link_key AND k.link <> s.link
+    )
+    ORDER BY s.link_key, s.scraped_at DESC
+"""
+
+# raw_headlines é particionada por mês (sem índice único global): o link entra
+# primeiro em raw_headline_links (únicos em link e link_key), e só as linhas
+# registradas agora vão para a tabela bronze. Cargas concorrentes do mesmo link
+# esperam o commit uma da outra no ON CONFLICT.
+_INSERT_NEW_SQL = f"""
+    candidates AS ({_SELECT_NEW_SQL}),
+    registered AS (
+        INSERT INTO raw_headline_links (link, link_key, scraped_at)
+        SELECT link, link_key, scraped_at FROM candidates
+        ON CONFLICT DO NOTHING
+        RETURNING link
+    ),
+    inserted AS (
+        INSERT INTO raw_headlines ({_COLUMNS_SQL})
+        SELECT {', '.join(f'c.{c}' for c in SCRAPE_COLUMNS)}
+        FROM candidates c JOIN registered USING (link)
+        RETURNING TRUE AS inserted
+    )
+"""
+
+# As contagens saem agregadas do próprio INSERT (memória constante no cliente)
+_COUNT_SQL = """
+    SELECT COUNT(*) FILTER (WHERE inserted), COUNT(*) FILTER (WHERE NOT inserted) FROM upserted
+"""
+
+UPSERT_SQL = {
+    'nothing': f"""
+        WITH {_INSERT_NEW_SQL},
+        upserted AS (SELECT inserted FROM inserted)
+        {_COUNT_SQL}
+    """,
+    # Atualiza título e data de publicação, mantendo o primeiro scraped_at. O UPDATE
+    # não enxerga as linhas inseridas pelo próprio comando, só as que já existiam.
+    'update': f"""
+        WITH {_INSERT_NEW_SQL},
+        updated AS (
+            UPDATE raw_headlines r SET
+                title = c.title,
+                canonical_link = c.canonical_link,
+                link_key = c.link_key,
+                published_at = COALESCE(c.published_at, r.published_at)
+            FROM candidates c
+            WHERE r.link = c.link
+            RETURNING FALSE AS inserted
+        ),
+        upserted AS (SELECT inserted FROM inserted UNION ALL SELECT inserted FROM updated)
+        {_COUNT_SQL}
+    """,
+}
+
+
+CREATE_LEDGER_SQL = """
+    CREATE TABLE IF NOT EXISTS raw_ingest_ledger (
+        file_name TEXT NOT NULL,
+        sha256 TEXT NOT NULL,
+        run_id TEXT,
+        engine TEXT,
+        row_count INTEGER,
+        inserted INTEGER,
+        duplicates INTEGER,
+        loaded_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (file_name, sha256)
+    )
+"""
+
+LEDGER_INSERT_SQL = """
+    INSERT INTO raw_ingest_ledger (file_name, sha256, run_id, engine, row_count, inserted, duplicates)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+    ON CONFLICT (file_name, sha256) DO NOTHING
+"""
+
+# Serializa ingestões concorrentes (DAG diária e DAG de feeds) no mesmo banco
+INGEST_LOCK_ID = 0x67315F726177  # 'g1_raw'
+
+
+def frame_to_csv_buffer(df: pd.DataFrame) -> io.BytesIO:
+    """Serializa o lote em CSV (sem cabeçalho) na ordem de SCRAPE_COLUMNS; nulos viram campo vazio.
+
+    Usa o writer CSV do Arrow, bem mais rápido que `DataFrame.to_csv`; os
+    timestamps saem em UTC com sufixo `Z`.
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+
+    table = pa.Table.from_pandas(df[SCRAPE_COLUMNS], preserve_index=False)
+    buffer = io.BytesIO()
+    pa_csv.write_csv(table, buffer, pa_csv.WriteOptions(include_header=False))
+    buffer.seek(0)
+    return buffer
+
+
+def valid_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """Descarta linhas sem título ou sem link (o restante do esquema é garantido por to_scrape_frame)."""
+    return df[df['title'].notna() & df['link'].notna()]
+
+
+def copy_upsert_chunks(conn, chunks, on_conflict: Literal['nothing', 'update'] = 'nothing',
+                       commit: bool = True) -> dict:
+    """Carrega uma sequência de DataFrames (já no esquema) em raw_headlines; retorna as contagens.
+
+    Cada bloco é validado e enviado por COPY para o staging assim que chega,
+    então a memória do cliente depende só do tamanho do bloco. O upsert na
+    tabela bronze é um único INSERT ao final.
+
+    Returns:
+        dict com rows (linhas válidas no lote), invalid, inserted, updated e duplicates
+        (linhas do lote que já existiam ou se repetiam pela URL canônica).
+    """
+    if on_conflict not in UPSERT_SQL:
+        raise ValueError("on_conflict inválido. Use 'nothing' ou 'update'.")
+
+    counts = {'rows': 0, 'invalid': 0, 'inserted': 0, 'updated': 0, 'duplicates': 0}
+    with conn.cursor() as cur:
+        cur.execute(CREATE_STAGE_SQL)
+        cur.execute(f"TRUNCATE {STAGE_TABLE}")
+        for chunk in chunks:
+            valid = valid_rows(chunk)
+            counts['invalid'] += len(chunk) - len(valid)
+            if valid.empty:
+                continue
+            cur.copy_expert(COPY_SQL, frame_to_csv_buffer(valid))
+            counts['rows'] += len(valid)
+
+        if counts['rows']:
+            cur.execute(UPSERT_SQL[on_conflict])
+            counts['inserted'], counts['updated'] = cur.fetchone()
+    if commit:
+        conn.commit()
+
+    counts['duplicates'] = counts['rows'] - counts['inserted'] - counts['updated']
+    logging.info(
+        f"[Ingestão] {counts['rows']} linhas: {counts['inserted']} inseridas, "
+        f"{counts['updated']} atualizadas, {counts['duplicates']} duplicadas"
+        + (f", {counts['invalid']} inválidas" if counts['invalid'] else '')
+    )
+    return counts
+
+
+def copy_upsert_headlines(conn, rows, on_conflict: Literal['nothing', 'update'] = 'nothing',
+                          commit: bool = True) -> dict:
+    """Carrega um lote em memória (linhas ou DataFrame) em raw_headlines; ver `copy_upsert_chunks`."""
+    return copy_upsert_chunks(conn, [to_scrape_frame(rows)], on_conflict, commit)
+
+
+def _ledger_key(manifest: dict) -> tuple:
+    return os.path.basename(manifest['path']), manifest['sha256']
+
+
+def record_loaded_batch(conn, manifest: dict, counts: dict):
+    """Registra o lote no ledger (sem commit), para que a ingestão não o carregue de novo."""
+    file_name, sha256 = _ledger_key(manifest)
+    with conn.cursor() as cur:
+        cur.execute(LEDGER_INSERT_SQL, (
+            file_name, sha256, manifest['run_id'], manifest.get('engine'),
+            counts['rows'], counts['inserted'], counts['duplicates'],
+        ))
+
+
+def _check_batch(manifest: dict) -> Optional[str]:
+    """Confere existência e SHA-256 do arquivo (executado em paralelo, fora da transação)."""
+    path = manifest_file_path(manifest)
+    if not os.path.exists(path):
+        return f"arquivo não encontrado: {path}"
+    if file_sha256(path) != manifest['sha256']:
+        return f"SHA-256 diferente do manifest: {path}"
+    return None
+
+
+def ingest_pending_batches(conn, manifest_dir: str = MANIFEST_DIR, archive: bool = True,
+                           prefetch: int = 2, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> dict:
+    """Carrega, em ordem cronológica, todos os lotes que ainda não estão no ledger.
+
+    A conferência dos arquivos (SHA-256) roda em paralelo (`prefetch` threads);
+    a escrita no banco é sequencial, para que lotes mais antigos tenham prioridade
+    no ON CONFLICT e não haja disputa de locks entre cargas do mesmo link. Cada
+    arquivo é lido em blocos de `chunk_rows` linhas (memória limitada).
+    """
+    summary = {'batches': 0, 'skipped': 0, 'failed': 0, 'rows': 0, 'inserted': 0, 'duplicates': 0}
+    with conn.cursor() as cur:
+        cur.execute(CREATE_LEDGER_SQL)
+        cur.execute("SELECT pg_advisory_lock(%s)", (INGEST_LOCK_ID,))
+        cur.execute("SELECT file_name, sha256 FROM raw_ingest_ledger")
+        loaded = set(cur.fetchall())
+    conn.commit()
+
+    try:
+        manifests = list_manifests(manifest_dir)
+        pending = []
+        for manifest in manifests:
+            if _ledger_key(manifest) in loaded:
+                # Já carregado numa execução anterior que não chegou a arquivar
+                summary['skipped'] += 1
+                if archive:
+                    archive_batch(manifest)
+            else:
+                pending.append(manifest)
+        logging.info(f"[Ingestão] {len(pending)} lotes pendentes, {summary['skipped']} já carregados")
+
+        with ThreadPoolExecutor(max_workers=max(1, prefetch)) as pool:
+            futures = [pool.submit(_check_batch, manifest) for manifest in pending]
+            for manifest, future in zip(pending, futures):
+                error = future.result()
+                if error:
+                    logging.error(f"[Ingestão] Lote {manifest['run_id']} ignorado: {error}")
+                    summary['failed'] += 1
+                    continue
+                try:
+                    chunks = iter_scrape_chunks(manifest_file_path(manifest), chunk_rows)
+                    counts = copy_upsert_chunks(conn, chunks, commit=False)
+                    record_loaded_batch(conn, manifest, counts)
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                if archive:
+                    archive_batch(manifest)
+
+                summary['batches'] += 1
+                for key in ('rows', 'inserted', 'duplicates'):
+                    summary[key] += counts[key]
+                logging.info(f"[Ingestão] Lote {manifest['run_id']} carregado ({_ledger_key(manifest)[0]})")
+    finally:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_unlock(%s)", (INGEST_LOCK_ID,))
+        conn.commit()
+
+    logging.info(
+        f"[Ingestão] {summary['batches']} lotes carregados: {summary['inserted']} linhas inseridas, "
+        f"{summary['duplicates']} duplicadas"
+    )
+    return summary
+
+
+_RELKIND_SQL = "SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)"
+
+_BACKFILL_SELECT_SQL = """
+    SELECT link, MIN(scraped_at) FROM raw_headlines
+    WHERE link_key IS NULL AND link IS NOT NULL AND link > %s
+    GROUP BY link ORDER BY link LIMIT %s
+"""
+
+_BACKFILL_UPDATE_SQL = """
+    UPDATE raw_headlines t SET canonical_link = v.canonical_link, link_key = v.link_key
+    FROM (VALUES %s) AS v (link, canonical_link, link_key)
+    WHERE t.link = v.link AND t.link_key IS NULL
+"""
+
+# Só registra a chave se nenhum outro link já a tiver (índice único em link_key)
+_BACKFILL_LINKS_SQL = """
+    UPDATE raw_headline_links k SET link_key = v.link_key
+    FROM (VALUES %s) AS v (link_key, link)
+    WHERE k.link = v.link AND k.link_key IS NULL
+    AND NOT EXISTS (SELECT 1 FROM raw_headline_links o WHERE o.link_key = v.link_key)
+"""
+
+
+def backfill_link_keys(conn, batch_links: int = BACKFILL_BATCH_LINKS) -> int:
+    """Preenche `canonical_link` e `link_key` das manchetes gravadas sem eles.
+
+    Roda antes de `dags/sql/create_raw_headlines.sql`: se `raw_headlines` ainda é
+    a tabela antiga (sem partição), as colunas são criadas e preenchidas ali, e a
+    migração do SQL já registra um link por `link_key` em `raw_headline_links`.
+    Se a migração já aconteceu, preenche `raw_headlines` e registra cada chave em
+    `raw_headline_links` para um único link; variantes antigas da mesma URL
+    canônica continuam como linhas separadas, mas novas variantes são descartadas
+    na carga. Retorna o número de links preenchidos.
+    """
+    with conn.cursor() as cur:
+        cur.execute(_RELKIND_SQL, ('raw_headlines',))
+        row = cur.fetchone()
+        if row is None:
+            conn.commit()
+            return 0
+        partitioned = row[0] == 'p'
+        if not partitioned:
+            cur.execute("ALTER TABLE raw_headlines ADD COLUMN IF NOT EXISTS canonical_link TEXT")
+            cur.execute("ALTER TABLE raw_headlines ADD COLUMN IF NOT EXISTS link_key BIGINT")
+        cur.execute(_RELKIND_SQL, ('raw_headline_links',))
+        register = partitioned and cur.fetchone() is not None
+    conn.commit()
+
+    total = 0
+    last_link = ''
+    while True:
+        try:
+            with conn.cursor() as cur:
+                # Mesmo lock da carga: nenhum lote registra links durante a atualização
+                cur.execute("SELECT pg_advisory_xact_lock(%s)", (INGEST_LOCK_ID,))
+                cur.execute(_BACKFILL_SELECT_SQL, (last_link, batch_links))
+                links = cur.fetchall()
+                if not links:
+                    conn.commit()
+                    break
+                values = [(link, canonicalize_url(link)) for link, _ in links]
+                values = [(link, canonical, canonical_key(canonical)) for link, canonical in values]
+                execute_values(cur, _BACKFILL_UPDATE_SQL, values,
+                               page_size=1000)
+                if register:
+                    # No bloco, a chave fica com o link coletado primeiro
+                    first_seen = {}
+                    for (link, scraped_at), (_, _, key) in sorted(
+                            zip(links, values), key=lambda item: (item[0][1] is None, item[0][1])):
+                        first_seen.setdefault(key, link)
+                    execute_values(cur, _BACKFILL_LINKS_SQL, list(first_seen.items()), page_size=1000)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        total += len(links)
+        last_link = links[-1][0]
+
+    if total:
+        logging.info(f"[Ingestão] canonical_link/link_key preenchidos para {total} links antigos")
+    return total
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from pg_connection import get_postgres_connection
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s',
+                        handlers=[logging.StreamHandler(sys.stdout)])
+    parser = argparse.ArgumentParser(description='Carga dos lotes pendentes do scraper em raw_headlines')
+    parser.add_argument('--manifest-dir', default=MANIFEST_DIR, help='Diretório dos manifests')
+    parser.add_argument('--no-archive', action='store_true', help='Não mover os lotes carregados para data/archive')
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS,
+                        help=f'Linhas por bloco enviado ao COPY (default: {DEFAULT_CHUNK_ROWS})')
+    args = parser.parse_args()
+
+    connection = get_postgres_connection()
+    try:
+        ingest_pending_batches(connection, args.manifest_dir, archive=not args.no_archive,
+                               chunk_rows=args.chunk_rows)
+    finally:
+        connection.close()
@@ -0,0 +1,286 @@
+"""Partições mensais de `raw_headlines`: criação antecipada, retenção e janela de pendências.
+
+`raw_headlines` é particionada por RANGE de `scraped_at` (ver
+dags/sql/create_raw_headlines.sql), uma partição por mês em UTC:
+
+    raw_headlines_2026_10   FOR VALUES FROM ('2026-10-01 00:00+00') TO ('2026-11-01 00:00+00')
+    raw_headlines_default   linhas sem partição do mês (ou sem scraped_at)
+
+`ensure_partitions` cria a partição do mês corrente e as dos próximos meses,
+além das dos meses que tenham linhas paradas na default (migração da tabela
+antiga, atrasos); as linhas são movidas para a partição nova antes do ATTACH.
+
+`apply_retention` exporta para Parquet (data/archive/partitions) as partições
+mais antigas que a retenção configurada e depois faz DETACH + DROP, tudo numa
+transação com a tabela bloqueada para escrita. O registro
+de links (`raw_headline_links`) é mantido, então links antigos continuam
+sendo reconhecidos como já vistos.
+
+`pending_since` define a janela das consultas de pendências (enriquecimento,
+coleta de artigos): filtrar por `scraped_at >= pending_since()` com o valor
+literal permite ao PostgreSQL podar as partições antigas no planejamento.
+
+Uso:
+    python scripts/raw_partitions.py                      # cria partições e aplica a retenção
+    python scripts/raw_partitions.py --retention-months 0 # só cria partições
+"""
+import logging
+import os
+import re
+import sys
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+
+from raw_loader import INGEST_LOCK_ID
+from scrape_output import ARCHIVE_DIR, SCRAPE_COLUMNS, to_scrape_frame
+
+PARENT_TABLE = 'raw_headlines'
+DEFAULT_PARTITION = 'raw_headlines_default'
+PARTITION_ARCHIVE_DIR = os.path.join(ARCHIVE_DIR, 'partitions')
+
+DEFAULT_MONTHS_AHEAD = 3
+DEFAULT_RETENTION_MONTHS = 12
+DEFAULT_PENDING_LOOKBACK_DAYS = 30
+EXPORT_CHUNK_ROWS = 50_000
+
+_PARTITION_RE = re.compile(rf'^{PARENT_TABLE}_(\d{{4}})_(\d{{2}})$')
+
+LIST_PARTITIONS_SQL = """
+    SELECT c.relname
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = to_regclass(%s)
+"""
+
+DEFAULT_MONTHS_SQL = f"""
+    SELECT DISTINCT date_trunc('month', scraped_at AT TIME ZONE 'UTC')::date
+    FROM {DEFAULT_PARTITION}
+    WHERE scraped_at IS NOT NULL
+"""
+
+
+def retention_months_from_env() -> int:
+    """Meses mantidos em raw_headlines (RAW_HEADLINES_RETENTION_MONTHS; 0 desativa a retenção)."""
+    return int(os.getenv('RAW_HEADLINES_RETENTION_MONTHS', DEFAULT_RETENTION_MONTHS))
+
+
+def pending_since(lookback_days: Optional[int] = None, now: Optional[datetime] = None) -> datetime:
+    """Início (UTC) da janela das consultas de pendências (RAW_PENDING_LOOKBACK_DAYS, default 30)."""
+    if lookback_days is None:
+        lookback_days = int(os.getenv('RAW_PENDING_LOOKBACK_DAYS', DEFAULT_PENDING_LOOKBACK_DAYS))
+    now = now or datetime.now(timezone.utc)
+    return now - timedelta(days=lookback_days)
+
+
+def month_start(value) -> date:
+    if isinstance(value, datetime):
+        value = value.astimezone(timezone.utc) if value.tzinfo else value
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT_TABLE}_{month.year:04d}_{month.month:02d}"
+
+
+def _month_bounds(month: date) -> tuple:
+    lower = datetime(month.year, month.month, 1, tzinfo=timezone.utc)
+    upper_month = add_months(month, 1)
+    return lower, datetime(upper_month.year, upper_month.month, 1, tzinfo=timezone.utc)
+
+
+def list_partitions(conn) -> dict:
+    """Partições mensais existentes: {primeiro dia do mês: nome}."""
+    with conn.cursor() as cur:
+        cur.execute(LIST_PARTITIONS_SQL, (PARENT_TABLE,))
+        names = [row[0] for row in cur.fetchall()]
+    partitions = {}
+    for name in names:
+        match = _PARTITION_RE.match(name)
+        if match:
+            partitions[date(int(match.group(1)), int(match.group(2)), 1)] = name
+    return partitions
+
+
+def create_partition(conn, month: date) -> int:
+    """Cria a partição do mês, movendo para ela as linhas do mês que estão na default.
+
+    Retorna quantas linhas foram movidas. Roda numa transação própria, com o
+    lock da carga (INGEST_LOCK_ID) e a default bloqueada, para que nenhuma linha
+    do mês entre nela entre o DELETE e o ATTACH.
+    """
+    name = partition_name(month)
+    lower, upper = _month_bounds(month)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(%s)", (INGEST_LOCK_ID,))
+            cur.execute(f"LOCK TABLE {DEFAULT_PARTITION} IN ACCESS EXCLUSIVE MODE")
+            cur.execute(f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS)")
+            cur.execute(f"""
+                WITH moved AS (
+                    DELETE FROM {DEFAULT_PARTITION}
+                    WHERE scraped_at >= %s AND scraped_at < %s
+                    RETURNING *
+                )
+                INSERT INTO {name} SELECT * FROM moved
+            """, (lower, upper))
+            moved = cur.rowcount
+            cur.execute(f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)",
+                        (lower, upper))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    logging.info(f"[Partições] {name} criada" + (f" ({moved} linhas movidas da default)" if moved else ''))
+    return moved
+
+
+def ensure_partitions(conn, months_ahead: int = DEFAULT_MONTHS_AHEAD, now: Optional[datetime] = None) -> list:
+    """Garante as partições do mês corrente, dos `months_ahead` seguintes e dos meses com linhas na default.
+
+    Returns:
+        Lista com os nomes das partições criadas.
+    """
+    current = month_start(now or datetime.now(timezone.utc))
+    wanted = {add_months(current, offset) for offset in range(months_ahead + 1)}
+    with conn.cursor() as cur:
+        cur.execute(DEFAULT_MONTHS_SQL)
+        wanted.update(row[0] for row in cur.fetchall())
+    conn.commit()
+
+    existing = list_partitions(conn)
+    created = []
+    for month in sorted(wanted - set(existing)):
+        create_partition(conn, month)
+        created.append(partition_name(month))
+    if not created:
+        logging.info(f"[Partições] Nenhuma partição nova; {len(existing)} partições mensais existentes")
+    return created
+
+
+def archive_partition(conn, name: str, archive_dir: str = PARTITION_ARCHIVE_DIR, commit: bool = True) -> str:
+    """Exporta uma partição para `archive_dir/<nome>.parquet` em blocos (cursor nomeado).
+
+    Com `commit=False`, a leitura fica na transação do chamador (ex.: com a
+    partição bloqueada até o DROP, em `apply_retention`).
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"{name}.parquet")
+    # Um mês pode ser arquivado de novo (linhas atrasadas que caíram na default e
+    # recriaram a partição); o arquivo anterior é mantido
+    copy = 1
+    while os.path.exists(path):
+        path = os.path.join(archive_dir, f"{name}.{copy}.parquet")
+        copy += 1
+    tmp_path = f"{path}.tmp"
+    writer = None
+    rows = 0
+    try:
+        with conn.cursor(name=f"export_{name}") as cur:
+            cur.itersize = EXPORT_CHUNK_ROWS
+            cur.execute(f"SELECT {', '.join(SCRAPE_COLUMNS)} FROM {name}")
+            while True:
+                records = cur.fetchmany(EXPORT_CHUNK_ROWS)
+                if not records:
+                    break
+                table = pa.Table.from_pandas(
+                    to_scrape_frame([dict(zip(SCRAPE_COLUMNS, record)) for record in records]),
+                    preserve_index=False,
+                )
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp_path, table.schema, compression='zstd')
+                writer.write_table(table.cast(writer.schema))
+                rows += len(records)
+        if commit:
+            conn.commit()
+        if writer is None:
+            # Partição vazia: grava um arquivo só com o esquema
+            table = pa.Table.from_pandas(to_scrape_frame([]), preserve_index=False)
+            writer = pq.ParquetWriter(tmp_path, table.schema, compression='zstd')
+        writer.close()
+        writer = None
+        os.replace(tmp_path, path)
+    finally:
+        if writer is not None:
+            writer.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    logging.info(f"[Partições] {name} exportada para {path} ({rows} linhas)")
+    return path
+
+
+def apply_retention(conn, retention_months: Optional[int] = None, archive_dir: str = PARTITION_ARCHIVE_DIR,
+                    now: Optional[datetime] = None) -> list:
+    """Arquiva e remove as partições mensais anteriores a `retention_months` meses.
+
+    O mês corrente conta como o primeiro mês retido. Cada partição é tratada numa
+    única transação: lock da carga (INGEST_LOCK_ID) e raw_headlines bloqueada para
+    escrita (SHARE, que ainda permite leituras), exportação (o arquivo só aparece
+    com o nome final depois de completo) e, por fim, DETACH + DROP. Assim nenhuma
+    linha gravada no mês depois da exportação é removida sem estar no arquivo;
+    as escritas concorrentes (streaming do scraper) esperam a exportação.
+
+    Returns:
+        Lista de dicts com partition e archive_path das partições removidas.
+    """
+    if retention_months is None:
+        retention_months = retention_months_from_env()
+    if retention_months <= 0:
+        logging.info("[Partições] Retenção desativada")
+        return []
+
+    cutoff = add_months(month_start(now or datetime.now(timezone.utc)), -(retention_months - 1))
+    expired = sorted((month, name) for month, name in list_partitions(conn).items() if month < cutoff)
+    removed = []
+    for month, name in expired:
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_advisory_xact_lock(%s)", (INGEST_LOCK_ID,))
+                # O streaming do scraper não usa o lock da carga; o lock da tabela barra qualquer
+                # escrita. É na tabela pai, e não só na partição, porque o INSERT bloqueia a pai
+                # antes da partição e o DETACH precisaria da pai depois (deadlock)
+                cur.execute(f"LOCK TABLE {PARENT_TABLE} IN SHARE MODE")
+            path = archive_partition(conn, name, archive_dir, commit=False)
+            with conn.cursor() as cur:
+                cur.execute(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}")
+                cur.execute(f"DROP TABLE {name}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        logging.info(f"[Partições] {name} desanexada e removida (arquivo: {path})")
+        removed.append({'partition': name, 'archive_path': path})
+    if not removed:
+        logging.info(f"[Partições] Nenhuma partição anterior a {cutoff.isoformat()}")
+    return removed
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from pg_connection import get_postgres_connection
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s',
+                        handlers=[logging.StreamHandler(sys.stdout)])
+    parser = argparse.ArgumentParser(description='Manutenção das partições mensais de raw_headlines')
+    parser.add_argument('--months-ahead', type=int, default=DEFAULT_MONTHS_AHEAD,
+                        help=f'Meses futuros com partição pronta (default: {DEFAULT_MONTHS_AHEAD})')
+    parser.add_argument('--retention-months', type=int, default=None,
+                        help='Meses mantidos (default: RAW_HEADLINES_RETENTION_MONTHS ou '
+                             f'{DEFAULT_RETENTION_MONTHS}; 0 desativa)')
+    parser.add_argument('--archive-dir', default=PARTITION_ARCHIVE_DIR, help='Destino das partições arquivadas')
+    args = parser.parse_args()
+
+    connection = get_postgres_connection()
+    try:
+        ensure_partitions(connection, args.months_ahead)
+        apply_retention(connection, args.retention_months, args.archive_dir)
+    finally:
+        connection.close()
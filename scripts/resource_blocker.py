@@ -0,0 +1,258 @@
+"""Bloqueio de recursos pesados nas páginas carregadas pelo Playwright.
+
+Nenhuma imagem, vídeo, fonte ou script de anúncio/analytics é necessário para
+extrair o texto de `[data-mrf-layout-title]`. Este módulo instala um handler
+`context.route` que aborta essas requisições e contabiliza o que foi evitado.
+
+A configuração padrão pode ser sobrescrita por variáveis de ambiente
+(listas separadas por vírgula):
+    SCRAPER_BLOCK_RESOURCE_TYPES  tipos de recurso bloqueados (image,media,font)
+    SCRAPER_BLOCK_DOMAINS         domínios bloqueados (inclui subdomínios)
+    SCRAPER_ALLOW_DOMAINS         domínios nunca bloqueados (prioridade máxima)
+
+Obs.: no Playwright, ativar `route` desliga o cache HTTP do contexto. No
+contexto padrão do navegador compartilhado (perfil persistente do sidecar, ver
+`warm_browser`), o bloqueio é feito pelo CDP (`Network.setBlockedURLs`), que
+mantém o cache de disco entre execuções.
+"""
+import logging
+import os
+from collections import Counter
+from typing import Optional
+from urllib.parse import urlsplit
+
+DEFAULT_BLOCKED_RESOURCE_TYPES = ('image', 'media', 'font')
+
+# Hosts de anúncios, analytics e tracking conhecidos nas páginas do G1
+DEFAULT_BLOCKED_DOMAINS = (
+    'doubleclick.net',
+    'googlesyndication.com',
+    'googletagservices.com',
+    'googletagmanager.com',
+    'google-analytics.com',
+    'googleadservices.com',
+    'adnxs.com',
+    'amazon-adsystem.com',
+    'criteo.com',
+    'criteo.net',
+    'rubiconproject.com',
+    'pubmatic.com',
+    'casalemedia.com',
+    'smartadserver.com',
+    'taboola.com',
+    'outbrain.com',
+    'scorecardresearch.com',
+    'chartbeat.com',
+    'chartbeat.net',
+    'hotjar.com',
+    'facebook.net',
+    'connect.facebook.net',
+    'krxd.net',
+    'permutive.com',
+    'tiqcdn.com',
+    'nr-data.net',
+    'newrelic.com',
+)
+
+# Tamanho médio estimado por tipo de recurso (bytes). Requisições abortadas não
+# chegam a ser baixadas, então a economia em bytes é uma estimativa.
+ESTIMATED_RESOURCE_BYTES = {
+    'image': 45_000,
+    'media': 600_000,
+    'font': 35_000,
+    'script': 60_000,
+    'stylesheet': 25_000,
+    'xhr': 5_000,
+    'fetch': 5_000,
+}
+DEFAULT_ESTIMATED_BYTES = 10_000
+
+# O bloqueio via CDP só aceita padrões de URL: os tipos de recurso viram extensões
+RESOURCE_TYPE_EXTENSIONS = {
+    'image': ('jpg', 'jpeg', 'png', 'gif', 'webp', 'avif', 'svg', 'ico'),
+    'media': ('mp4', 'webm', 'm3u8', 'mp3'),
+    'font': ('woff', 'woff2', 'ttf', 'otf', 'eot'),
+}
+
+# No CDP, `*` casa qualquer sequência e o padrão é comparado com a URL inteira.
+# A extensão fica ancorada no fim do caminho (com ou sem query string): `*.ico*`
+# casaria também `/icones/...` ou `?tipo=.icon`. Assim, páginas e scripts do G1
+# continuam liberados, por exemplo:
+#   https://g1.globo.com/sp/noticia/2025/09/01/exemplo.ghtml
+#   https://s3.glbimg.com/v1/AUTH_x/globo-assets/icones/app.min.js?v=2
+# enquanto https://s2.glbimg.com/foto.jpg?w=300 é bloqueada.
+RESOURCE_TYPE_URL_PATTERNS = {
+    resource_type: tuple(pattern for ext in extensions for pattern in (f'*.{ext}', f'*.{ext}?*'))
+    for resource_type, extensions in RESOURCE_TYPE_EXTENSIONS.items()
+}
+
+
+def _env_list(name: str, default) -> tuple:
+    value = os.getenv(name)
+    if value is None:
+        return tuple(default)
+    return tuple(item.strip().lower() for item in value.split(',') if item.strip())
+
+
+def resource_blocking_config(block_types=None, block_domains=None, allow_domains=None) -> dict:
+    """Monta a configuração de bloqueio (argumentos > variáveis de ambiente > padrões)."""
+    return {
+        'block_types': frozenset(block_types if block_types is not None else
+                                 _env_list('SCRAPER_BLOCK_RESOURCE_TYPES', DEFAULT_BLOCKED_RESOURCE_TYPES)),
+        'block_domains': tuple(block_domains if block_domains is not None else
+                               _env_list('SCRAPER_BLOCK_DOMAINS', DEFAULT_BLOCKED_DOMAINS)),
+        'allow_domains': tuple(allow_domains if allow_domains is not None else
+                               _env_list('SCRAPER_ALLOW_DOMAINS', ())),
+    }
+
+
+def new_blocking_stats() -> dict:
+    """Contadores de uma execução (compartilháveis entre vários contextos)."""
+    return {
+        'allowed': 0,
+        'blocked': 0,
+        'estimated_bytes_saved': 0,
+        'blocked_by_type': Counter(),
+        'blocked_by_domain': Counter(),
+    }
+
+
+def _host_matches(host: str, domains) -> Optional[str]:
+    for domain in domains:
+        if host == domain or host.endswith('.' + domain):
+            return domain
+    return None
+
+
+def block_reason(url: str, resource_type: str, config: dict) -> Optional[str]:
+    """Retorna o motivo do bloqueio ('type:<tipo>' ou 'domain:<domínio>') ou None."""
+    host = (urlsplit(url).hostname or '').lower()
+    if _host_matches(host, config['allow_domains']):
+        return None
+    domain = _host_matches(host, config['block_domains'])
+    if domain:
+        return f'domain:{domain}'
+    if resource_type in config['block_types']:
+        return f'type:{resource_type}'
+    return None
+
+
+def blocked_url_patterns(config: dict) -> list:
+    """Padrões de `Network.setBlockedURLs` equivalentes à configuração.
+
+    Os tipos de recurso viram extensões de arquivo (`RESOURCE_TYPE_URL_PATTERNS`).
+    O CDP não tem exceções por host: `allow_domains` apenas retira domínios da lista
+    e não libera imagens, mídias ou fontes desses domínios.
+    """
+    patterns = []
+    for domain in config['block_domains']:
+        if _host_matches(domain, config['allow_domains']):
+            continue
+        patterns.extend((f'*://{domain}/*', f'*://*.{domain}/*'))
+    for resource_type in sorted(config['block_types']):
+        patterns.extend(RESOURCE_TYPE_URL_PATTERNS.get(resource_type, ()))
+    return patterns
+
+
+def _record(stats: dict, resource_type: str, reason: Optional[str]):
+    if reason is None:
+        stats['allowed'] += 1
+        return
+    stats['blocked'] += 1
+    stats['blocked_by_type'][resource_type] += 1
+    if reason.startswith('domain:'):
+        stats['blocked_by_domain'][reason[len('domain:'):]] += 1
+    stats['estimated_bytes_saved'] += ESTIMATED_RESOURCE_BYTES.get(resource_type, DEFAULT_ESTIMATED_BYTES)
+
+
+def install_resource_blocking(context, config: dict, stats: dict):
+    """Instala o handler de bloqueio num BrowserContext síncrono."""
+    def handle(route):
+        request = route.request
+        reason = block_reason(request.url, request.resource_type, config)
+        _record(stats, request.resource_type, reason)
+        if reason:
+            route.abort()
+        else:
+            route.continue_()
+
+    context.route('**/*', handle)
+
+
+async def install_resource_blocking_async(context, config: dict, stats: dict):
+    """Instala o handler de bloqueio num BrowserContext assíncrono."""
+    async def handle(route):
+        request = route.request
+        reason = block_reason(request.url, request.resource_type, config)
+        _record(stats, request.resource_type, reason)
+        if reason:
+            await route.abort()
+        else:
+            await route.continue_()
+
+    await context.route('**/*', handle)
+
+
+def _cdp_handlers(config: dict, stats: dict) -> dict:
+    """Handlers dos eventos de rede do CDP que alimentam `stats` como o `route`."""
+    requests = {}  # requestId -> (url, tipo), até a requisição terminar
+
+    def on_request(event):
+        if event['requestId'] in requests:  # redirecionamento da mesma requisição
+            return
+        resource_type = (event.get('type') or 'other').lower()
+        requests[event['requestId']] = (event['request']['url'], resource_type)
+        _record(stats, resource_type, None)
+
+    def on_finished(event):
+        requests.pop(event['requestId'], None)
+
+    def on_failed(event):
+        request = requests.pop(event['requestId'], None)
+        if request is None or event.get('blockedReason') != 'inspector':
+            return
+        # Bloqueada por setBlockedURLs: deixa de contar como permitida
+        url, resource_type = request
+        stats['allowed'] -= 1
+        _record(stats, resource_type, block_reason(url, resource_type, config) or f"type:{resource_type}")
+
+    return {
+        'Network.requestWillBeSent': on_request,
+        'Network.loadingFinished': on_finished,
+        'Network.loadingFailed': on_failed,
+    }
+
+
+def install_resource_blocking_cdp(context, page, config: dict, stats: dict):
+    """Bloqueia via CDP numa página síncrona, sem desligar o cache HTTP do contexto."""
+    session = context.new_cdp_session(page)
+    for event, handler in _cdp_handlers(config, stats).items():
+        session.on(event, handler)
+    session.send('Network.enable')
+    session.send('Network.setBlockedURLs', {'urls': blocked_url_patterns(config)})
+    return session
+
+
+async def install_resource_blocking_cdp_async(context, page, config: dict, stats: dict):
+    """Versão assíncrona de `install_resource_blocking_cdp`."""
+    session = await context.new_cdp_session(page)
+    for event, handler in _cdp_handlers(config, stats).items():
+        session.on(event, handler)
+    await session.send('Network.enable')
+    await session.send('Network.setBlockedURLs', {'urls': blocked_url_patterns(config)})
+    return session
+
+
+def log_blocking_stats(label: str, stats: dict):
+    """Registra no log o resumo de requisições bloqueadas da execução."""
+    total = stats['allowed'] + stats['blocked']
+    if not total:
+        return
+    by_type = ', '.join(f'{t}: {n}' for t, n in stats['blocked_by_type'].most_common())
+    logging.info(
+        f"[{label}] Requisições bloqueadas: {stats['blocked']}/{total} "
+        f"(~{stats['estimated_bytes_saved'] / 1_048_576:.1f} MB economizados) | {by_type}"
+    )
+    if stats['blocked_by_domain']:
+        top = ', '.join(f'{d}: {n}' for d, n in stats['blocked_by_domain'].most_common(5))
+        logging.info(f"[{label}] Principais domínios bloqueados: {top}")
@@ -0,0 +1,220 @@
+"""Métricas por fase das execuções do scraper.
+
+Cada execução acumula a duração de cada fase (launch do navegador, navegação,
+espera do seletor, cada scroll, cada seletor, extração, escrita do arquivo),
+contagens de elementos e o pico de memória (RSS) do processo Python e da
+árvore de processos filhos (driver do Playwright + Chromium). Com o navegador
+compartilhado (CDP), o Chromium roda no sidecar e o RSS do navegador não é
+medido (None no JSON, ausente no textfile).
+
+Saídas em `data/metrics/`:
+    scraper_runs.jsonl  uma linha JSON por execução (histórico)
+    scraper.prom        textfile do Prometheus (node_exporter textfile collector)
+"""
+import json
+import logging
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Optional
+
+METRICS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'metrics')
+RUNS_LOG = os.path.join(METRICS_DIR, 'scraper_runs.jsonl')
+PROM_FILE = os.path.join(METRICS_DIR, 'scraper.prom')
+
+
+def _children_rss_bytes(root_pid: int) -> int:
+    """Soma o RSS de todos os descendentes de `root_pid` lendo /proc (Linux)."""
+    children = {}
+    rss = {}
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                stat = f.read()
+            with open(f'/proc/{entry}/statm') as f:
+                resident_pages = int(f.read().split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        # O nome do processo (campo 2) pode conter espaços; o ppid vem depois do ')'
+        ppid = int(stat.rsplit(')', 1)[1].split()[1])
+        children.setdefault(ppid, []).append(int(entry))
+        rss[int(entry)] = resident_pages * page_size
+
+    total = 0
+    stack = list(children.get(root_pid, []))
+    while stack:
+        pid = stack.pop()
+        total += rss.get(pid, 0)
+        stack.extend(children.get(pid, []))
+    return total
+
+
+class ProcessTreeSampler:
+    """Amostra periodicamente o RSS dos processos filhos e guarda o pico."""
+
+    def __init__(self, interval_s: float = 0.5):
+        self.interval_s = interval_s
+        self.peak_bytes = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self.enabled = os.path.isdir('/proc')
+
+    def _run(self):
+        pid = os.getpid()
+        while not self._stop.is_set():
+            try:
+                self.peak_bytes = max(self.peak_bytes, _children_rss_bytes(pid))
+            except OSError:
+                pass
+            self._stop.wait(self.interval_s)
+
+    def start(self):
+        if self.enabled:
+            self._thread = threading.Thread(target=self._run, name='rss-sampler', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+
+class RunMetrics:
+    """Acumula fases, contadores e memória de uma execução do scraper."""
+
+    def __init__(self, engine: str):
+        self.engine = engine
+        self.started_at = datetime.now(timezone.utc)
+        self._start = time.perf_counter()
+        self.phases = {}
+        self.counters = {}
+        self.browser_measured = True
+        self.sampler = ProcessTreeSampler().start()
+
+    @contextmanager
+    def phase(self, name: str):
+        """Mede a duração de um bloco; fases repetidas são somadas."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - start) * 1000)
+
+    def record(self, name: str, duration_ms: float):
+        self.phases[name] = self.phases.get(name, 0.0) + duration_ms
+
+    def set(self, name: str, value):
+        self.counters[name] = value
+
+    def add(self, name: str, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_browser_shared(self, shared: bool):
+        """Registra se o navegador é o compartilhado (CDP). Nesse caso o Chromium
+        roda em outro container e os filhos deste processo não o representam."""
+        self.set('browser_shared', int(shared))
+        if shared:
+            self.browser_measured = False
+            self.sampler.stop()
+
+    def summary(self) -> dict:
+        """Resumo da execução (serializável em JSON)."""
+        self.sampler.stop()
+        matched = self.counters.get('elements_matched', 0)
+        headlines = self.counters.get('headlines', 0)
+        return {
+            'engine': self.engine,
+            'started_at': self.started_at.isoformat(),
+            'duration_s': round(time.perf_counter() - self._start, 3),
+            'phases_ms': {name: round(ms, 1) for name, ms in self.phases.items()},
+            'counters': self.counters,
+            'dedupe_ratio': round(1 - headlines / matched, 4) if matched else None,
+            # ru_maxrss é reportado em KB no Linux
+            'peak_rss_python_bytes': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+            'peak_rss_children_bytes': (self.sampler.peak_bytes
+                                        if self.sampler.enabled and self.browser_measured else None),
+        }
+
+    def emit(self, metrics_dir: Optional[str] = None) -> dict:
+        """Grava a linha JSON da execução e o textfile do Prometheus."""
+        metrics_dir = metrics_dir or METRICS_DIR
+        summary = self.summary()
+        os.makedirs(metrics_dir, exist_ok=True)
+        with open(os.path.join(metrics_dir, os.path.basename(RUNS_LOG)), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(summary, ensure_ascii=False) + '\n')
+
+        prom_path = os.path.join(metrics_dir, os.path.basename(PROM_FILE))
+        tmp_path = f"{prom_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(to_prometheus(summary))
+        os.replace(tmp_path, prom_path)
+
+        phases = ', '.join(f"{name}={ms:.0f}ms" for name, ms in summary['phases_ms'].items())
+        logging.info(f"[Métricas] {self.engine} em {summary['duration_s']:.1f}s | {phases}")
+        return summary
+
+
+def _escape_label(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+
+def to_prometheus(summary: dict) -> str:
+    """Formata o resumo no formato texto de exposição do Prometheus."""
+    engine = _escape_label(summary['engine'])
+    lines = [
+        '# HELP g1_scraper_last_run_timestamp_seconds Início da última execução do scraper.',
+        '# TYPE g1_scraper_last_run_timestamp_seconds gauge',
+        f'g1_scraper_last_run_timestamp_seconds{{engine="{engine}"}} '
+        f'{datetime.fromisoformat(summary["started_at"]).timestamp():.0f}',
+        '# HELP g1_scraper_duration_seconds Duração total da última execução.',
+        '# TYPE g1_scraper_duration_seconds gauge',
+        f'g1_scraper_duration_seconds{{engine="{engine}"}} {summary["duration_s"]}',
+        '# HELP g1_scraper_phase_duration_seconds Duração de cada fase da última execução.',
+        '# TYPE g1_scraper_phase_duration_seconds gauge',
+    ]
+    for name, ms in summary['phases_ms'].items():
+        lines.append(f'g1_scraper_phase_duration_seconds{{engine="{engine}",phase="{_escape_label(name)}"}} {ms / 1000:.4f}')
+
+    lines += [
+        '# HELP g1_scraper_count Contadores da última execução (elementos, manchetes, scrolls...).',
+        '# TYPE g1_scraper_count gauge',
+    ]
+    for name, value in summary['counters'].items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            lines.append(f'g1_scraper_count{{engine="{engine}",name="{_escape_label(name)}"}} {value}')
+
+    if summary['dedupe_ratio'] is not None:
+        lines += [
+            '# HELP g1_scraper_dedupe_ratio Fração dos elementos encontrados descartados como repetidos/inválidos.',
+            '# TYPE g1_scraper_dedupe_ratio gauge',
+            f'g1_scraper_dedupe_ratio{{engine="{engine}"}} {summary["dedupe_ratio"]}',
+        ]
+
+    lines += [
+        '# HELP g1_scraper_peak_rss_bytes Pico de memória residente da execução.',
+        '# TYPE g1_scraper_peak_rss_bytes gauge',
+        f'g1_scraper_peak_rss_bytes{{engine="{engine}",process="python"}} {summary["peak_rss_python_bytes"]}',
+    ]
+    if summary['peak_rss_children_bytes'] is not None:
+        lines.append(f'g1_scraper_peak_rss_bytes{{engine="{engine}",process="browser"}} {summary["peak_rss_children_bytes"]}')
+    return '\n'.join(lines) + '\n'
+
+
+def read_last_run(metrics_dir: Optional[str] = None) -> Optional[dict]:
+    """Última linha de scraper_runs.jsonl (ou None se não houver execuções)."""
+    path = os.path.join(metrics_dir or METRICS_DIR, os.path.basename(RUNS_LOG))
+    if not os.path.exists(path):
+        return None
+    last = None
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                last = line
+    return json.loads(last) if last else None
@@ -0,0 +1,180 @@
+"""Escrita dos lotes coletados pelo scraper e dos manifests de execução.
+
+Cada execução gera um arquivo em `data/raw/` (Parquet com zstd por padrão,
+ou CSV) e, por último, um manifest JSON em `data/manifests/` com contagem de
+linhas, hash do conteúdo, horários e engine. Como o manifest só é gravado
+depois do arquivo, a presença dele indica um lote completo; as tasks de
+ingestão escolhem arquivos pelos manifests em vez de varrer o diretório.
+Depois de carregados, arquivo e manifest são movidos para `data/archive/`.
+"""
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime
+from typing import Literal, Optional
+
+import pandas as pd
+
+from url_canon import canonical_key, canonicalize_url
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+RAW_DIR = os.path.join(DATA_DIR, 'raw')
+MANIFEST_DIR = os.path.join(DATA_DIR, 'manifests')
+ARCHIVE_DIR = os.path.join(DATA_DIR, 'archive')
+
+# Esquema explícito do lote bronze
+SCRAPE_DTYPES = {
+    'title': 'string',
+    'link': 'string',
+    'canonical_link': 'string',
+    'link_key': 'int64',
+    'source': 'string',
+}
+SCRAPE_COLUMNS = ['title', 'link', 'canonical_link', 'link_key', 'source', 'published_at', 'scraped_at']
+
+OutputFormat = Literal['parquet', 'csv']
+PARQUET_ROW_GROUP_ROWS = 100_000
+
+
+def add_canonical_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Preenche `canonical_link`/`link_key` a partir de `link` (lotes anteriores à canonicalização)."""
+    if 'canonical_link' not in df.columns or df['canonical_link'].isna().any():
+        df = df.assign(canonical_link=df['link'].map(canonicalize_url))
+    if 'link_key' not in df.columns or df['link_key'].isna().any():
+        df = df.assign(link_key=df['canonical_link'].map(canonical_key))
+    return df
+
+
+def to_scrape_frame(rows) -> pd.DataFrame:
+    """Converte linhas (ou DataFrame) para o esquema tipado, com `scraped_at` em UTC."""
+    df = pd.DataFrame(rows) if not isinstance(rows, pd.DataFrame) else rows
+    if df.empty:
+        df = pd.DataFrame(columns=SCRAPE_COLUMNS)
+    df = add_canonical_columns(df)
+    if 'published_at' not in df.columns:
+        # Só os feeds/sitemaps informam a data de publicação
+        df = df.assign(published_at=None)
+    df = df[SCRAPE_COLUMNS].astype(SCRAPE_DTYPES)
+    df['published_at'] = pd.to_datetime(df['published_at'], utc=True, format='ISO8601')
+    df['scraped_at'] = pd.to_datetime(df['scraped_at'], utc=True, format='ISO8601')
+    return df
+
+
+def file_sha256(path: str) -> str:
+    """Hash SHA-256 do conteúdo de um arquivo (lido em blocos)."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _atomic_write_json(path: str, payload: dict):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def write_scrape_batch(rows, started_at: datetime, engine: str,
+                       output_format: OutputFormat = 'parquet',
+                       finished_at: Optional[datetime] = None) -> dict:
+    """Grava o lote em data/raw e o manifest correspondente; retorna o manifest."""
+    if output_format not in ('parquet', 'csv'):
+        raise ValueError("Formato inválido. Use 'parquet' ou 'csv'.")
+
+    os.makedirs(RAW_DIR, exist_ok=True)
+    os.makedirs(MANIFEST_DIR, exist_ok=True)
+
+    run_id = f"g1_headlines_{started_at.strftime('%Y%m%d_%H%M%S')}"
+    filepath = os.path.join(RAW_DIR, f"{run_id}.{output_format}")
+
+    df = to_scrape_frame(rows)
+    if output_format == 'parquet':
+        # Row groups limitados permitem ler o arquivo em blocos (iter_scrape_chunks)
+        df.to_parquet(filepath, engine='pyarrow', compression='zstd', index=False,
+                      row_group_size=PARQUET_ROW_GROUP_ROWS)
+    else:
+        df.to_csv(filepath, index=False, encoding='utf-8-sig')
+
+    finished_at = finished_at or datetime.now()
+    manifest = {
+        'run_id': run_id,
+        'engine': engine,
+        'format': output_format,
+        'path': os.path.relpath(filepath, DATA_DIR),
+        'row_count': len(df),
+        'bytes': os.path.getsize(filepath),
+        'sha256': file_sha256(filepath),
+        'started_at': started_at.astimezone().isoformat(),
+        'finished_at': finished_at.astimezone().isoformat(),
+        'columns': {col: str(dtype) for col, dtype in df.dtypes.items()},
+    }
+    _atomic_write_json(os.path.join(MANIFEST_DIR, f"{run_id}.json"), manifest)
+    return manifest
+
+
+def list_manifests(manifest_dir: str = MANIFEST_DIR) -> list:
+    """Manifests de todas as execuções, em ordem cronológica (pelo run_id)."""
+    if not os.path.isdir(manifest_dir):
+        return []
+    manifests = []
+    for name in sorted(os.listdir(manifest_dir)):
+        if name.endswith('.json'):
+            with open(os.path.join(manifest_dir, name), encoding='utf-8') as f:
+                manifests.append(json.load(f))
+    return manifests
+
+
+def latest_manifest(manifest_dir: str = MANIFEST_DIR, engine: Optional[str] = None) -> Optional[dict]:
+    """Manifest da execução mais recente (ou None), opcionalmente só de uma engine."""
+    manifests = [m for m in list_manifests(manifest_dir) if engine is None or m['engine'] == engine]
+    return manifests[-1] if manifests else None
+
+
+def manifest_file_path(manifest: dict, data_dir: str = DATA_DIR) -> str:
+    """Caminho absoluto do arquivo descrito por um manifest."""
+    return os.path.join(data_dir, manifest['path'])
+
+
+def archive_batch(manifest: dict, data_dir: str = DATA_DIR, archive_dir: str = ARCHIVE_DIR) -> str:
+    """Move o arquivo do lote e o manifest para data/archive (mesma estrutura de pastas)."""
+    source = manifest_file_path(manifest, data_dir)
+    target = os.path.join(archive_dir, manifest['path'])
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    if os.path.exists(source):
+        shutil.move(source, target)
+
+    manifest_name = f"{manifest['run_id']}.json"
+    manifest_target = os.path.join(archive_dir, 'manifests', manifest_name)
+    os.makedirs(os.path.dirname(manifest_target), exist_ok=True)
+    manifest_source = os.path.join(data_dir, 'manifests', manifest_name)
+    if os.path.exists(manifest_source):
+        shutil.move(manifest_source, manifest_target)
+    return target
+
+
+def read_scrape_file(path: str) -> pd.DataFrame:
+    """Lê um lote do scraper (Parquet ou CSV) no esquema tipado."""
+    if path.endswith('.parquet'):
+        df = pd.read_parquet(path, engine='pyarrow')
+        return df if set(SCRAPE_COLUMNS) <= set(df.columns) else to_scrape_frame(df)
+    return to_scrape_frame(pd.read_csv(path, encoding='utf-8-sig'))
+
+
+def iter_scrape_chunks(path: str, chunk_rows: int = 50_000):
+    """Lê um lote em blocos de até `chunk_rows` linhas, já no esquema tipado.
+
+    Parquet é lido por record batches do Arrow e CSV com `chunksize`, então a
+    memória usada não depende do tamanho do arquivo.
+    """
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_rows):
+            yield to_scrape_frame(batch.to_pandas())
+    else:
+        for chunk in pd.read_csv(path, encoding='utf-8-sig', chunksize=chunk_rows):
+            yield to_scrape_frame(chunk)
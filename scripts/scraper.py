@@ -1,189 +1,639 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from bs4 import BeautifulSoup
+import lxml.html
 import pandas as pd
 import logging
 from datetime import datetime
 from typing import Literal, Optional
+from urllib.parse import urljoin
 import os
+import time
+import asyncio
+import gzip
+import threading
+
+from seen_index import SeenLinkFilter
+from scrape_output import write_scrape_batch
+from scrape_metrics import RunMetrics
+from bronze_stream import BronzeStreamWriter, close_connection_pool
+from warm_browser import acquire_browser, acquire_browser_async
+from url_canon import canonical_key, canonicalize_url
+from scraper_config import USER_AGENT
+from feed_discovery import discover_entries, feed_urls_from_env, load_validators, save_validators
+from resource_blocker import (
+    install_resource_blocking,
+    install_resource_blocking_async,
+    install_resource_blocking_cdp,
+    install_resource_blocking_cdp_async,
+    log_blocking_stats,
+    new_blocking_stats,
+    resource_blocking_config,
+)
 
 try:
-    # Import lazy: só será usado se engine=playwright
+    # Import lazy: só será usado se engine=playwright/crawl
     from playwright.sync_api import sync_playwright
+    from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+    from playwright.async_api import async_playwright
     _PLAYWRIGHT_AVAILABLE = True
 except Exception:  # pragma: no cover
     _PLAYWRIGHT_AVAILABLE = False
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+BASE_URL = "https://g1.globo.com"
+MIN_TITLE_LENGTH = 15  # Mínimo de caracteres para considerar uma manchete
+
+# Múltiplos seletores para capturar diferentes tipos de elementos
+HEADLINE_SELECTORS = [
+    '[data-mrf-layout-title]',  # Seletor principal
+    '.feed-post-body-title',    # Posts do feed
+    '.bstn-hl-title',           # Títulos de headlines
+    'h2[data-mrf-layout-title]', # Títulos H2
+    'h3[data-mrf-layout-title]', # Títulos H3
+    'span[data-mrf-layout-title]', # Spans com título
+    'p[data-mrf-layout-title]',    # Parágrafos com título
+    '.gui-color-primary[data-mrf-layout-title]' # Elementos com classe específica
+]
+
+# Lista única para contar nós sem repetição (querySelectorAll com vírgulas
+# já devolve cada elemento uma só vez)
+HEADLINE_CSS = ', '.join(HEADLINE_SELECTORS)
+COUNT_HEADLINES_JS = "sel => document.querySelectorAll(sel).length"
+HEADLINES_GREW_JS = "([sel, previous]) => document.querySelectorAll(sel).length > previous"
+SCROLL_TO_BOTTOM_JS = 'window.scrollTo(0, document.body.scrollHeight)'
+DEFAULT_STALE_SCROLLS = 2  # Scrolls seguidos sem novas manchetes antes de parar
+
+# Equivalente XPath de HEADLINE_SELECTORS para o engine HTTP (lxml não tem
+# suporte nativo a CSS); os seletores com tag são subconjuntos do primeiro.
+HEADLINE_XPATH = (
+    "//*[@data-mrf-layout-title]"
+    " | //*[contains(concat(' ', normalize-space(@class), ' '), ' feed-post-body-title ')]"
+    " | //*[contains(concat(' ', normalize-space(@class), ' '), ' bstn-hl-title ')]"
+)
+
+# Seções visitadas por padrão no modo crawl ('' = home)
+G1_SECTIONS = [
+    '',
+    'economia',
+    'politica',
+    'mundo',
+    'tecnologia',
+    'saude',
+    'educacao',
+    'meio-ambiente',
+    'sp/sao-paulo',
+    'rj/rio-de-janeiro',
+    'mg/minas-gerais',
+    'rs/rio-grande-do-sul',
+    'pe',
+    'ba',
+    'df/distrito-federal',
+]
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'fixtures')
+
+_HTTP_SESSION = None
+
+# Script executado no navegador: percorre todos os seletores, remove nós
+# repetidos e resolve título/link em uma única chamada (um round trip de IPC).
+# Retorna {matched, items: [[title, href], ...], selectors: [[seletor, nós, ms], ...]}.
+EXTRACT_HEADLINES_JS = """
+({selectors, minLength}) => {
+    const visited = new Set();
+    const items = [];
+    const selectorStats = [];
+    let matched = 0;
+    for (const selector of selectors) {
+        const started = performance.now();
+        let nodes;
+        try {
+            nodes = document.querySelectorAll(selector);
+        } catch (e) {
+            continue;
+        }
+        matched += nodes.length;
+        for (const el of nodes) {
+            if (visited.has(el)) continue;
+            visited.add(el);
+
+            const title = (el.innerText || '').trim();
+            if (title.length < minLength) continue;
+
+            // Mesma ordem de tentativas do caminho por elemento:
+            // <a> ancestral, <a> descendente e data-mrf-link do pai
+            let href = null;
+            const anchor = el.closest('a');
+            if (anchor && anchor.href) href = anchor.href;
+            if (!href) {
+                const child = el.querySelector('a');
+                if (child) href = child.getAttribute('href');
+            }
+            if (!href && el.parentElement) {
+                href = el.parentElement.getAttribute('data-mrf-link');
+            }
+            if (!href) continue;
+
+            items.push([title, href]);
+        }
+        selectorStats.push([selector, nodes.length, performance.now() - started]);
+    }
+    return {matched, items, selectors: selectorStats};
+}
+"""
+
+
+def normalize_link(href: Optional[str]) -> Optional[str]:
+    """Converte links relativos em absolutos e descarta esquemas não-HTTP."""
+    if not href:
+        return None
+    if href.startswith('/'):
+        return f"{BASE_URL}{href}"
+    if not href.startswith('http'):
+        return None
+    return href
+
+
+def _append_headline(rows: list, seen: set, processed_titles: set, title: str, href: Optional[str],
+                     published_at: Optional[str] = None) -> bool:
+    """Aplica os filtros de qualidade e adiciona a manchete em `rows`.
+
+    `published_at` só é conhecido na descoberta por feeds/sitemaps.
+    Retorna True se a manchete foi aceita.
+    """
+    if not title or len(title) < MIN_TITLE_LENGTH:
+        return False
+    if title in processed_titles:  # Evitar títulos duplicados
+        return False
+
+    link = normalize_link(href)
+    if not link:
+        return False
+    # Deduplicação pela URL canônica (sem utm_*, fragmento, barra final...)
+    canonical = canonicalize_url(link)
+    if canonical in seen:
+        return False
+
+    seen.add(canonical)
+    processed_titles.add(title)
+    rows.append({
+        'title': title,
+        'link': link,
+        'canonical_link': canonical,
+        'link_key': canonical_key(canonical),
+        'source': 'G1',
+        'published_at': published_at,
+        'scraped_at': datetime.now().astimezone().isoformat()
+    })
+    logging.debug(f"[Coletado] {title[:60]}...")
+    return True
+
+
+def extract_headlines_evaluate(page, seen: set, metrics: Optional[RunMetrics] = None,
+                               processed_titles: Optional[set] = None) -> list:
+    """Extrai manchetes com um único `page.evaluate` (todo o trabalho no navegador)."""
+    result = page.evaluate(EXTRACT_HEADLINES_JS, {
+        'selectors': HEADLINE_SELECTORS,
+        'minLength': MIN_TITLE_LENGTH,
+    })
+    logging.info(
+        f"[Playwright] Elementos encontrados: {result['matched']} "
+        f"({len(result['items'])} candidatos únicos)"
+    )
+    if metrics is not None:
+        metrics.add('elements_matched', result['matched'])
+        metrics.add('elements_candidates', len(result['items']))
+        for selector, count, ms in result['selectors']:
+            metrics.record(f"selector:{selector}", ms)
+            metrics.add(f"selector_nodes:{selector}", count)
+
+    rows = []
+    processed_titles = set() if processed_titles is None else processed_titles
+    for title, href in result['items']:
+        _append_headline(rows, seen, processed_titles, title.strip(), href)
+    return rows
+
+
+async def extract_headlines_evaluate_async(page, seen: set, processed_titles: set,
+                                           metrics: Optional[RunMetrics] = None) -> list:
+    """Versão assíncrona de `extract_headlines_evaluate` para o modo crawl.
+
+    `seen` e `processed_titles` são compartilhados entre as seções.
+    """
+    result = await page.evaluate(EXTRACT_HEADLINES_JS, {
+        'selectors': HEADLINE_SELECTORS,
+        'minLength': MIN_TITLE_LENGTH,
+    })
+    if metrics is not None:
+        metrics.add('elements_matched', result['matched'])
+        metrics.add('elements_candidates', len(result['items']))
+    rows = []
+    for title, href in result['items']:
+        _append_headline(rows, seen, processed_titles, title.strip(), href)
+    return rows
+
+
+def extract_headlines_handles(page, seen: set, metrics: Optional[RunMetrics] = None,
+                              processed_titles: Optional[set] = None) -> list:
+    """Extrai manchetes consultando cada elemento via ElementHandle.
+
+    Caminho original, mantido para comparação (uma chamada de IPC por operação).
+    """
+    all_elements = []
+
+    for selector in HEADLINE_SELECTORS:
+        selector_start = time.perf_counter()
+        try:
+            elements = page.query_selector_all(selector)
+            all_elements.extend(elements)
+            logging.info(f"[Seletor] '{selector}': {len(elements)} elementos")
+            if metrics is not None:
+                metrics.record(f"selector:{selector}", (time.perf_counter() - selector_start) * 1000)
+                metrics.add(f"selector_nodes:{selector}", len(elements))
+        except Exception as e:
+            logging.debug(f"[Erro seletor] {selector}: {e}")
+            continue
+
+    logging.info(f"[Playwright] Total de elementos encontrados: {len(all_elements)}")
+    if metrics is not None:
+        metrics.add('elements_matched', len(all_elements))
+
+    rows = []
+    processed_titles = set() if processed_titles is None else processed_titles
+
+    for el in all_elements:
+        try:
+            title = (el.inner_text() or '').strip()
+
+            if not title or len(title) < MIN_TITLE_LENGTH or title in processed_titles:
+                continue
+
+            href_value = None
+
+            # Primeira tentativa: elemento <a> ancestral
+            try:
+                anchor_handle = el.evaluate_handle('el => el.closest("a")')
+                if anchor_handle:
+                    href = anchor_handle.get_property('href')
+                    href_value = href.json_value() if href else None
+                    anchor_handle.dispose()
+            except:
+                pass
+
+            # Segunda tentativa: buscar <a> em elementos filhos
+            if not href_value:
+                try:
+                    anchor_in_children = el.query_selector('a')
+                    if anchor_in_children:
+                        href_value = anchor_in_children.get_attribute('href')
+                except:
+                    pass
+
+            # Terceira tentativa: buscar por data-mrf-link
+            if not href_value:
+                try:
+                    parent = el.evaluate_handle('el => el.parentElement')
+                    if parent:
+                        data_link = parent.get_attribute('data-mrf-link')
+                        if data_link:
+                            href_value = data_link
+                        parent.dispose()
+                except:
+                    pass
+
+            _append_headline(rows, seen, processed_titles, title, href_value)
+
+        except Exception as e:
+            logging.debug(f"[Erro elemento] {str(e)}")
+            continue
+
+    return rows
+
+
+EXTRACTORS = {
+    'evaluate': extract_headlines_evaluate,
+    'handles': extract_headlines_handles,
+}
+
+
+def _scroll_summary(label: str, stats: dict, max_scrolls: int, growth_timeout_ms: int) -> dict:
+    """Completa as estatísticas de scroll com a economia estimada e registra no log.
+
+    A economia é medida contra o orçamento fixo antigo (`max_scrolls` esperas de
+    `growth_timeout_ms`), sem contar o `networkidle` que também era aguardado.
+    """
+    fixed_budget_s = max_scrolls * growth_timeout_ms / 1000
+    stats['time_saved_s'] = max(0.0, fixed_budget_s - stats['elapsed_s'])
+    logging.info(
+        f"[{label}] Scroll finalizado ({stats['stop_reason']}): {stats['scrolls']} scrolls, "
+        f"{stats['initial_nodes']} → {stats['final_nodes']} nós em {stats['elapsed_s']:.1f}s "
+        f"(economia estimada de {stats['time_saved_s']:.1f}s)"
+    )
+    return stats
+
+
+def adaptive_scroll(page, max_scrolls: int, growth_timeout_ms: int,
+                    stale_scrolls: int = DEFAULT_STALE_SCROLLS,
+                    budget_ms: Optional[int] = None) -> dict:
+    """Rola a página até o feed parar de crescer.
+
+    Após cada scroll espera (via `wait_for_function`) o número de nós de
+    manchete aumentar, por no máximo `growth_timeout_ms`. Para após
+    `stale_scrolls` scrolls seguidos sem crescimento, ao atingir `max_scrolls`
+    ou ao esgotar o orçamento total `budget_ms`.
+    """
+    budget_ms = max_scrolls * growth_timeout_ms if budget_ms is None else budget_ms
+    start = time.perf_counter()
+    deadline = start + budget_ms / 1000
+    count = initial = page.evaluate(COUNT_HEADLINES_JS, HEADLINE_CSS)
+    scrolls = stale = 0
+    scroll_ms = []
+    stop_reason = 'max_scrolls'
+
+    while scrolls < max_scrolls:
+        remaining_ms = (deadline - time.perf_counter()) * 1000
+        if remaining_ms <= 0:
+            stop_reason = 'budget'
+            break
+
+        scroll_start = time.perf_counter()
+        page.evaluate(SCROLL_TO_BOTTOM_JS)
+        scrolls += 1
+        try:
+            page.wait_for_function(HEADLINES_GREW_JS, arg=[HEADLINE_CSS, count],
+                                   timeout=min(growth_timeout_ms, remaining_ms), polling=100)
+        except PlaywrightTimeoutError:
+            pass
+
+        new_count = page.evaluate(COUNT_HEADLINES_JS, HEADLINE_CSS)
+        scroll_ms.append((time.perf_counter() - scroll_start) * 1000)
+        logging.info(f"[Playwright] Scroll {scrolls}/{max_scrolls}: {count} → {new_count} nós")
+        stale = stale + 1 if new_count <= count else 0
+        count = new_count
+        if stale >= stale_scrolls:
+            stop_reason = 'stale'
+            break
+
+    return _scroll_summary('Playwright', {
+        'scrolls': scrolls,
+        'initial_nodes': initial,
+        'final_nodes': count,
+        'elapsed_s': time.perf_counter() - start,
+        'scroll_ms': scroll_ms,
+        'stop_reason': stop_reason,
+    }, max_scrolls, growth_timeout_ms)
+
+
+async def adaptive_scroll_async(page, max_scrolls: int, growth_timeout_ms: int,
+                                stale_scrolls: int = DEFAULT_STALE_SCROLLS,
+                                budget_ms: Optional[int] = None) -> dict:
+    """Versão assíncrona de `adaptive_scroll` para o modo crawl."""
+    budget_ms = max_scrolls * growth_timeout_ms if budget_ms is None else budget_ms
+    start = time.perf_counter()
+    deadline = start + budget_ms / 1000
+    count = initial = await page.evaluate(COUNT_HEADLINES_JS, HEADLINE_CSS)
+    scrolls = stale = 0
+    scroll_ms = []
+    stop_reason = 'max_scrolls'
+
+    while scrolls < max_scrolls:
+        remaining_ms = (deadline - time.perf_counter()) * 1000
+        if remaining_ms <= 0:
+            stop_reason = 'budget'
+            break
+
+        scroll_start = time.perf_counter()
+        await page.evaluate(SCROLL_TO_BOTTOM_JS)
+        scrolls += 1
+        try:
+            await page.wait_for_function(HEADLINES_GREW_JS, arg=[HEADLINE_CSS, count],
+                                         timeout=min(growth_timeout_ms, remaining_ms), polling=100)
+        except PlaywrightTimeoutError:
+            pass
+
+        new_count = await page.evaluate(COUNT_HEADLINES_JS, HEADLINE_CSS)
+        scroll_ms.append((time.perf_counter() - scroll_start) * 1000)
+        stale = stale + 1 if new_count <= count else 0
+        count = new_count
+        if stale >= stale_scrolls:
+            stop_reason = 'stale'
+            break
+
+    return _scroll_summary('Crawl', {
+        'scrolls': scrolls,
+        'initial_nodes': initial,
+        'final_nodes': count,
+        'elapsed_s': time.perf_counter() - start,
+        'scroll_ms': scroll_ms,
+        'stop_reason': stop_reason,
+    }, max_scrolls, growth_timeout_ms)
+
+
 def scrape_g1_headlines(timeout_ms: int = 60000, headless: bool = True, return_df: bool = False, 
-                       scroll_attempts: int = 6, wait_after_scroll: int = 3000):
+                       scroll_attempts: int = 6, wait_after_scroll: int = 3000,
+                       extraction: Literal['evaluate', 'handles'] = 'evaluate',
+                       stale_scrolls: int = DEFAULT_STALE_SCROLLS,
+                       scroll_budget_ms: Optional[int] = None,
+                       block_resources: bool = True, incremental: bool = False,
+                       output_format: str = 'parquet', capture: bool = False,
+                       capture_har: bool = False, cdp_url: Optional[str] = None,
+                       stream: bool = False, side_output: bool = True):
     """Usa Playwright para capturar máximo de conteúdo dinâmico.
 
     Args:
         timeout_ms: tempo máximo para esperar os seletores.
         headless: executar sem interface gráfica.
         return_df: se True retorna DataFrame.
-        scroll_attempts: número de scrolls para carregar mais conteúdo.
-        wait_after_scroll: tempo de espera após cada scroll (ms).
+        scroll_attempts: número máximo de scrolls para carregar mais conteúdo.
+        wait_after_scroll: tempo máximo de espera por novas manchetes após cada scroll (ms).
+        extraction: 'evaluate' (um único round trip) ou 'handles' (um por elemento).
+        stale_scrolls: scrolls seguidos sem novas manchetes antes de parar.
+        scroll_budget_ms: tempo máximo total de scroll (default: scroll_attempts * wait_after_scroll).
+        block_resources: bloquear imagens, mídia, fontes e hosts de anúncios/tracking.
+        incremental: emitir apenas links ainda não vistos em execuções anteriores.
+        output_format: 'parquet' (zstd) ou 'csv'.
+        capture: salvar o DOM após os scrolls como fixture (data/fixtures/*.html.gz).
+        capture_har: gravar também o HAR da navegação (data/fixtures/*.har.zip).
+        cdp_url: endpoint CDP de um Chromium já em execução (default: SCRAPER_BROWSER_CDP_URL);
+            sem ele, ou se estiver fora do ar, lança um navegador local.
+        stream: gravar as manchetes em raw_headlines assim que extraídas (bronze_stream).
+        side_output: com `stream`, gravar também o arquivo em data/raw (replay).
     """
     if not _PLAYWRIGHT_AVAILABLE:
         raise RuntimeError("Playwright não está instalado ou não pôde ser importado.")
+    if extraction not in EXTRACTORS:
+        raise ValueError("Extração inválida. Use 'evaluate' ou 'handles'.")
 
     start_time = datetime.now()
-    url = "https://g1.globo.com/"
+    url = f"{BASE_URL}/"
     logging.info(f"[Playwright] Iniciando navegação em {url}")
-    rows = []
     seen = set()
+    blocking_stats = new_blocking_stats()
+    metrics = RunMetrics('playwright')
+    sink = HeadlineSink(incremental, BronzeStreamWriter(metrics=metrics) if stream else None)
+    
+    fixture_stem = os.path.join(FIXTURES_DIR, f"g1_home_{start_time.strftime('%Y%m%d_%H%M%S')}")
+    har_kwargs = {}
+    if capture_har:
+        os.makedirs(FIXTURES_DIR, exist_ok=True)
+        har_kwargs = {'record_har_path': f"{fixture_stem}.har.zip", 'record_har_content': 'attach'}
     
     with sync_playwright() as p:
-        browser = p.chromium.launch(headless=headless)
-        context = browser.new_context(
-            user_agent=(
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/125.0.0.0 Safari/537.36"
-            ),
-            viewport={'width': 1920, 'height': 1080}
-        )
-        page = context.new_page()
+        with metrics.phase('browser_launch'):
+            browser, shared = acquire_browser(p, headless=headless, cdp_url=cdp_url)
+            # No navegador compartilhado, o contexto padrão usa o perfil persistente
+            # do sidecar (cache de disco entre execuções); o HAR exige contexto próprio
+            owns_context = not (shared and browser.contexts and not har_kwargs)
+            if owns_context:
+                context = browser.new_context(
+                    user_agent=USER_AGENT,
+                    viewport={'width': 1920, 'height': 1080},
+                    **har_kwargs
+                )
+            else:
+                context = browser.contexts[0]
+            page = context.new_page()
+            if not owns_context:
+                page.set_viewport_size({'width': 1920, 'height': 1080})
+            if block_resources:
+                if owns_context:
+                    install_resource_blocking(context, resource_blocking_config(), blocking_stats)
+                else:
+                    # context.route desligaria o cache HTTP do perfil persistente; o CDP o mantém
+                    install_resource_blocking_cdp(context, page, resource_blocking_config(), blocking_stats)
+        metrics.set_browser_shared(shared)
         
         try:
             # Navegar e aguardar carregamento completo
-            page.goto(url, timeout=timeout_ms, wait_until='domcontentloaded')
+            with metrics.phase('navigation'):
+                page.goto(url, timeout=timeout_ms, wait_until='domcontentloaded')
             logging.info("[Playwright] Página carregada, aguardando elementos dinâmicos...")
             
             # Aguardar primeiro batch de elementos
-            page.wait_for_selector('[data-mrf-layout-title]', timeout=timeout_ms)
+            with metrics.phase('wait_for_selector'):
+                page.wait_for_selector('[data-mrf-layout-title]', timeout=timeout_ms)
             
-            # Realizar scrolls para carregar mais conteúdo
-            for scroll in range(scroll_attempts):
-                logging.info(f"[Playwright] Scroll {scroll + 1}/{scroll_attempts}")
-                
-                # Scroll até o final da página
-                page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
-                page.wait_for_timeout(wait_after_scroll)
-                
-                # Aguardar possíveis novos elementos carregarem
-                try:
-                    page.wait_for_load_state('networkidle', timeout=3000)
-                except:
-                    pass  # Continua se não houver mais carregamento
-            
-            # Usar múltiplos seletores para capturar diferentes tipos de elementos
-            selectors = [
-                '[data-mrf-layout-title]',  # Seletor principal
-                '.feed-post-body-title',    # Posts do feed
-                '.bstn-hl-title',           # Títulos de headlines
-                'h2[data-mrf-layout-title]', # Títulos H2
-                'h3[data-mrf-layout-title]', # Títulos H3
-                'span[data-mrf-layout-title]', # Spans com título
-                'p[data-mrf-layout-title]',    # Parágrafos com título
-                '.gui-color-primary[data-mrf-layout-title]' # Elementos com classe específica
-            ]
-            
-            all_elements = []
-            
-            for selector in selectors:
-                try:
-                    elements = page.query_selector_all(selector)
-                    all_elements.extend(elements)
-                    logging.info(f"[Seletor] '{selector}': {len(elements)} elementos")
-                except Exception as e:
-                    logging.debug(f"[Erro seletor] {selector}: {e}")
-                    continue
+            processed_titles = set()
+            if sink.stream is not None:
+                # Com streaming, as manchetes do primeiro carregamento seguem para o banco
+                # antes dos scrolls; a extração final traz só as que surgiram depois
+                with metrics.phase('extraction_initial'):
+                    sink.add(EXTRACTORS[extraction](page, seen, None, processed_titles), flush=True)
             
-            logging.info(f"[Playwright] Total de elementos encontrados: {len(all_elements)}")
+            # Rolar até o feed parar de crescer (ou esgotar o orçamento)
+            scroll_stats = adaptive_scroll(page, scroll_attempts, wait_after_scroll,
+                                           stale_scrolls=stale_scrolls, budget_ms=scroll_budget_ms)
+            for i, ms in enumerate(scroll_stats['scroll_ms'], start=1):
+                metrics.record(f"scroll_{i}", ms)
+            metrics.set('scrolls', scroll_stats['scrolls'])
+            metrics.set('scroll_time_saved_s', round(scroll_stats['time_saved_s'], 2))
             
-            # Processar elementos únicos
-            processed_titles = set() 
+            if capture:
+                save_fixture(page.content(), f"{fixture_stem}.html.gz")
             
-            for el in all_elements:
-                try:
-                    title = (el.inner_text() or '').strip()
-                    
-                    # Filtros de qualidade
-                    if not title or len(title) < 15:  # Mínimo 15 caracteres
-                        continue
-                    
-                    if title in processed_titles:  # Evitar títulos duplicados
-                        continue
-                    
-                    # Buscar elemento <a> pai
-                    anchor = None
-                    href = None
-                    
-                    # Primeira tentativa: elemento pai direto
-                    try:
-                        anchor_handle = el.evaluate_handle('el => el.closest("a")')
-                        if anchor_handle:
-                            href = anchor_handle.get_property('href')
-                            href_value = href.json_value() if href else None
-                            anchor_handle.dispose()
-                    except:
-                        pass
-                    
-                    # Segunda tentativa: buscar <a> em elementos filhos
-                    if not href_value:
-                        try:
-                            anchor_in_children = el.query_selector('a')
-                            if anchor_in_children:
-                                href_value = anchor_in_children.get_attribute('href')
-                        except:
-                            pass
-                    
-                    # Terceira tentativa: buscar por data-mrf-link
-                    if not href_value:
-                        try:
-                            parent = el.evaluate_handle('el => el.parentElement')
-                            if parent:
-                                data_link = parent.get_attribute('data-mrf-link')
-                                if data_link:
-                                    href_value = data_link
-                                parent.dispose()
-                        except:
-                            pass
-                    
-                    if not href_value:
-                        continue
-                    
-                    # Normalizar URL
-                    if href_value.startswith('/'):
-                        href_value = f"https://g1.globo.com{href_value}"
-                    elif not href_value.startswith('http'):
-                        continue  
-                    
-                    # Verificar se já foi processado
-                    if href_value in seen:
-                        continue
-                    
-                    seen.add(href_value)
-                    processed_titles.add(title)
-                    
-                    rows.append({
-                        'title': title,
-                        'link': href_value,
-                        'source': 'G1',
-                        'scraped_at': datetime.now().isoformat()
-                    })
-                    
-                    logging.debug(f"[Coletado] {title[:60]}...")
-                        
-                except Exception as e:
-                    logging.debug(f"[Erro elemento] {str(e)}")
-                    continue
+            # Extrair manchetes com a estratégia escolhida
+            extract_start = time.perf_counter()
+            rows = EXTRACTORS[extraction](page, seen, metrics, processed_titles)
+            extract_ms = (time.perf_counter() - extract_start) * 1000
+            metrics.record('extraction', extract_ms)
+            logging.info(f"[Playwright] Extração '{extraction}' em {extract_ms:.1f}ms")
+            sink.add(rows)
         
         except Exception as e:
             logging.error(f"[Playwright] Erro durante navegação: {str(e)}")
         finally:
+            # O HAR só é gravado no fechamento do contexto
+            if owns_context:
+                context.close()
+            else:
+                page.close()
+            # No navegador compartilhado, close() apenas desconecta
             browser.close()
     
+    if capture_har:
+        logging.info(f"[Fixture] HAR salvo em {fixture_stem}.har.zip")
+    
     duration = (datetime.now() - start_time).total_seconds()
     
     logging.info(f"[Playwright] Concluído em {duration:.1f}s")
-    logging.info(f"[Playwright] Total de manchetes únicas coletadas: {len(rows)}")
+    logging.info(f"[Playwright] Total de manchetes únicas coletadas: {sink.extracted}")
+    log_blocking_stats('Playwright', blocking_stats)
+    metrics.set('requests_blocked', blocking_stats['blocked'])
+    metrics.set('bytes_saved_estimated', blocking_stats['estimated_bytes_saved'])
     
+    return _finalize_rows(sink, start_time, return_df, label='Playwright', output_format=output_format,
+                          metrics=metrics, side_output=side_output)
+
+
+class HeadlineSink:
+    """Recebe as manchetes de uma execução à medida que são extraídas.
+
+    Com `incremental`, descarta na entrada os links já vistos em execuções
+    anteriores (índice persistente em data/index); com `stream`, entrega as
+    linhas restantes ao `BronzeStreamWriter` na hora, sem esperar o fim da
+    coleta. `rows` acumula o lote para o arquivo de replay ou o DataFrame.
+    Pode receber linhas de várias threads (`asyncio.to_thread` no crawl).
+
+    Linhas avulsas (feeds) esperam o lote do writer encher; ao fim de uma página
+    ou seção, `flush=True` grava o que estiver pendente sem esperar a próxima.
+    """
+
+    def __init__(self, incremental: bool = False, stream: Optional[BronzeStreamWriter] = None):
+        self.seen_filter = SeenLinkFilter() if incremental else None
+        self.stream = stream
+        self.rows = []
+        self.extracted = 0
+        self._lock = threading.Lock()
+
+    def add(self, rows: list, flush: bool = False) -> list:
+        """Filtra e encaminha as linhas extraídas; retorna as que foram aceitas."""
+        with self._lock:
+            self.extracted += len(rows)
+            if self.seen_filter is not None:
+                rows = self.seen_filter.filter(rows)
+            self.rows.extend(rows)
+        if self.stream is not None:
+            self.stream.write(rows)
+            if flush:
+                self.stream.flush()
+        return rows
+
+
+def _finalize_rows(sink: HeadlineSink, start_time: datetime, return_df: bool, label: str,
+                   output_format: str = 'parquet', metrics: Optional[RunMetrics] = None,
+                   side_output: bool = True):
+    """Loga uma amostra e retorna o DataFrame ou salva o lote + manifest em data/.
+
+    As linhas de `sink` já passaram pelo filtro incremental; os links só entram
+    no índice depois que o lote foi gravado. Se `metrics` for informado,
+    registra a escrita e emite as métricas da execução em data/metrics.
+
+    Com streaming, as linhas já foram enviadas ao banco durante a coleta: o
+    restante do lote é gravado aqui e o arquivo (se `side_output`) entra no
+    ledger como já carregado.
+    """
+    rows, stream, seen_filter = sink.rows, sink.stream, sink.seen_filter
+    if stream is not None:
+        stream.close()
+
+    if metrics is not None:
+        metrics.set('headlines', sink.extracted)
+
+    if seen_filter is not None and sink.extracted:
+        logging.info(f"[{label}] Modo incremental: {len(rows)} links novos, {seen_filter.reseen} re-vistos")
+        if metrics is not None:
+            metrics.set('headlines_new', len(rows))
+            metrics.set('headlines_reseen', seen_filter.reseen)
+
     if not rows:
-        logging.warning("[Playwright] Nenhuma manchete foi coletada!")
+        logging.warning(f"[{label}] Nenhuma manchete foi coletada!")
+        if seen_filter is not None:
+            # Só links re-vistos: nada a gravar, apenas renova o last_seen
+            seen_filter.commit()
+        if metrics is not None:
+            metrics.emit()
         return pd.DataFrame() if return_df else None
     
     # Mostrar amostra das primeiras notícias
@@ -192,38 +642,550 @@ def scrape_g1_headlines(timeout_ms: int = 60000, headless: bool = True, return_d
         logging.info(f"  {i+1}. {row['title'][:70]}...")
     
     if return_df:
+        # O chamador é quem persiste o DataFrame; o índice de links não é atualizado
+        if metrics is not None:
+            metrics.emit()
         return pd.DataFrame(rows)
+
+    if stream is not None and not side_output and not stream.failed:
+        if seen_filter is not None:
+            seen_filter.commit()
+        if metrics is not None:
+            metrics.emit()
+        return rows
     
-    # Criar diretório de dados se não existir
-    data_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'raw')
-    os.makedirs(data_dir, exist_ok=True)
-    
-    # Salvar em CSV na pasta organizada
-    timestamp = start_time.strftime('%Y%m%d_%H%M%S')
-    filename = f'g1_headlines_{timestamp}.csv'
-    filepath = os.path.join(data_dir, filename)
-    
-    df = pd.DataFrame(rows)
-    df.to_csv(filepath, index=False, encoding='utf-8-sig')
+    # Salvar o lote (Parquet/CSV) em data/raw e o manifest em data/manifests
+    write_start = time.perf_counter()
+    manifest = write_scrape_batch(rows, start_time, engine=label.lower(), output_format=output_format)
+    if metrics is not None:
+        metrics.record('file_write', (time.perf_counter() - write_start) * 1000)
+        metrics.set('output_bytes', manifest['bytes'])
+        metrics.set('run_id', manifest['run_id'])
+        metrics.emit()
     
-    logging.info(f"[Arquivo salvo] {filepath}")
+    logging.info(
+        f"[Arquivo salvo] {manifest['path']} ({manifest['row_count']} linhas, "
+        f"{manifest['bytes'] / 1024:.1f} KB, sha256 {manifest['sha256'][:12]})"
+    )
+    if stream is not None and stream.mark_batch_loaded(manifest):
+        logging.info(f"[{label}] Lote já gravado via streaming; registrado no ledger para replay")
+    if seen_filter is not None:
+        seen_filter.commit()
     
     return rows
 
 
-def main(engine: Literal['requests','playwright'] = 'playwright'):
+def get_http_session() -> requests.Session:
+    """Retorna a sessão HTTP compartilhada (keep-alive + pool de conexões)."""
+    global _HTTP_SESSION
+    if _HTTP_SESSION is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=16,
+            max_retries=Retry(total=2, backoff_factor=0.3,
+                              status_forcelist=[429, 500, 502, 503, 504]),
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({
+            'User-Agent': USER_AGENT,
+            'Accept': 'text/html,application/xhtml+xml',
+            'Accept-Language': 'pt-BR,pt;q=0.9',
+        })
+        _HTTP_SESSION = session
+    return _HTTP_SESSION
+
+
+def section_url(section: str) -> str:
+    """Monta a URL de uma seção do G1 ('' ou '/' para a home)."""
+    section = section.strip('/')
+    return f"{BASE_URL}/{section}/" if section else f"{BASE_URL}/"
+
+
+def parse_headlines_html(html, page_url: str, seen: set, processed_titles: set,
+                         metrics: Optional[RunMetrics] = None) -> list:
+    """Extrai manchetes do HTML renderizado no servidor usando lxml.
+
+    Aplica os mesmos seletores e a mesma ordem de resolução de link do
+    `EXTRACT_HEADLINES_JS`, produzindo o mesmo esquema de linhas.
+    """
+    doc = lxml.html.fromstring(html)
+    rows = []
+    # A união XPath já devolve os nós sem repetição e em ordem de documento
+    nodes = doc.xpath(HEADLINE_XPATH)
+    if metrics is not None:
+        metrics.add('elements_matched', len(nodes))
+    for el in nodes:
+        title = ' '.join(el.text_content().split())
+
+        href = None
+        anchor = el.xpath('ancestor-or-self::a[@href][1]')
+        if anchor:
+            href = anchor[0].get('href')
+        if not href:
+            child = el.xpath('.//a[@href]')
+            if child:
+                href = child[0].get('href')
+        if not href:
+            parent = el.getparent()
+            if parent is not None:
+                href = parent.get('data-mrf-link')
+        if href and not href.startswith(('/', 'http')):
+            href = urljoin(page_url, href)
+
+        _append_headline(rows, seen, processed_titles, title, href)
+    return rows
+
+
+def scrape_g1_headlines_requests(sections: Optional[list] = None, timeout_s: float = 15,
+                                 min_headlines: int = 20, fallback: bool = True,
+                                 return_df: bool = False, incremental: bool = False,
+                                 output_format: str = 'parquet', stream: bool = False,
+                                 side_output: bool = True, **playwright_kwargs):
+    """Coleta manchetes via HTTP puro (sem navegador) a partir do HTML estático.
+
+    Args:
+        sections: seções do G1 a visitar além da home (ex.: ['economia', 'politica']).
+        timeout_s: timeout de cada requisição HTTP (s).
+        min_headlines: mínimo de manchetes esperado; abaixo disso usa o Playwright.
+        fallback: se False, nunca recorre ao Playwright.
+        return_df: se True retorna DataFrame.
+        incremental: emitir apenas links ainda não vistos em execuções anteriores.
+        output_format: 'parquet' (zstd) ou 'csv'.
+        stream: gravar as manchetes em raw_headlines assim que extraídas (bronze_stream).
+        side_output: com `stream`, gravar também o arquivo em data/raw (replay).
+        playwright_kwargs: repassados a `scrape_g1_headlines` no fallback.
+    """
+    start_time = datetime.now()
+    session = get_http_session()
+    urls = [section_url('')] + [section_url(s) for s in (sections or []) if s.strip('/')]
+    seen = set()
+    processed_titles = set()
+    metrics = RunMetrics('requests')
+    sink = HeadlineSink(incremental, BronzeStreamWriter(metrics=metrics) if stream else None)
+
+    for url in urls:
+        fetch_start = time.perf_counter()
+        try:
+            with metrics.phase('fetch'):
+                response = session.get(url, timeout=timeout_s)
+                response.raise_for_status()
+        except requests.RequestException as e:
+            logging.error(f"[Requests] Erro ao buscar {url}: {e}")
+            metrics.add('fetch_errors')
+            continue
+        metrics.add('response_bytes', len(response.content))
+        with metrics.phase('parse'):
+            page_rows = parse_headlines_html(response.content, url, seen, processed_titles, metrics)
+        # Cada página segue para o banco (com --stream) enquanto a próxima é buscada
+        sink.add(page_rows, flush=True)
+        logging.info(
+            f"[Requests] {url}: {len(page_rows)} manchetes "
+            f"({(time.perf_counter() - fetch_start) * 1000:.0f}ms)"
+        )
+
+    duration = (datetime.now() - start_time).total_seconds()
+    logging.info(f"[Requests] Concluído em {duration:.2f}s")
+    logging.info(f"[Requests] Total de manchetes únicas coletadas: {sink.extracted}")
+
+    if sink.extracted < min_headlines and fallback:
+        logging.warning(
+            f"[Requests] Apenas {sink.extracted} manchetes no HTML estático "
+            f"(mínimo {min_headlines}). Usando Playwright como fallback."
+        )
+        if sink.stream is not None:
+            # O que já foi enviado fica em raw_headlines; o Playwright reenvia como duplicata
+            sink.stream.close()
+        metrics.set('headlines', sink.extracted)
+        metrics.set('fallback', 1)
+        metrics.emit()
+        return scrape_g1_headlines(return_df=return_df, incremental=incremental,
+                                   output_format=output_format, stream=stream,
+                                   side_output=side_output, **playwright_kwargs)
+
+    return _finalize_rows(sink, start_time, return_df, label='Requests', output_format=output_format,
+                          metrics=metrics, side_output=side_output)
+
+
+def scrape_g1_feeds(feeds: Optional[list] = None, timeout_s: float = 15,
+                    max_child_sitemaps: int = 20, return_df: bool = False,
+                    incremental: bool = False, output_format: str = 'parquet',
+                    stream: bool = False, side_output: bool = True):
+    """Descobre manchetes pelos feeds RSS/Atom e sitemaps de notícias (sem navegador).
+
+    Args:
+        feeds: URLs de feeds/sitemaps (default: SCRAPER_FEED_URLS ou os feeds RSS do G1).
+        timeout_s: timeout de cada requisição HTTP (s).
+        max_child_sitemaps: máximo de sitemaps filhos seguidos a partir de índices.
+        return_df: se True retorna DataFrame.
+        incremental: emitir apenas links ainda não vistos em execuções anteriores.
+        output_format: 'parquet' (zstd) ou 'csv'.
+        stream: gravar as manchetes em raw_headlines assim que extraídas (bronze_stream).
+        side_output: com `stream`, gravar também o arquivo em data/raw (replay).
+    """
+    start_time = datetime.now()
+    feeds = feeds or feed_urls_from_env()
+    logging.info(f"[Feeds] Consultando {len(feeds)} feeds/sitemaps")
+    session = get_http_session()
+    validators = load_validators()
+    metrics = RunMetrics('feeds')
+    sink = HeadlineSink(incremental, BronzeStreamWriter(metrics=metrics) if stream else None)
+    stats = {}
+    seen = set()
+    processed_titles = set()
+
+    with metrics.phase('discovery'):
+        for entry in discover_entries(session, feeds, validators, timeout_s, max_child_sitemaps, stats):
+            metrics.add('elements_matched')
+            entry_rows = []
+            if _append_headline(entry_rows, seen, processed_titles, entry['title'], entry['link'],
+                                entry['published_at']):
+                sink.add(entry_rows)
+    save_validators(validators)
+    for name, value in stats.items():
+        metrics.set(f"feeds_{name}", value)
+
+    duration = (datetime.now() - start_time).total_seconds()
+    logging.info(f"[Feeds] Concluído em {duration:.2f}s | {stats}")
+    logging.info(f"[Feeds] Total de manchetes únicas coletadas: {sink.extracted}")
+
+    return _finalize_rows(sink, start_time, return_df, label='Feeds', output_format=output_format,
+                          metrics=metrics, side_output=side_output)
+
+
+async def _crawl_sections_async(sections: list, concurrency: int, recycle_after: int,
+                                section_timeout_s: float, total_timeout_s: float,
+                                scroll_attempts: int, wait_after_scroll: int,
+                                headless: bool, blocking_stats: Optional[dict] = None,
+                                metrics: Optional[RunMetrics] = None,
+                                cdp_url: Optional[str] = None,
+                                sink: Optional[HeadlineSink] = None) -> HeadlineSink:
+    """Rastreia as seções em paralelo com um pool de contextos num único navegador."""
+    blocking_config = resource_blocking_config() if blocking_stats is not None else None
+    queue = asyncio.Queue()
+    for section in sections:
+        queue.put_nowait(section)
+
+    sink = sink if sink is not None else HeadlineSink()
+    seen = set()
+    processed_titles = set()
+
+    async def worker(browser, worker_id: int, shared_context=None):
+        context = None
+        page = None
+        navigations = 0
+        try:
+            while True:
+                try:
+                    section = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+
+                # Recicla contexto/página a cada `recycle_after` navegações
+                # para manter o consumo de memória do navegador limitado
+                if page is None or navigations >= recycle_after:
+                    if shared_context is not None:
+                        # Navegador compartilhado: páginas no contexto padrão (perfil
+                        # persistente do sidecar, com o cache de disco entre execuções)
+                        if page is not None:
+                            await page.close()
+                        page = await shared_context.new_page()
+                        await page.set_viewport_size({'width': 1920, 'height': 1080})
+                        if blocking_config is not None:
+                            await install_resource_blocking_cdp_async(shared_context, page, blocking_config,
+                                                                      blocking_stats)
+                    else:
+                        if context is not None:
+                            await context.close()
+                        context = await browser.new_context(
+                            user_agent=USER_AGENT,
+                            viewport={'width': 1920, 'height': 1080}
+                        )
+                        if blocking_config is not None:
+                            await install_resource_blocking_async(context, blocking_config, blocking_stats)
+                        page = await context.new_page()
+                    navigations = 0
+
+                url = section_url(section)
+                section_start = time.perf_counter()
+                try:
+                    scroll_stats = await asyncio.wait_for(
+                        _crawl_one_section(page, url, scroll_attempts, wait_after_scroll,
+                                           section_timeout_s),
+                        timeout=section_timeout_s,
+                    )
+                    section_rows = await extract_headlines_evaluate_async(page, seen, processed_titles,
+                                                                          metrics)
+                    if sink.stream is not None:
+                        # COPY fora do event loop (conexão do pool numa thread)
+                        await asyncio.to_thread(sink.add, section_rows, True)
+                    else:
+                        sink.add(section_rows)
+                    logging.info(
+                        f"[Crawl] worker {worker_id} | {url}: {len(section_rows)} novas manchetes "
+                        f"({time.perf_counter() - section_start:.1f}s)"
+                    )
+                    if metrics is not None:
+                        metrics.add('scrolls', scroll_stats['scrolls'])
+                except Exception as e:
+                    logging.error(f"[Crawl] worker {worker_id} | Erro em {url}: {e!r}")
+                    if metrics is not None:
+                        metrics.add('section_errors')
+                finally:
+                    navigations += 1
+                    if metrics is not None:
+                        metrics.record(f"section:{section.strip('/') or 'home'}",
+                                       (time.perf_counter() - section_start) * 1000)
+        finally:
+            if context is not None:
+                await context.close()
+            elif page is not None:
+                await page.close()
+
+    async with async_playwright() as p:
+        launch_start = time.perf_counter()
+        browser, shared = await acquire_browser_async(p, headless=headless, cdp_url=cdp_url)
+        if metrics is not None:
+            metrics.record('browser_launch', (time.perf_counter() - launch_start) * 1000)
+            metrics.set_browser_shared(shared)
+        shared_context = browser.contexts[0] if shared and browser.contexts else None
+        try:
+            workers = [asyncio.create_task(worker(browser, i + 1, shared_context))
+                       for i in range(max(1, min(concurrency, len(sections))))]
+            try:
+                await asyncio.wait_for(asyncio.gather(*workers), timeout=total_timeout_s)
+            except asyncio.TimeoutError:
+                logging.warning(
+                    f"[Crawl] Tempo total de {total_timeout_s}s esgotado; "
+                    f"{queue.qsize()} seções não visitadas."
+                )
+        finally:
+            await browser.close()
+
+    return sink
+
+
+async def _crawl_one_section(page, url: str, scroll_attempts: int, wait_after_scroll: int,
+                             section_timeout_s: float):
+    """Navega até uma seção e rola até o feed parar de crescer."""
+    timeout_ms = section_timeout_s * 1000
+    await page.goto(url, timeout=timeout_ms, wait_until='domcontentloaded')
+    await page.wait_for_selector('[data-mrf-layout-title]', timeout=timeout_ms)
+    return await adaptive_scroll_async(page, scroll_attempts, wait_after_scroll)
+
+
+def crawl_g1_sections(sections: Optional[list] = None, concurrency: int = 4,
+                      recycle_after: int = 5, section_timeout_s: float = 45,
+                      total_timeout_s: float = 600, scroll_attempts: int = 2,
+                      wait_after_scroll: int = 1500, headless: bool = True,
+                      return_df: bool = False, block_resources: bool = True,
+                      incremental: bool = False, output_format: str = 'parquet',
+                      cdp_url: Optional[str] = None, stream: bool = False,
+                      side_output: bool = True):
+    """Rastreia várias seções do G1 concorrentemente com a API assíncrona do Playwright.
+
+    Um único processo de navegador é compartilhado por um pool de `concurrency`
+    contextos (no navegador do sidecar, páginas do contexto padrão, que guarda o
+    cache de disco entre execuções); o conjunto `seen` é único para todas as seções.
+
+    Args:
+        sections: seções a visitar (default: G1_SECTIONS).
+        concurrency: número de contextos (seções visitadas em paralelo).
+        recycle_after: navegações por contexto antes de recriá-lo.
+        section_timeout_s: tempo máximo por seção (navegação + scrolls).
+        total_timeout_s: tempo máximo de relógio para todo o crawl.
+        scroll_attempts: máximo de scrolls por seção.
+        wait_after_scroll: espera máxima por novas manchetes após cada scroll (ms).
+        headless: executar sem interface gráfica.
+        return_df: se True retorna DataFrame.
+        block_resources: bloquear imagens, mídia, fontes e hosts de anúncios/tracking.
+        incremental: emitir apenas links ainda não vistos em execuções anteriores.
+        output_format: 'parquet' (zstd) ou 'csv'.
+        cdp_url: endpoint CDP de um Chromium já em execução (default: SCRAPER_BROWSER_CDP_URL).
+        stream: gravar as manchetes em raw_headlines ao fim de cada seção (bronze_stream).
+        side_output: com `stream`, gravar também o arquivo em data/raw (replay).
+    """
+    if not _PLAYWRIGHT_AVAILABLE:
+        raise RuntimeError("Playwright não está instalado ou não pôde ser importado.")
+
+    sections = G1_SECTIONS if sections is None else sections
+    start_time = datetime.now()
+    logging.info(f"[Crawl] Iniciando crawl de {len(sections)} seções com {concurrency} contextos")
+
+    blocking_stats = new_blocking_stats() if block_resources else None
+    metrics = RunMetrics('crawl')
+    sink = HeadlineSink(incremental, BronzeStreamWriter(metrics=metrics) if stream else None)
+    with metrics.phase('crawl'):
+        asyncio.run(_crawl_sections_async(
+            sections, concurrency, recycle_after, section_timeout_s, total_timeout_s,
+            scroll_attempts, wait_after_scroll, headless, blocking_stats, metrics, cdp_url,
+            sink,
+        ))
+
+    duration = (datetime.now() - start_time).total_seconds()
+    logging.info(f"[Crawl] Concluído em {duration:.1f}s")
+    logging.info(f"[Crawl] Total de manchetes únicas coletadas: {sink.extracted}")
+    if blocking_stats is not None:
+        log_blocking_stats('Crawl', blocking_stats)
+        metrics.set('requests_blocked', blocking_stats['blocked'])
+        metrics.set('bytes_saved_estimated', blocking_stats['estimated_bytes_saved'])
+
+    return _finalize_rows(sink, start_time, return_df, label='Crawl', output_format=output_format,
+                          metrics=metrics, side_output=side_output)
+
+
+def save_fixture(html: str, path: str) -> str:
+    """Grava o DOM renderizado como fixture comprimida (gzip)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        f.write(html)
+    logging.info(f"[Fixture] DOM salvo em {path} ({os.path.getsize(path) / 1024:.0f} KB)")
+    return path
+
+
+def load_fixture(path: str) -> str:
+    """Lê uma fixture de HTML (.html.gz ou .html)."""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        return f.read()
+
+
+def open_fixture_page(page, html: str, url: str = f"{BASE_URL}/", timeout_ms: int = 30000):
+    """Carrega o HTML salvo em `page` sob a URL original, sem acessar a rede.
+
+    O documento é servido via `page.route` (mantendo a URL para resolver links
+    relativos) e todas as demais requisições são abortadas; os scripts da página
+    não rodam, o DOM já vem renderizado da captura.
+    """
+    def handle(route):
+        request = route.request
+        if request.resource_type == 'document' and request.url == url:
+            route.fulfill(status=200, content_type='text/html; charset=utf-8', body=html)
+        else:
+            route.abort()
+
+    page.route('**/*', handle)
+    page.goto(url, timeout=timeout_ms, wait_until='domcontentloaded')
+
+
+def replay_g1_headlines(fixture: str, extraction: str = 'evaluate', headless: bool = True,
+                        return_df: bool = False):
+    """Executa a extração sobre uma fixture salva com `--capture` (modo offline).
+
+    `extraction` aceita as estratégias do Playwright ('evaluate', 'handles') ou
+    'lxml' (parser do engine requests). Não grava arquivos em data/raw.
+    """
+    start = time.perf_counter()
+    html = load_fixture(fixture)
+    seen = set()
+
+    if extraction == 'lxml':
+        rows = parse_headlines_html(html.encode('utf-8'), f"{BASE_URL}/", seen, set())
+    elif extraction in EXTRACTORS:
+        if not _PLAYWRIGHT_AVAILABLE:
+            raise RuntimeError("Playwright não está instalado ou não pôde ser importado.")
+        with sync_playwright() as p:
+            browser = p.chromium.launch(headless=headless)
+            try:
+                page = browser.new_page(viewport={'width': 1920, 'height': 1080})
+                open_fixture_page(page, html)
+                rows = EXTRACTORS[extraction](page, seen)
+            finally:
+                browser.close()
+    else:
+        raise ValueError("Extração inválida. Use 'evaluate', 'handles' ou 'lxml'.")
+
+    logging.info(
+        f"[Replay] {fixture}: {len(rows)} manchetes com '{extraction}' "
+        f"em {time.perf_counter() - start:.2f}s"
+    )
+    return pd.DataFrame(rows) if return_df else rows
+
+
+def main(engine: Literal['requests','playwright','crawl','feeds'] = 'playwright',
+         extraction: Literal['evaluate', 'handles'] = 'evaluate',
+         sections: Optional[list] = None, concurrency: int = 4,
+         total_timeout_s: float = 600, block_resources: bool = True,
+         incremental: bool = False, output_format: str = 'parquet',
+         capture: bool = False, capture_har: bool = False, cdp_url: Optional[str] = None,
+         feeds: Optional[list] = None, stream: bool = False, side_output: bool = True):
+    stream_kwargs = {'stream': stream, 'side_output': side_output}
     if engine == 'requests':
-        # Usando a função principal (agora com Playwright)
-        scrape_g1_headlines()
+        # HTTP puro; recorre ao Playwright se o HTML estático vier incompleto
+        scrape_g1_headlines_requests(sections=sections, extraction=extraction,
+                                     block_resources=block_resources, incremental=incremental,
+                                     output_format=output_format, cdp_url=cdp_url, **stream_kwargs)
     elif engine == 'playwright':
-        scrape_g1_headlines()
+        scrape_g1_headlines(extraction=extraction, block_resources=block_resources,
+                            incremental=incremental, output_format=output_format,
+                            capture=capture, capture_har=capture_har, cdp_url=cdp_url, **stream_kwargs)
+    elif engine == 'crawl':
+        crawl_g1_sections(sections=sections or None, concurrency=concurrency,
+                          total_timeout_s=total_timeout_s, block_resources=block_resources,
+                          incremental=incremental, output_format=output_format, cdp_url=cdp_url,
+                          **stream_kwargs)
+    elif engine == 'feeds':
+        # RSS/Atom e sitemaps com GET condicional; barato o bastante para rodar a cada poucos minutos
+        scrape_g1_feeds(feeds=feeds or None, incremental=incremental, output_format=output_format,
+                        **stream_kwargs)
     else:
-        raise ValueError("Engine inválida. Use 'requests' ou 'playwright'.")
+        raise ValueError("Engine inválida. Use 'requests', 'playwright', 'crawl' ou 'feeds'.")
 
 
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser(description='Scraper G1')
-    parser.add_argument('--engine', choices=['requests','playwright'], default='requests', help='Mecanismo de scraping (default: requests)')
+    parser.add_argument('--engine', choices=['requests','playwright','crawl','feeds'], default='requests', help='Mecanismo de scraping (default: requests)')
+    parser.add_argument('--extraction', choices=list(EXTRACTORS) + ['lxml'], default='evaluate',
+                        help="Estratégia de extração do DOM (default: evaluate, um único round trip; "
+                             "'lxml' apenas com --replay)")
+    parser.add_argument('--sections', default='',
+                        help="Seções separadas por vírgula (requests: extras além da home; crawl: default G1_SECTIONS)")
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help="Contextos de navegador em paralelo no modo crawl (default: 4)")
+    parser.add_argument('--total-timeout', type=float, default=600,
+                        help="Tempo máximo total do crawl em segundos (default: 600)")
+    parser.add_argument('--no-block-resources', action='store_true',
+                        help="Não bloquear imagens, mídia, fontes e hosts de anúncios/tracking")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Emitir apenas links ainda não vistos (índice persistente em data/index)")
+    parser.add_argument('--output-format', choices=['parquet', 'csv'], default='parquet',
+                        help="Formato do arquivo em data/raw (default: parquet com zstd)")
+    parser.add_argument('--capture', action='store_true',
+                        help="Salvar o DOM após os scrolls em data/fixtures (engine playwright)")
+    parser.add_argument('--capture-har', action='store_true',
+                        help="Com --capture, gravar também o HAR da navegação")
+    parser.add_argument('--feeds', default='',
+                        help="URLs de feeds RSS/Atom ou sitemaps separadas por vírgula (engine feeds; "
+                             "default: SCRAPER_FEED_URLS ou os feeds RSS do G1)")
+    parser.add_argument('--cdp-url', default=None,
+                        help="Endpoint CDP do navegador compartilhado (default: SCRAPER_BROWSER_CDP_URL; "
+                             "sem ele lança um Chromium local)")
+    parser.add_argument('--stream', action='store_true',
+                        help="Gravar as manchetes direto em raw_headlines durante a coleta "
+                             "(pool de conexões POSTGRES_*), em lotes pequenos")
+    parser.add_argument('--no-side-output', action='store_true',
+                        help="Com --stream, não gravar o arquivo de replay em data/raw")
+    parser.add_argument('--replay', metavar='FIXTURE',
+                        help="Executar a extração sobre uma fixture salva, sem acessar a rede")
     args = parser.parse_args()
-    main(args.engine)
\ No newline at end of file
+    if args.replay:
+        replay_g1_headlines(args.replay, extraction=args.extraction)
+        raise SystemExit(0)
+    sections = [s for s in args.sections.split(',') if s.strip()]
+    if args.extraction == 'lxml':
+        parser.error("--extraction lxml requer --replay")
+    if args.capture and args.engine != 'playwright':
+        parser.error("--capture requer --engine playwright")
+    if args.capture_har and not args.capture:
+        parser.error("--capture-har requer --capture")
+    if args.no_side_output and not args.stream:
+        parser.error("--no-side-output requer --stream")
+    main(args.engine, args.extraction, sections, args.concurrency, args.total_timeout,
+         block_resources=not args.no_block_resources, incremental=args.incremental,
+         output_format=args.output_format, capture=args.capture,
+         capture_har=args.capture_har, cdp_url=args.cdp_url,
+         feeds=[f.strip() for f in args.feeds.split(',') if f.strip()],
+         stream=args.stream, side_output=not args.no_side_output)
+    close_connection_pool()
\ No newline at end of file
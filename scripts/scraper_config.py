@@ -0,0 +1,11 @@
+"""Identidade HTTP comum aos clientes do G1 (scraper, sidecar do Chromium e fetcher de artigos).
+
+Módulo sem dependências, para que o sidecar e o fetcher não precisem importar
+o scraper inteiro (pandas, Playwright, pool do streaming) só por uma string.
+"""
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/125.0.0.0 Safari/537.36"
+)
@@ -0,0 +1,173 @@
+"""Índice persistente de links já vistos pelo scraper (entre execuções).
+
+Guarda apenas um hash de 64 bits da URL canônica de cada link (ver `url_canon`)
+num array ordenado (8 bytes por entrada + 4 bytes do dia em que foi visto pela
+última vez), permitindo consultar milhares de links por busca binária vetorizada.
+
+Política de crescimento:
+    - entradas não vistas há mais de `max_age_days` dias são removidas a cada save;
+    - acima de `max_entries`, mantém-se apenas as vistas mais recentemente;
+    - o índice é reconstruído a partir de `raw_headlines.link` quando o arquivo
+      não existe ou tem mais de `rebuild_after_days` dias (ver `needs_rebuild`).
+"""
+import logging
+import os
+import time
+from typing import Iterable, Optional
+
+import numpy as np
+
+from url_canon import url_key
+
+DEFAULT_INDEX_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'index', 'seen_links.npz'
+)
+DEFAULT_MAX_AGE_DAYS = 60
+DEFAULT_MAX_ENTRIES = 2_000_000
+DEFAULT_REBUILD_AFTER_DAYS = 7
+
+
+def link_key(link: str) -> int:
+    """Hash estável de 64 bits (sem sinal) da URL canônica; mesmo valor de `url_key`."""
+    return url_key(link) & 0xFFFFFFFFFFFFFFFF
+
+
+def _today() -> int:
+    """Dia atual em dias desde a época Unix."""
+    return int(time.time() // 86400)
+
+
+def _day_of(value) -> int:
+    """Converte datetime/Timestamp/ISO string em dias desde a época (fallback: hoje)."""
+    if value is None:
+        return _today()
+    try:
+        if isinstance(value, str):
+            from datetime import datetime
+            value = datetime.fromisoformat(value)
+        return int(value.timestamp() // 86400)
+    except (TypeError, ValueError, AttributeError):
+        return _today()
+
+
+class SeenLinkIndex:
+    """Conjunto ordenado de hashes de links com o último dia em que foram vistos."""
+
+    def __init__(self, hashes=None, last_seen=None, built_at: Optional[float] = None,
+                 path: str = DEFAULT_INDEX_PATH):
+        self.hashes = np.asarray(hashes if hashes is not None else [], dtype=np.uint64)
+        self.last_seen = np.asarray(last_seen if last_seen is not None else [], dtype=np.uint32)
+        self.built_at = built_at if built_at is not None else time.time()
+        self.path = path
+
+    def __len__(self):
+        return len(self.hashes)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_INDEX_PATH) -> 'SeenLinkIndex':
+        """Carrega o índice do disco (ou retorna um índice vazio se não existir)."""
+        if not os.path.exists(path):
+            return cls(path=path, built_at=0.0)
+        with np.load(path) as data:
+            return cls(data['hashes'], data['last_seen'], float(data['built_at']), path=path)
+
+    @classmethod
+    def from_records(cls, records: Iterable, path: str = DEFAULT_INDEX_PATH) -> 'SeenLinkIndex':
+        """Constrói o índice a partir de pares (link, scraped_at), ex.: de `raw_headlines`."""
+        keys, days = [], []
+        for link, scraped_at in records:
+            if link:
+                keys.append(link_key(link))
+                days.append(_day_of(scraped_at))
+        index = cls(path=path)
+        index._merge(np.array(keys, dtype=np.uint64), np.array(days, dtype=np.uint32))
+        return index
+
+    def needs_rebuild(self, rebuild_after_days: int = DEFAULT_REBUILD_AFTER_DAYS) -> bool:
+        """True se o índice nunca foi construído ou está mais velho que o limite."""
+        return not len(self) or time.time() - self.built_at > rebuild_after_days * 86400
+
+    def contains(self, links: list) -> np.ndarray:
+        """Máscara booleana indicando quais links já estão no índice."""
+        keys = np.array([link_key(link) for link in links], dtype=np.uint64)
+        if not len(self.hashes) or not len(keys):
+            return np.zeros(len(keys), dtype=bool)
+        pos = np.searchsorted(self.hashes, keys)
+        pos_clipped = np.minimum(pos, len(self.hashes) - 1)
+        return (pos < len(self.hashes)) & (self.hashes[pos_clipped] == keys)
+
+    def add(self, links: list):
+        """Adiciona links (ou renova o `last_seen` dos que já existem)."""
+        keys = np.array([link_key(link) for link in links], dtype=np.uint64)
+        self._merge(keys, np.full(len(keys), _today(), dtype=np.uint32))
+
+    def _merge(self, keys: np.ndarray, days: np.ndarray):
+        hashes = np.concatenate([self.hashes, keys])
+        last_seen = np.concatenate([self.last_seen, days])
+        # Ordena por (hash, dia) e fica com a ocorrência mais recente de cada hash
+        order = np.lexsort((last_seen, hashes))
+        hashes, last_seen = hashes[order], last_seen[order]
+        keep = np.ones(len(hashes), dtype=bool)
+        keep[:-1] = hashes[1:] != hashes[:-1]
+        self.hashes, self.last_seen = hashes[keep], last_seen[keep]
+
+    def evict(self, max_age_days: int = DEFAULT_MAX_AGE_DAYS,
+              max_entries: int = DEFAULT_MAX_ENTRIES) -> int:
+        """Remove entradas antigas e limita o tamanho; retorna quantas foram removidas."""
+        before = len(self)
+        keep = self.last_seen >= _today() - max_age_days
+        if keep.sum() > max_entries:
+            cutoff = np.sort(self.last_seen[keep])[-max_entries]
+            keep &= self.last_seen >= cutoff
+        self.hashes, self.last_seen = self.hashes[keep], self.last_seen[keep]
+        return before - len(self)
+
+    def save(self, max_age_days: int = DEFAULT_MAX_AGE_DAYS,
+             max_entries: int = DEFAULT_MAX_ENTRIES):
+        """Aplica a política de evicção e grava o índice de forma atômica."""
+        evicted = self.evict(max_age_days, max_entries)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp.npz"
+        np.savez(tmp_path, hashes=self.hashes, last_seen=self.last_seen,
+                 built_at=np.float64(self.built_at))
+        os.replace(tmp_path, self.path)
+        logging.info(f"[SeenIndex] {len(self)} links salvos em {self.path} ({evicted} removidos)")
+
+
+class SeenLinkFilter:
+    """Filtro incremental de uma execução do scraper.
+
+    Consulta o índice sem alterá-lo. Os links da execução só entram no índice
+    em `commit()`, chamado depois que o lote foi persistido (arquivo em data/raw
+    ou raw_headlines): se a gravação falhar, os links continuam novos na
+    próxima execução em vez de serem descartados para sempre.
+    """
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH):
+        self.path = path
+        self.index = SeenLinkIndex.load(path)
+        if self.index.needs_rebuild():
+            logging.warning(
+                "[SeenIndex] Índice ausente ou desatualizado; rode a reconstrução a partir "
+                "de raw_headlines (task refresh_seen_link_index) para evitar duplicatas."
+            )
+        self.links = []
+        self.reseen = 0
+
+    def filter(self, rows: list) -> list:
+        """Retorna as linhas cujo link não foi visto em execuções anteriores."""
+        links = [row['link'] for row in rows]
+        already_seen = self.index.contains(links)
+        self.links.extend(links)
+        self.reseen += int(already_seen.sum())
+        return [row for row, seen in zip(rows, already_seen) if not seen]
+
+    def commit(self):
+        """Grava no índice os links da execução (novos e re-vistos)."""
+        if not self.links:
+            return
+        # Recarrega: outra execução (ex.: a descoberta por feeds) pode ter salvo o índice nesse meio tempo
+        index = SeenLinkIndex.load(self.path)
+        index.add(self.links)
+        index.save()
+        self.links = []
@@ -0,0 +1,80 @@
+"""Canonicalização de URLs de notícias e chave de deduplicação de 64 bits.
+
+A mesma matéria pode aparecer com parâmetros de campanha (`?utm_*`),
+fragmentos, barra final ou `http`/`https` diferentes. `canonicalize_url`
+reduz essas variações a uma única forma e `url_key` gera um hash estável de
+64 bits (BIGINT com sinal, compatível com o PostgreSQL) da URL canônica,
+usado no `seen` do scraper, no índice de links vistos e na ingestão.
+
+Regras:
+    - esquema `http` vira `https`; host em minúsculas, sem porta padrão e sem ponto final;
+    - fragmento (`#...`) removido;
+    - parâmetros de rastreamento removidos (utm_*, fbclid, gclid, ...) e os demais ordenados;
+    - barra final removida do caminho (exceto na raiz).
+"""
+import hashlib
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+TRACKING_PARAM_PREFIXES = ('utm_', 'ga_', 'mc_', 'pk_', 'hsa_')
+TRACKING_PARAMS = frozenset({
+    'fbclid', 'gclid', 'gclsrc', 'dclid', 'msclkid', 'yclid', 'igshid', 'twclid',
+    'mkt_tok', 'ref', 'ref_src', 'ref_url', 'origem', 'xtor', '_ga', '_gl', 'cmpid',
+})
+
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def _is_tracking_param(name: str) -> bool:
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PARAM_PREFIXES)
+
+
+def _is_canonical_fast(url: str) -> bool:
+    """Atalho para o caso comum (https, sem query/fragmento/barra final), sem parse completo."""
+    if not url.startswith('https://') or '?' in url or '#' in url or url.endswith('/'):
+        return False
+    host_end = url.find('/', 8)
+    if host_end == -1:
+        return False
+    host = url[8:host_end]
+    return bool(host) and host == host.lower() and ':' not in host and '@' not in host \
+        and not host.endswith('.')
+
+
+def canonicalize_url(url: Optional[str]) -> Optional[str]:
+    """Forma canônica de uma URL absoluta http(s); outras URLs são devolvidas sem alteração."""
+    if not url:
+        return url
+    url = url.strip()
+    if _is_canonical_fast(url):
+        return url
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    if scheme not in _DEFAULT_PORTS or not parts.hostname:
+        return url
+
+    host = parts.hostname.rstrip('.')
+    if parts.port and parts.port != _DEFAULT_PORTS[scheme]:
+        host = f"{host}:{parts.port}"
+
+    path = parts.path or '/'
+    if len(path) > 1:
+        path = path.rstrip('/') or '/'
+
+    params = sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not _is_tracking_param(name)
+    )
+    return urlunsplit(('https', host, path, urlencode(params), ''))
+
+
+def canonical_key(canonical: str) -> int:
+    """Hash de 64 bits (com sinal) de uma URL já canônica."""
+    return int.from_bytes(hashlib.blake2b((canonical or '').encode('utf-8'), digest_size=8).digest(),
+                          'little', signed=True)
+
+
+def url_key(url: str) -> int:
+    """Hash de 64 bits (com sinal) da URL canônica, para colunas BIGINT e joins."""
+    return canonical_key(canonicalize_url(url))
@@ -0,0 +1,307 @@
+"""Chromium de longa duração compartilhado entre execuções do scraper.
+
+Em vez de `p.chromium.launch()` a cada execução, o scraper pode se conectar via
+CDP (`connect_over_cdp`) a um Chromium que já está rodando, economizando o tempo
+de inicialização do navegador. O servidor é um sidecar do docker-compose
+(serviço `chromium`) que mantém um diretório de perfil persistente (cache de
+disco entre execuções), expõe um health check e relança o Chromium quando o
+processo morre ou para de responder.
+
+Cliente (scraper.py):
+    SCRAPER_BROWSER_CDP_URL=http://chromium:9222 python scripts/scraper.py --engine playwright
+
+Servidor (sidecar):
+    python scripts/warm_browser.py --port 9222 --user-data-dir data/browser-profile
+
+Obs.: o Chromium só aceita conexões CDP cujo cabeçalho Host seja um IP ou
+`localhost`, por isso o cliente resolve o nome do serviço antes de conectar.
+O headless novo ignora `--remote-debugging-address` e só escuta em 127.0.0.1;
+o sidecar roda o Chromium numa porta interna e repassa as conexões de
+`0.0.0.0:<porta>` para ela, para que outros containers alcancem o DevTools.
+"""
+import argparse
+import glob
+import logging
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from typing import Optional
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+
+from scraper_config import USER_AGENT
+
+DEFAULT_PORT = 9222
+DEFAULT_PROFILE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'browser-profile'
+)
+CHROMIUM_ARGS = (
+    '--headless=new',
+    '--no-sandbox',
+    '--disable-dev-shm-usage',
+    '--no-first-run',
+    '--no-default-browser-check',
+    '--disable-background-networking',
+    '--window-size=1920,1080',
+)
+
+
+def cdp_url_from_env() -> Optional[str]:
+    """Endpoint CDP configurado em SCRAPER_BROWSER_CDP_URL (ou None)."""
+    return os.getenv('SCRAPER_BROWSER_CDP_URL') or None
+
+
+def _resolve_host(url: str) -> str:
+    """Troca o hostname do endpoint pelo IP (exigência do Chromium para o Host)."""
+    parts = urlsplit(url)
+    host = parts.hostname or 'localhost'
+    if host == 'localhost':
+        return url
+    try:
+        ip = socket.gethostbyname(host)
+    except OSError:
+        return url
+    netloc = f"{ip}:{parts.port}" if parts.port else ip
+    return urlunsplit((parts.scheme, netloc, parts.path, parts.query, parts.fragment))
+
+
+def browser_version(cdp_url: str, timeout_s: float = 2) -> Optional[dict]:
+    """Consulta /json/version; retorna o JSON ou None se o navegador não responder."""
+    try:
+        response = requests.get(f"{_resolve_host(cdp_url).rstrip('/')}/json/version", timeout=timeout_s)
+        response.raise_for_status()
+        return response.json()
+    except (requests.RequestException, ValueError):
+        return None
+
+
+def wait_until_healthy(cdp_url: str, timeout_s: float = 10, interval_s: float = 0.5) -> bool:
+    """Aguarda o endpoint CDP responder (o sidecar pode estar relançando o Chromium)."""
+    deadline = time.monotonic() + timeout_s
+    while True:
+        if browser_version(cdp_url) is not None:
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(interval_s)
+
+
+def acquire_browser(playwright, headless: bool = True, cdp_url: Optional[str] = None,
+                    connect_timeout_s: float = 10) -> tuple:
+    """Retorna (browser, compartilhado).
+
+    Com `cdp_url` (ou SCRAPER_BROWSER_CDP_URL), conecta ao Chromium do sidecar;
+    se ele estiver indisponível, lança um navegador local como antes.
+    `compartilhado=True` indica que `browser.close()` apenas desconecta.
+    """
+    cdp_url = cdp_url or cdp_url_from_env()
+    if cdp_url:
+        if wait_until_healthy(cdp_url, timeout_s=connect_timeout_s):
+            try:
+                browser = playwright.chromium.connect_over_cdp(
+                    _resolve_host(cdp_url), timeout=connect_timeout_s * 1000
+                )
+                logging.info(f"[Playwright] Conectado ao navegador compartilhado em {cdp_url}")
+                return browser, True
+            except Exception as e:
+                logging.warning(f"[Playwright] Falha ao conectar em {cdp_url}: {e!r}")
+        else:
+            logging.warning(f"[Playwright] Navegador em {cdp_url} não respondeu ao health check")
+        logging.warning("[Playwright] Lançando navegador local")
+    return playwright.chromium.launch(headless=headless), False
+
+
+async def acquire_browser_async(playwright, headless: bool = True, cdp_url: Optional[str] = None,
+                                connect_timeout_s: float = 10) -> tuple:
+    """Versão assíncrona de `acquire_browser` para o modo crawl."""
+    import asyncio
+
+    cdp_url = cdp_url or cdp_url_from_env()
+    if cdp_url:
+        healthy = await asyncio.to_thread(wait_until_healthy, cdp_url, connect_timeout_s)
+        if healthy:
+            try:
+                browser = await playwright.chromium.connect_over_cdp(
+                    _resolve_host(cdp_url), timeout=connect_timeout_s * 1000
+                )
+                logging.info(f"[Crawl] Conectado ao navegador compartilhado em {cdp_url}")
+                return browser, True
+            except Exception as e:
+                logging.warning(f"[Crawl] Falha ao conectar em {cdp_url}: {e!r}")
+        else:
+            logging.warning(f"[Crawl] Navegador em {cdp_url} não respondeu ao health check")
+        logging.warning("[Crawl] Lançando navegador local")
+    return await playwright.chromium.launch(headless=headless), False
+
+
+def chromium_executable() -> str:
+    """Caminho do Chromium instalado pelo Playwright (`playwright install chromium`)."""
+    from playwright.sync_api import sync_playwright
+
+    with sync_playwright() as p:
+        return p.chromium.executable_path
+
+
+def _clear_profile_locks(user_data_dir: str):
+    # Um Chromium morto deixa SingletonLock/Socket/Cookie no perfil e impede o relançamento
+    for path in glob.glob(os.path.join(user_data_dir, 'Singleton*')):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def launch_chromium(executable: str, port: int, user_data_dir: str) -> subprocess.Popen:
+    """Inicia o Chromium com depuração remota (em 127.0.0.1) e perfil persistente."""
+    os.makedirs(user_data_dir, exist_ok=True)
+    _clear_profile_locks(user_data_dir)
+    args = [
+        executable,
+        *CHROMIUM_ARGS,
+        f'--user-agent={USER_AGENT}',
+        f'--remote-debugging-port={port}',
+        f'--user-data-dir={user_data_dir}',
+        'about:blank',
+    ]
+    return subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def _pump(source: socket.socket, target: socket.socket):
+    try:
+        while True:
+            data = source.recv(65536)
+            if not data:
+                break
+            target.sendall(data)
+    except OSError:
+        pass
+    finally:
+        # Encerra os dois lados para a outra direção também terminar
+        for sock in (source, target):
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+def _proxy_connection(client: socket.socket, target_port: int):
+    try:
+        upstream = socket.create_connection(('127.0.0.1', target_port), timeout=5)
+    except OSError:
+        # Chromium sendo relançado: o cliente vê a conexão recusada e tenta de novo
+        client.close()
+        return
+    upstream.settimeout(None)
+    reverse = threading.Thread(target=_pump, args=(upstream, client), daemon=True)
+    reverse.start()
+    _pump(client, upstream)
+    reverse.join()
+    client.close()
+    upstream.close()
+
+
+def start_devtools_proxy(listen_port: int, target_port: int, listen_host: str = '0.0.0.0') -> socket.socket:
+    """Repassa conexões TCP de `listen_host:listen_port` para o DevTools em 127.0.0.1:`target_port`.
+
+    HTTP (/json/*) e WebSocket do CDP passam sem alteração; o cabeçalho Host
+    continua sendo o do cliente (o IP do sidecar), que o Chromium aceita e usa
+    na `webSocketDebuggerUrl`.
+    """
+    server = socket.create_server((listen_host, listen_port))
+
+    def accept_loop():
+        while True:
+            try:
+                client, _ = server.accept()
+            except OSError:
+                return
+            threading.Thread(target=_proxy_connection, args=(client, target_port), daemon=True).start()
+
+    threading.Thread(target=accept_loop, daemon=True).start()
+    return server
+
+
+def _stop(process: subprocess.Popen, timeout_s: float = 10):
+    if process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout=timeout_s)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def serve(port: int = DEFAULT_PORT, user_data_dir: str = DEFAULT_PROFILE_DIR,
+          check_interval_s: float = 10, max_failures: int = 3, executable: Optional[str] = None,
+          chromium_port: Optional[int] = None):
+    """Mantém o Chromium no ar: relança se o processo sair ou falhar `max_failures` health checks.
+
+    O Chromium escuta em 127.0.0.1:`chromium_port` (default: `port` + 1) e o proxy
+    expõe o DevTools em 0.0.0.0:`port`; o health check passa pelo proxy.
+    """
+    executable = executable or chromium_executable()
+    chromium_port = chromium_port or port + 1
+    proxy = start_devtools_proxy(port, chromium_port)
+    local_url = f"http://localhost:{port}"
+    stopping = False
+
+    def handle_signal(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    backoff_s = 1.0
+    while not stopping:
+        process = launch_chromium(executable, chromium_port, user_data_dir)
+        started = time.monotonic()
+        if wait_until_healthy(local_url, timeout_s=30):
+            logging.info(
+                f"[Navegador] Chromium pronto em 0.0.0.0:{port} -> 127.0.0.1:{chromium_port} "
+                f"(pid {process.pid}, perfil {user_data_dir})"
+            )
+            backoff_s = 1.0
+        else:
+            logging.error("[Navegador] Chromium não respondeu após o lançamento")
+
+        failures = 0
+        while not stopping and process.poll() is None and failures < max_failures:
+            time.sleep(check_interval_s)
+            failures = 0 if browser_version(local_url) is not None else failures + 1
+
+        _stop(process)
+        if stopping:
+            break
+        logging.warning(
+            f"[Navegador] Chromium caiu após {time.monotonic() - started:.0f}s "
+            f"(código {process.returncode}, {failures} health checks falhos); relançando em {backoff_s:.0f}s"
+        )
+        time.sleep(backoff_s)
+        backoff_s = min(backoff_s * 2, 60)
+
+    proxy.close()
+    logging.info("[Navegador] Encerrado.")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s',
+                        handlers=[logging.StreamHandler(sys.stdout)])
+    parser = argparse.ArgumentParser(description='Chromium compartilhado (sidecar) para o scraper G1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT,
+                        help='Porta CDP exposta aos outros containers (default: 9222)')
+    parser.add_argument('--chromium-port', type=int, default=None,
+                        help='Porta interna do DevTools do Chromium, só em 127.0.0.1 (default: --port + 1)')
+    parser.add_argument('--user-data-dir', default=DEFAULT_PROFILE_DIR,
+                        help='Diretório de perfil persistente (cache de disco entre execuções)')
+    parser.add_argument('--check-interval', type=float, default=10, help='Intervalo do health check (s)')
+    parser.add_argument('--max-failures', type=int, default=3,
+                        help='Health checks falhos seguidos antes de relançar')
+    args = parser.parse_args()
+    serve(args.port, args.user_data_dir, args.check_interval, args.max_failures,
+          chromium_port=args.chromium_port)